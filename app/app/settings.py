@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "drf_spectacular",
@@ -53,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.perf.RequestPerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -97,6 +99,26 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# Run more than one worker against a shared backend so invalidations reach
+# every process; docker-compose-deploy.yml points the app at memcached. The
+# local memory default only suits a single process, such as the dev server.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+# Cache holding serialized tag and ingredient lists (see recipe.cache)
+RECIPE_ATTR_CACHE_ALIAS = "default"
+RECIPE_ATTR_CACHE_TIMEOUT = int(os.environ.get("RECIPE_ATTR_CACHE_TIMEOUT", 300))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -139,6 +161,30 @@ MEDIA_URL = "/static/media/"
 MEDIA_ROOT = "/vol/web/media"
 STATIC_ROOT = "/vol/web/static"
 
+# Uploaded recipe images are re-encoded and resized off the request path by
+# this many threads per worker; 0 processes them synchronously after commit.
+RECIPE_IMAGE_WORKERS = int(os.environ.get("RECIPE_IMAGE_WORKERS", 2))
+RECIPE_IMAGE_SIZES = {"large": 1024, "medium": 512, "thumb": 128}
+RECIPE_IMAGE_QUALITY = 85
+# Seconds an image file stays unreferenced before collect_recipe_images may
+# delete it, longer than any upload takes to reach its recipe.
+RECIPE_IMAGE_GC_GRACE = int(os.environ.get("RECIPE_IMAGE_GC_GRACE", 3600))
+
+# Largest number of operations accepted by the recipe bulk endpoint
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get("RECIPE_BULK_MAX_ITEMS", 1000))
+
+# Rows fetched per server-side cursor round trip by the recipe export
+RECIPE_EXPORT_CHUNK_SIZE = 500
+
+# Rows per COPY batch and number of row errors reported by the recipe import
+RECIPE_IMPORT_BATCH_SIZE = 5000
+RECIPE_IMPORT_MAX_ERRORS = 1000
+
+# Warm up each serving process before it takes traffic (see core.warmup),
+# importing these URLconfs besides ROOT_URLCONF
+WARM_UP_ON_START = bool(int(os.environ.get("WARM_UP_ON_START", 0)))
+WARM_UP_URLCONFS = ["app.urls_async"]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -146,8 +192,37 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "core.User"
 
+# Token lookups cached by core.authentication.CachedTokenAuthentication.
+# Revocation epochs live in SHARED_ALIAS, which must be shared by every
+# worker (see CACHES) for revocations to reach them all.
+TOKEN_AUTH_CACHE = {
+    "MAX_SIZE": 10000,
+    "TIMEOUT": 60,
+    "SHARED_ALIAS": os.environ.get("TOKEN_AUTH_CACHE_ALIAS", "default") or None,
+}
+
+# Per-request timings reported by core.perf.RequestPerformanceMiddleware.
+# Requests over any SLOW_* threshold are logged with their slowest SQL. The
+# Server-Timing header exposes DB and cache details to any client, so it is
+# only sent by default when DEBUG is on.
+REQUEST_PERF = {
+    "ENABLED": bool(int(os.environ.get("REQUEST_PERF_ENABLED", 1))),
+    "SERVER_TIMING": bool(
+        int(os.environ.get("REQUEST_PERF_SERVER_TIMING", int(DEBUG)))
+    ),
+    "SLOW_REQUEST_MS": float(os.environ.get("REQUEST_PERF_SLOW_REQUEST_MS", 500)),
+    "SLOW_DB_MS": float(os.environ.get("REQUEST_PERF_SLOW_DB_MS", 200)),
+    "SLOW_QUERY_COUNT": int(os.environ.get("REQUEST_PERF_SLOW_QUERY_COUNT", 50)),
+    "SLOW_SQL_COUNT": 5,
+}
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
 SPECTACULAR_SETTINGS = {"COMPONENT_SPLIT_REQUEST": True}
+
+# /api/schema/ serves this artifact, written by `manage.py build_api_schema`,
+# instead of introspecting the API on every request
+API_SCHEMA_FILE = os.environ.get("API_SCHEMA_FILE") or BASE_DIR / "openapi.json"
+API_SCHEMA_PRECOMPUTED = bool(int(os.environ.get("API_SCHEMA_PRECOMPUTED", 1)))
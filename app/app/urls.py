@@ -19,14 +19,14 @@ from django.urls import include
 from django.urls import path
 from django.conf.urls.static import static
 from django.conf import settings
-from drf_spectacular.views import SpectacularAPIView
 from drf_spectacular.views import SpectacularSwaggerView
 from core import views as core_views
+from core.schema import PrecomputedSchemaView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/health-check/", core_views.health_check, name="health-check"),
-    path("api/schema/", SpectacularAPIView.as_view(), name="api-schema"),
+    path("api/schema/", PrecomputedSchemaView.as_view(), name="api-schema"),
     path(
         "api/docs/",
         SpectacularSwaggerView.as_view(url_name="api-schema"),
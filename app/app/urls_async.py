@@ -0,0 +1,46 @@
+"""URL configuration of the ASGI entrypoint
+
+The recipe, tag and ingredient read endpoints and the health check are
+served by async views; every other route comes from app.urls unchanged.
+"""
+
+from app import urls
+from core import async_views
+from django.urls import URLPattern
+from django.urls import include
+from django.urls import path
+from recipe.urls import app_name as recipe_app_name
+from recipe.urls import router
+
+
+ASYNC_READ_ROUTES = {
+    "recipe-list",
+    "recipe-detail",
+    "tag-list",
+    "ingredient-list",
+}
+
+
+def _async_reads(patterns):
+    return [
+        URLPattern(
+            pattern.pattern,
+            async_views.pooled_read_view(pattern.callback),
+            pattern.default_args,
+            pattern.name,
+        )
+        if pattern.name in ASYNC_READ_ROUTES
+        else pattern
+        for pattern in patterns
+    ]
+
+
+urlpatterns = [
+    path("api/health-check/", async_views.health_check, name="health-check"),
+    path("api/recipe/", include((_async_reads(router.urls), recipe_app_name))),
+] + [
+    pattern
+    for pattern in urls.urlpatterns
+    if getattr(pattern, "name", None) != "health-check"
+    and getattr(pattern, "namespace", None) != recipe_app_name
+]
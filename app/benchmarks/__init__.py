@@ -0,0 +1,4 @@
+"""Endpoint benchmarks with JSON baselines
+
+Run them with `python manage.py benchmark`; see benchmarks.runner.
+"""
@@ -0,0 +1,188 @@
+"""Measure the benchmark scenarios and compare them with a baseline
+
+For every dataset size and scenario a run records the latency distribution
+over `repeat` requests, the queries of one request and the memory one
+request allocates at its peak, traced with tracemalloc. Results are plain
+JSON, so a run saved with `--save-baseline` is the baseline of later ones.
+
+Latency depends on the machine and on whatever else runs on it. Requests of
+all scenarios are interleaved over several rounds so a noisy moment does not
+land on one scenario, and every run times a fixed CPU workload; baseline
+latencies are scaled by the ratio of the two calibrations before comparing.
+"""
+
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+import django
+from benchmarks.scenarios import SCENARIOS
+from benchmarks.scenarios import BenchmarkContext
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+WARMUP = 5
+ROUNDS = 4
+
+# Latency and allocation changes below these are noise, whatever the ratio
+LATENCY_FLOOR_MS = 2.0
+ALLOCATION_FLOOR_KIB = 16.0
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def calibrate():
+    """Milliseconds of a fixed CPU bound workload, best of several runs"""
+    data = [
+        {"id": i, "name": f"item {i}", "tags": list(range(i % 7))}
+        for i in range(2000)
+    ]
+    timings = []
+    for _ in range(7):
+        started = time.perf_counter()
+        for _ in range(5):
+            sorted(json.loads(json.dumps(data)), key=lambda item: item["name"])
+        timings.append(time.perf_counter() - started)
+    return _ms(min(timings))
+
+
+class Scenario:
+    """Timings and counts of one scenario against one context"""
+
+    def __init__(self, ctx, name):
+        self.ctx = ctx
+        self.name = name
+        self.func, self.before = SCENARIOS[name]
+        self.timings = []
+
+    def request(self):
+        if self.before is not None:
+            self.before(self.ctx)
+        started = time.perf_counter()
+        response = self.func(self.ctx)
+        seconds = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise BenchmarkError(
+                f"{self.name} returned {response.status_code}: "
+                f"{response.content[:200]}"
+            )
+        return seconds
+
+    def timed(self, count):
+        self.timings.extend(self.request() for _ in range(count))
+
+    def count_queries(self):
+        if self.before is not None:
+            self.before(self.ctx)
+        with CaptureQueriesContext(connection) as queries:
+            self.func(self.ctx)
+        # The next request resets the query log
+        return len(queries.captured_queries)
+
+    def peak_allocation(self):
+        if self.before is not None:
+            self.before(self.ctx)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            baseline, _ = tracemalloc.get_traced_memory()
+            self.func(self.ctx)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return round((peak - baseline) / 1024, 1)
+
+    def metrics(self):
+        timings = sorted(self.timings)
+        return {
+            "p50_ms": _ms(statistics.median(timings)),
+            "p95_ms": _ms(_percentile(timings, 0.95)),
+            "mean_ms": _ms(statistics.fmean(timings)),
+            "max_ms": _ms(timings[-1]),
+            "queries": self.count_queries(),
+            "alloc_kib": self.peak_allocation(),
+        }
+
+
+def measure(ctx, names, repeat):
+    """Metrics of each scenario in `names` against `ctx`"""
+    scenarios = [Scenario(ctx, name) for name in names]
+    for scenario in scenarios:
+        for _ in range(WARMUP):
+            scenario.request()
+    gc.collect()
+    rounds = min(ROUNDS, repeat)
+    for index in range(rounds):
+        count = repeat // rounds + (index < repeat % rounds)
+        for scenario in scenarios:
+            scenario.timed(count)
+    return {scenario.name: scenario.metrics() for scenario in scenarios}
+
+
+def run(sizes, repeat, scenarios=None, progress=None):
+    """Benchmark `scenarios`, all by default, at each dataset size"""
+    names = scenarios or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise BenchmarkError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for size in sorted(sizes):
+        results[str(size)] = measure(BenchmarkContext(size), names, repeat)
+        if progress:
+            for name, metrics in results[str(size)].items():
+                progress(size, name, metrics)
+    return {
+        "meta": {
+            "calibration_ms": calibrate(),
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, tolerance):
+    """Regressions of `current` against `baseline`, as readable lines
+
+    Any extra query is a regression. Median latency, scaled by the ratio of
+    the calibrations, and allocations regress when they grow by more than
+    `tolerance`, a fraction of the baseline.
+    """
+    speed = current["meta"]["calibration_ms"] / baseline["meta"]["calibration_ms"]
+    regressions = []
+    for size, scenarios in current["results"].items():
+        for name, metrics in scenarios.items():
+            base = baseline["results"].get(size, {}).get(name)
+            if base is None:
+                continue
+            label = f"{name} @ {size}"
+            if metrics["queries"] > base["queries"]:
+                regressions.append(
+                    f"{label}: queries {base['queries']} -> {metrics['queries']}"
+                )
+            for key, expected, floor in (
+                ("p50_ms", base["p50_ms"] * speed, LATENCY_FLOOR_MS),
+                ("alloc_kib", base["alloc_kib"], ALLOCATION_FLOOR_KIB),
+            ):
+                limit = max(expected * (1 + tolerance), expected + floor)
+                if metrics[key] > limit:
+                    regressions.append(f"{label}: {key} {base[key]} -> {metrics[key]}")
+    return regressions
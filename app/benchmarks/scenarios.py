@@ -0,0 +1,146 @@
+"""Requests measured by the benchmark suite
+
+Each scenario is a function taking a BenchmarkContext and sending one
+request through its client. Scenarios run against the largest collection of
+a synthetic dataset, so their cost grows with the dataset size.
+"""
+
+from core.models import Ingredient
+from core.models import Recipe
+from core.models import Tag
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.urls import reverse
+from recipe.cache import attr_list_cache
+from recipe.synthetic import DatasetGenerator
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+TOKEN_URL = reverse("user:token")
+
+PASSWORD = "password123"
+
+SCENARIOS = {}
+
+
+def scenario(name, before=None):
+    """Register a scenario, `before` runs untimed ahead of every request"""
+
+    def register(func):
+        SCENARIOS[name] = (func, before)
+        return func
+
+    return register
+
+
+class BenchmarkContext:
+    """A synthetic dataset and an authenticated client for its largest user"""
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        generator = DatasetGenerator(
+            users=10,
+            recipes=size,
+            seed=seed,
+            email_domain=f"bench{size}.example.com",
+            password=PASSWORD,
+        )
+        generator.run()
+        largest = (
+            Recipe.objects.filter(user__email__endswith=f"@{generator.email_domain}")
+            .values("user")
+            .annotate(recipes=Count("id"))
+            .order_by("-recipes", "user")
+            .first()
+        )
+        self.user = get_user_model().objects.get(pk=largest["user"])
+        token, _ = Token.objects.get_or_create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        recipes = Recipe.objects.filter(user=self.user).order_by("id")
+        self.recipe_id = recipes.values_list("id", flat=True)[recipes.count() // 2]
+        self.popular_tags = list(
+            Tag.objects.filter(user=self.user)
+            .annotate(recipes=Count("recipe"))
+            .order_by("-recipes", "id")
+            .values_list("name", "id")[:2]
+        )
+        self.ingredient_names = list(
+            Ingredient.objects.filter(user=self.user)
+            .order_by("id")
+            .values_list("name", flat=True)[:3]
+        )
+        self.writes = 0
+
+    def recipe_payload(self):
+        self.writes += 1
+        return {
+            "title": f"Benchmark stew {self.writes}",
+            "time_minutes": 30,
+            "price": "9.50",
+            "tags": [{"name": name} for name, _ in self.popular_tags],
+            "ingredients": [{"name": name} for name in self.ingredient_names],
+        }
+
+
+def _clear_attr_cache(ctx):
+    attr_list_cache.invalidate(ctx.user.pk, Tag, Ingredient)
+
+
+@scenario("recipe-list")
+def recipe_list(ctx):
+    return ctx.client.get(RECIPES_URL)
+
+
+@scenario("recipe-list-filtered")
+def recipe_list_filtered(ctx):
+    tags = ",".join(str(tag_id) for _, tag_id in ctx.popular_tags)
+    return ctx.client.get(RECIPES_URL, {"tags": tags})
+
+
+@scenario("recipe-detail")
+def recipe_detail(ctx):
+    return ctx.client.get(reverse("recipe:recipe-detail", args=[ctx.recipe_id]))
+
+
+@scenario("recipe-create")
+def recipe_create(ctx):
+    return ctx.client.post(RECIPES_URL, ctx.recipe_payload(), format="json")
+
+
+@scenario("recipe-update")
+def recipe_update(ctx):
+    payload = ctx.recipe_payload()
+    # Alternate the tags so every update changes the links
+    if ctx.writes % 2:
+        payload["tags"] = payload["tags"][:1]
+    return ctx.client.patch(
+        reverse("recipe:recipe-detail", args=[ctx.recipe_id]), payload, format="json"
+    )
+
+
+@scenario("tag-list", before=_clear_attr_cache)
+def tag_list(ctx):
+    return ctx.client.get(TAGS_URL)
+
+
+@scenario("tag-list-cached")
+def tag_list_cached(ctx):
+    return ctx.client.get(TAGS_URL)
+
+
+@scenario("ingredient-list", before=_clear_attr_cache)
+def ingredient_list(ctx):
+    return ctx.client.get(INGREDIENTS_URL)
+
+
+@scenario("token-create")
+def token_create(ctx):
+    return APIClient().post(
+        TOKEN_URL, {"email": ctx.user.email, "password": PASSWORD}
+    )
@@ -0,0 +1,87 @@
+"""Tests for the benchmark runner"""
+
+import copy
+from unittest import mock
+
+from benchmarks import runner
+from benchmarks.scenarios import SCENARIOS
+from django.test import SimpleTestCase
+from django.test import TestCase
+
+
+BASELINE = {
+    "meta": {"calibration_ms": 30.0},
+    "results": {
+        "100": {
+            "recipe-list": {"p50_ms": 10.0, "queries": 4, "alloc_kib": 200.0},
+        },
+    },
+}
+
+
+def current(calibration_ms=30.0, **metrics):
+    results = copy.deepcopy(BASELINE)
+    results["meta"]["calibration_ms"] = calibration_ms
+    results["results"]["100"]["recipe-list"].update(metrics)
+    return results
+
+
+class CompareTests(SimpleTestCase):
+    def test_unchanged(self):
+        self.assertEqual(runner.compare(BASELINE, current(), 0.25), [])
+
+    def test_extra_query(self):
+        regressions = runner.compare(BASELINE, current(queries=5), 0.25)
+
+        self.assertEqual(regressions, ["recipe-list @ 100: queries 4 -> 5"])
+
+    def test_fewer_queries(self):
+        self.assertEqual(runner.compare(BASELINE, current(queries=3), 0.25), [])
+
+    def test_latency_tolerance(self):
+        self.assertEqual(runner.compare(BASELINE, current(p50_ms=12.4), 0.25), [])
+        regressions = runner.compare(BASELINE, current(p50_ms=12.6), 0.25)
+
+        self.assertEqual(regressions, ["recipe-list @ 100: p50_ms 10.0 -> 12.6"])
+
+    def test_latency_scaled_by_calibration(self):
+        slower_machine = current(calibration_ms=60.0, p50_ms=20.0)
+
+        self.assertEqual(runner.compare(BASELINE, slower_machine, 0.25), [])
+
+    def test_floors(self):
+        fast = copy.deepcopy(BASELINE)
+        fast["results"]["100"]["recipe-list"].update(p50_ms=1.0, alloc_kib=4.0)
+
+        self.assertEqual(
+            runner.compare(fast, current(p50_ms=2.9, alloc_kib=19.0), 0.25), []
+        )
+
+    def test_new_scenario_ignored(self):
+        results = current()
+        results["results"]["1000"] = results["results"].pop("100")
+
+        self.assertEqual(runner.compare(BASELINE, results, 0.25), [])
+
+
+@mock.patch.object(runner, "WARMUP", 1)
+class RunTests(TestCase):
+    def test_every_scenario_reports(self):
+        results = runner.run([20], repeat=2)
+
+        self.assertEqual(set(results["results"]["20"]), set(SCENARIOS))
+        for name, metrics in results["results"]["20"].items():
+            with self.subTest(name):
+                self.assertGreater(metrics["queries"], 0)
+                self.assertGreater(metrics["alloc_kib"], 0)
+                self.assertLessEqual(metrics["p50_ms"], metrics["max_ms"])
+        self.assertGreater(results["meta"]["calibration_ms"], 0)
+
+    def test_unknown_scenario(self):
+        with self.assertRaises(runner.BenchmarkError):
+            runner.run([20], repeat=1, scenarios=["nope"])
+
+    def test_results_compare_with_themselves(self):
+        results = runner.run([20], repeat=1, scenarios=["recipe-list"])
+
+        self.assertEqual(runner.compare(results, results, 0), [])
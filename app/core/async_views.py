@@ -0,0 +1,54 @@
+"""Async views for the ASGI entrypoint
+
+Django 4.0 has no async ORM, so the read endpoints keep their DRF views and
+run them on a thread pool instead of the single thread Django uses for sync
+views under ASGI. Reads can then overlap, while slow clients are fed from the
+event loop without tying up a thread.
+"""
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponseNotAllowed
+from django.http import JsonResponse
+
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def pooled_read_view(view):
+    """Async view serving reads of `view` from the thread pool
+
+    Writes keep going through Django's thread sensitive path.
+    """
+
+    def run(request, *args, **kwargs):
+        try:
+            response = view(request, *args, **kwargs)
+            # Render in the worker so serialization overlaps too
+            if callable(getattr(response, "render", None)):
+                response.render()
+            return response
+        finally:
+            # Pool threads are not covered by request_finished
+            close_old_connections()
+
+    pooled = sync_to_async(run, thread_sensitive=False)
+    threaded = sync_to_async(view)
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            return await pooled(request, *args, **kwargs)
+        return await threaded(request, *args, **kwargs)
+
+    return async_view
+
+
+async def health_check(request):
+    """Return success response"""
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    # Same bytes as the DRF view
+    return JsonResponse({"healthy": True}, json_dumps_params={"separators": (",", ":")})
@@ -0,0 +1,135 @@
+"""Token authentication with a cached token lookup"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from core import perf
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+
+def _copy(credentials):
+    """Hand each request its own user and token instances"""
+    user, token = credentials
+    return copy.copy(user), copy.copy(token)
+
+
+class TokenCache:
+    """Bounded token -> (user, token) map with a TTL and a shared tier
+
+    Entries are stamped with their token's revocation epoch, read before the
+    database lookup they cache. Revoking a token moves its epoch on; with a
+    shared cache alias the epochs live there, so one revocation reaches every
+    process on its next request.
+    """
+
+    epoch_prefix = "token-auth:epoch"
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local_epochs = {}
+
+    @property
+    def options(self):
+        return settings.TOKEN_AUTH_CACHE
+
+    @property
+    def shared(self):
+        alias = self.options.get("SHARED_ALIAS")
+        return caches[alias] if alias else None
+
+    def _epoch_key(self, key):
+        return f"{self.epoch_prefix}:{key}"
+
+    def epoch(self, key):
+        if self.shared is None:
+            return self._local_epochs.get(key, 0)
+        epoch_key = self._epoch_key(key)
+        epoch = self.shared.get(epoch_key)
+        if epoch is None:
+            # Start from a fresh value so entries stamped with an evicted
+            # epoch can never match again.
+            self.shared.add(epoch_key, time.time_ns(), timeout=None)
+            epoch = self.shared.get(epoch_key)
+        return epoch
+
+    def _shared_key(self, epoch, key):
+        return f"token-auth:{epoch}:{key}"
+
+    def get(self, key, epoch):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_epoch, expires, credentials = entry
+                if entry_epoch == epoch and expires > now:
+                    self._entries.move_to_end(key)
+                    return _copy(credentials)
+                del self._entries[key]
+
+        if self.shared is not None:
+            credentials = self.shared.get(self._shared_key(epoch, key))
+            if credentials is not None:
+                self._store(key, epoch, credentials)
+                return _copy(credentials)
+        return None
+
+    def set(self, key, credentials, epoch):
+        """Cache credentials looked up while `epoch` was current"""
+        self._store(key, epoch, credentials)
+        if self.shared is not None:
+            self.shared.set(
+                self._shared_key(epoch, key),
+                credentials,
+                timeout=self.options["TIMEOUT"],
+            )
+
+    def _store(self, key, epoch, credentials):
+        expires = time.monotonic() + self.options["TIMEOUT"]
+        with self._lock:
+            self._entries[key] = (epoch, expires, _copy(credentials))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.options["MAX_SIZE"]:
+                self._entries.popitem(last=False)
+
+    def revoke(self, key):
+        """Forget one token, here and through its epoch in every process"""
+        with self._lock:
+            self._entries.pop(key, None)
+            if self.shared is None:
+                self._local_epochs[key] = self._local_epochs.get(key, 0) + 1
+        if self.shared is not None:
+            try:
+                self.shared.incr(self._epoch_key(key))
+            except ValueError:
+                self.shared.set(self._epoch_key(key), time.time_ns(), timeout=None)
+
+    def clear(self):
+        """Drop this process's entries, revoking nothing"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in TokenAuthentication that skips the token lookup on cache hits"""
+
+    def authenticate_credentials(self, key):
+        # Read the epoch before the lookup so a revocation racing with it
+        # leaves the new entry stale instead of cached.
+        epoch = token_cache.epoch(key)
+        credentials = token_cache.get(key, epoch)
+        perf.record_cache(credentials is not None)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials, epoch)
+        return credentials
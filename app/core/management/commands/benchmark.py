@@ -0,0 +1,99 @@
+"""Run the endpoint benchmarks against a throwaway database"""
+
+import json
+import sys
+from pathlib import Path
+
+from benchmarks import runner
+from benchmarks.scenarios import SCENARIOS
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.test.utils import setup_databases
+from django.test.utils import setup_test_environment
+from django.test.utils import teardown_databases
+from django.test.utils import teardown_test_environment
+
+
+DEFAULT_BASELINE = Path(runner.__file__).with_name("baselines.json")
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the recipe, tag, ingredient and token endpoints on "
+        "synthetic datasets of several sizes, in a test database. Exits with "
+        "status 1 when a result regresses past the baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[100, 1000, 10000],
+            help="Recipes in each dataset",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=list(SCENARIOS),
+            help="Only run this scenario, can be repeated",
+        )
+        parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed growth of latency and allocations, as a fraction",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Write the results to the baseline instead of comparing",
+        )
+        parser.add_argument("--output", type=Path, help="Also write results here")
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        def progress(size, name, metrics):
+            self.stdout.write(
+                f"{size:>8} {name:<22} p50 {metrics['p50_ms']:>9.2f}ms "
+                f"p95 {metrics['p95_ms']:>9.2f}ms {metrics['queries']:>3} queries "
+                f"{metrics['alloc_kib']:>9.1f}KiB"
+            )
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            results = runner.run(
+                options["sizes"],
+                options["repeat"],
+                scenarios=options["scenario"],
+                progress=progress,
+            )
+        except runner.BenchmarkError as exc:
+            raise CommandError(str(exc))
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        content = json.dumps(results, indent=2) + "\n"
+        if options["output"]:
+            options["output"].write_text(content)
+        if options["save_baseline"]:
+            options["baseline"].write_text(content)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['baseline']}"))
+            return
+
+        if not options["baseline"].exists():
+            self.stdout.write(f"No baseline at {options['baseline']}")
+            return
+        baseline = json.loads(options["baseline"].read_text())
+        regressions = runner.compare(baseline, results, options["tolerance"])
+        if regressions:
+            for line in regressions:
+                self.stderr.write(line)
+            sys.exit(1)
+        self.stdout.write(self.style.SUCCESS("No regressions"))
@@ -0,0 +1,46 @@
+"""Write the OpenAPI schema artifact served at /api/schema/"""
+
+import json
+import sys
+
+from core.schema import generate_schema
+from core.schema import render_artifact
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema and write it to settings.API_SCHEMA_FILE. "
+        "With --check, exit with status 1 when the artifact is missing or out "
+        "of date with the code instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Compare the artifact with the code without writing it",
+        )
+
+    def handle(self, *args, **options):
+        path = settings.API_SCHEMA_FILE
+        content = render_artifact(generate_schema())
+
+        if options["check"]:
+            try:
+                with open(path, "rb") as artifact:
+                    current = json.load(artifact)
+            except FileNotFoundError:
+                current = None
+            if current != json.loads(content):
+                self.stderr.write(
+                    f"{path} is stale, run `python manage.py build_api_schema`"
+                )
+                sys.exit(1)
+            self.stdout.write(self.style.SUCCESS(f"{path} is up to date"))
+            return
+
+        with open(path, "wb") as artifact:
+            artifact.write(content + b"\n")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
@@ -1,6 +1,45 @@
+"""Django command to wait for the database to be available"""
+
+import time
+
 from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db.utils import OperationalError
+from psycopg2 import OperationalError as Psycopg2Error
+
 
-class Commands(BaseCommand):
+class Command(BaseCommand):
+    help = "Poll the database with exponential backoff until it accepts queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60,
+            help="Seconds to keep trying before giving up",
+        )
+        parser.add_argument("--initial-delay", type=float, default=0.5)
+        parser.add_argument("--max-delay", type=float, default=5)
 
     def handle(self, *args, **options):
-        pass
\ No newline at end of file
+        self.stdout.write("Waiting for database...")
+        deadline = time.monotonic() + options["timeout"]
+        delay = options["initial_delay"]
+        attempts = 1
+        while True:
+            try:
+                self.check(databases=[options["database"]])
+                break
+            except (Psycopg2Error, OperationalError) as exc:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f"Database unavailable after {attempts} attempts: {exc}"
+                    )
+                self.stdout.write(f"Database unavailable, retrying in {delay:g}s")
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, options["max_delay"])
+                attempts += 1
+
+        self.stdout.write(self.style.SUCCESS("Database available!"))
@@ -0,0 +1,49 @@
+# Generated by Django 4.0.10 on 2026-10-18 17:09
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Fold duplicate tag and ingredient names into the oldest row"""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field_name in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through
+        related_id = f'{field.m2m_reverse_field_name()}_id'
+        duplicates = (
+            model.objects.values('user_id', 'name')
+            .annotate(keep=Min('id'), copies=Count('id'))
+            .filter(copies__gt=1)
+        )
+        for duplicate in duplicates:
+            keep = duplicate['keep']
+            drop = list(
+                model.objects.filter(user_id=duplicate['user_id'], name=duplicate['name'])
+                .exclude(id=keep)
+                .values_list('id', flat=True)
+            )
+            linked = set(
+                through.objects.filter(**{f'{related_id}__in': drop})
+                .values_list('recipe_id', flat=True)
+            )
+            linked -= set(
+                through.objects.filter(**{related_id: keep})
+                .values_list('recipe_id', flat=True)
+            )
+            through.objects.bulk_create(
+                [through(recipe_id=recipe_id, **{related_id: keep}) for recipe_id in linked]
+            )
+            model.objects.filter(id__in=drop).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.0.10 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+# (M2M field, related column, composite index name)
+THROUGH_INDEXES = (
+    ('tags', 'tag_id', 'recipe_tags_tag_recipe_idx'),
+    ('ingredients', 'ingredient_id', 'recipe_ingredients_ing_recipe_idx'),
+)
+
+
+def widen_through_indexes(apps, schema_editor):
+    """Replace the single column FK index on through tables with a composite one
+
+    Filtering probes the through tables from the tag and ingredient side, and
+    the composite (related_id, recipe_id) index also covers the old lookups.
+    The FK index is dropped behind the migration state's back, which still
+    assumes it exists; Django finds FK indexes by introspection when it alters
+    or removes the field, so a missing one is tolerated.
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    connection = schema_editor.connection
+    quote = schema_editor.quote_name
+    for field_name, column, index_name in THROUGH_INDEXES:
+        table = Recipe._meta.get_field(field_name).remote_field.through._meta.db_table
+        schema_editor.execute(
+            f'CREATE INDEX {quote(index_name)} ON {quote(table)} '
+            f'({quote(column)}, "recipe_id")'
+        )
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+        for name, info in constraints.items():
+            if info['index'] and not info['unique'] and info['columns'] == [column]:
+                schema_editor.execute(f'DROP INDEX {quote(name)}')
+
+
+def narrow_through_indexes(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    quote = schema_editor.quote_name
+    for field_name, column, index_name in THROUGH_INDEXES:
+        table = Recipe._meta.get_field(field_name).remote_field.through._meta.db_table
+        schema_editor.execute(f'DROP INDEX {quote(index_name)}')
+        # Not the name Django would generate, FK indexes are found by columns
+        schema_editor.execute(
+            f'CREATE INDEX {quote(f"{table}_{column}_idx")} ON {quote(table)} '
+            f'({quote(column)})'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_merge_duplicate_attr_names'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-id'], name='recipe_user_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_ingredient_name_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_name_per_user'),
+        ),
+        migrations.RunPython(widen_through_indexes, narrow_through_indexes),
+    ]
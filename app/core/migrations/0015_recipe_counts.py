@@ -0,0 +1,93 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:15
+
+from django.db import migrations, models
+
+
+# (link table, related column, counted table)
+LINK_TABLES = (
+    ('core_recipe_tags', 'tag_id', 'core_tag'),
+    ('core_recipe_ingredients', 'ingredient_id', 'core_ingredient'),
+)
+
+# Statement level triggers apply one grouped update per INSERT or DELETE on
+# the link table, however many links it touches. Rows are locked in id
+# order first so concurrent writers to the same user's tags cannot deadlock.
+CREATE_TRIGGERS = """
+CREATE FUNCTION {counted}_recipe_count_update() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM 1 FROM {counted}
+            WHERE id IN (SELECT {column} FROM new_links)
+            ORDER BY id FOR NO KEY UPDATE;
+        UPDATE {counted} SET recipe_count = recipe_count + delta.links
+            FROM (
+                SELECT {column}, count(*) AS links FROM new_links GROUP BY {column}
+            ) AS delta
+            WHERE {counted}.id = delta.{column};
+    ELSE
+        PERFORM 1 FROM {counted}
+            WHERE id IN (SELECT {column} FROM old_links)
+            ORDER BY id FOR NO KEY UPDATE;
+        UPDATE {counted} SET recipe_count = recipe_count - delta.links
+            FROM (
+                SELECT {column}, count(*) AS links FROM old_links GROUP BY {column}
+            ) AS delta
+            WHERE {counted}.id = delta.{column};
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER {links}_count_insert
+    AFTER INSERT ON {links} REFERENCING NEW TABLE AS new_links
+    FOR EACH STATEMENT EXECUTE FUNCTION {counted}_recipe_count_update();
+
+CREATE TRIGGER {links}_count_delete
+    AFTER DELETE ON {links} REFERENCING OLD TABLE AS old_links
+    FOR EACH STATEMENT EXECUTE FUNCTION {counted}_recipe_count_update();
+
+UPDATE {counted} SET recipe_count = existing.links
+    FROM (SELECT {column}, count(*) AS links FROM {links} GROUP BY {column}) AS existing
+    WHERE {counted}.id = existing.{column};
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER {links}_count_insert ON {links};
+DROP TRIGGER {links}_count_delete ON {links};
+DROP FUNCTION {counted}_recipe_count_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_attr_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        *(
+            migrations.RunSQL(
+                CREATE_TRIGGERS.format(links=links, column=column, counted=counted),
+                DROP_TRIGGERS.format(links=links, counted=counted),
+            )
+            for links, column, counted in LINK_TABLES
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(condition=models.Q(('recipe_count__gt', 0)), fields=['user', 'name', 'id'], name='ingredient_assigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(condition=models.Q(('recipe_count__gt', 0)), fields=['user', 'name', 'id'], name='tag_assigned_idx'),
+        ),
+    ]
@@ -0,0 +1,138 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:28
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+# Statement level triggers on core_recipe apply the net change in references
+# per image name for each INSERT, UPDATE or DELETE. Updates only count rows
+# whose image changed, so the common writes that leave it alone return before
+# touching core_imageblob; blobs are shared by many recipes and locking them
+# would serialize those writes. Changed rows are locked in name order, the
+# same order the garbage collector and new inserts use, so concurrent
+# writers cannot deadlock. Releasing the last reference restarts the grace
+# period before the blob can be collected.
+CREATE_TRIGGERS = """
+CREATE FUNCTION core_imageblob_adjust(names text[], changes bigint[])
+RETURNS void AS $$
+BEGIN
+    PERFORM 1 FROM core_imageblob
+        WHERE name = ANY(names)
+        ORDER BY name FOR NO KEY UPDATE;
+    WITH delta AS (
+        SELECT name, change FROM unnest(names, changes) AS delta (name, change)
+    ), referenced AS (
+        INSERT INTO core_imageblob (name, refcount, touched_at)
+            SELECT name, change, clock_timestamp() FROM delta
+            WHERE change > 0
+            ORDER BY name
+            ON CONFLICT (name) DO UPDATE
+                SET refcount = core_imageblob.refcount + EXCLUDED.refcount
+    )
+    UPDATE core_imageblob
+        SET refcount = refcount + delta.change, touched_at = clock_timestamp()
+        FROM delta
+        WHERE core_imageblob.name = delta.name AND delta.change < 0;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION core_recipe_image_refcount() RETURNS trigger AS $$
+DECLARE
+    names text[];
+    changes bigint[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(image), array_agg(recipes) INTO names, changes
+            FROM (
+                SELECT image, count(*) AS recipes FROM new_recipes
+                WHERE image <> ''
+                GROUP BY image
+            ) AS delta;
+    ELSIF TG_OP = 'UPDATE' THEN
+        SELECT array_agg(image), array_agg(change) INTO names, changes
+            FROM (
+                SELECT image, sum(change) AS change FROM (
+                    SELECT new_row.image, 1 AS change
+                        FROM old_recipes AS old_row
+                        JOIN new_recipes AS new_row USING (id)
+                        WHERE old_row.image IS DISTINCT FROM new_row.image
+                    UNION ALL
+                    SELECT old_row.image, -1
+                        FROM old_recipes AS old_row
+                        JOIN new_recipes AS new_row USING (id)
+                        WHERE old_row.image IS DISTINCT FROM new_row.image
+                ) AS changed
+                WHERE image <> ''
+                GROUP BY image
+                HAVING sum(change) <> 0
+            ) AS delta;
+    ELSE
+        SELECT array_agg(image), array_agg(-recipes) INTO names, changes
+            FROM (
+                SELECT image, count(*) AS recipes FROM old_recipes
+                WHERE image <> ''
+                GROUP BY image
+            ) AS delta;
+    END IF;
+    IF names IS NOT NULL THEN
+        PERFORM core_imageblob_adjust(names, changes);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_image_insert
+    AFTER INSERT ON core_recipe REFERENCING NEW TABLE AS new_recipes
+    FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_image_refcount();
+
+CREATE TRIGGER core_recipe_image_update
+    AFTER UPDATE ON core_recipe
+    REFERENCING OLD TABLE AS old_recipes NEW TABLE AS new_recipes
+    FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_image_refcount();
+
+CREATE TRIGGER core_recipe_image_delete
+    AFTER DELETE ON core_recipe REFERENCING OLD TABLE AS old_recipes
+    FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_image_refcount();
+
+INSERT INTO core_imageblob (name, refcount, touched_at)
+    SELECT image, count(*), clock_timestamp() FROM core_recipe
+    WHERE image <> ''
+    GROUP BY image;
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER core_recipe_image_insert ON core_recipe;
+DROP TRIGGER core_recipe_image_update ON core_recipe;
+DROP TRIGGER core_recipe_image_delete ON core_recipe;
+DROP FUNCTION core_recipe_image_refcount();
+DROP FUNCTION core_imageblob_adjust(text[], bigint[]);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_recipe_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('touched_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.get_recipe_image_storage, upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.AddIndex(
+            model_name='imageblob',
+            index=models.Index(condition=models.Q(('refcount', 0)), fields=['touched_at'], name='imageblob_garbage_idx'),
+        ),
+    ]
@@ -1,11 +1,17 @@
 import uuid
 import os
 
+from core.storage import get_recipe_image_storage
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth.models import BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection
 from django.db import models
+from django.db.models import F
+from django.db.models import Q
 
 
 def recipe_image_file_path(instance, filename):
@@ -24,6 +30,10 @@ class UserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+    def bump_collection_version(self, user_id):
+        """Mark the user's recipes, tags or ingredients as changed"""
+        self.filter(pk=user_id).update(collection_version=F("collection_version") + 1)
+
     def create_superuser(self, email, password):
         user = self.create_user(email, password)
         user.is_staff = True
@@ -39,6 +49,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     username = models.CharField(max_length=255, null=True)
+    collection_version = models.PositiveBigIntegerField(default=0)
 
     objects = UserManager()
 
@@ -46,6 +57,13 @@ class User(AbstractBaseUser, PermissionsMixin):
 
 
 class Recipe(models.Model):
+    class ImageStatus(models.TextChoices):
+        NONE = "none"
+        PENDING = "pending"
+        PROCESSING = "processing"
+        READY = "ready"
+        FAILED = "failed"
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -54,23 +72,131 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField("Tag")
     ingredients = models.ManyToManyField("Ingredient")
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True, upload_to=recipe_image_file_path, storage=get_recipe_image_storage
+    )
+    image_status = models.CharField(
+        max_length=16, choices=ImageStatus.choices, default=ImageStatus.NONE
+    )
+    # Maintained by a database trigger from title and description
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-id"], name="recipe_user_id_idx"),
+            GinIndex(fields=["search_vector"], name="recipe_search_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
 
-class Tag(models.Model):
+class RecipeAttr(models.Model):
+    """Base for tags and ingredients, whose recipe_count the database keeps"""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # The loaded count may be stale by now, writing it back would undo
+        # the link table triggers, so updates never include it.
+        if not self._state.adding and not kwargs.get("force_insert"):
+            update_fields = kwargs.get("update_fields")
+            if update_fields is None:
+                update_fields = [
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key
+                ]
+            kwargs["update_fields"] = [
+                name for name in update_fields if name != "recipe_count"
+            ]
+        super().save(*args, **kwargs)
+
+
+class Tag(RecipeAttr):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Maintained by database triggers on the recipe link table
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # Keeps nested tags and ingredients in a stable order in responses
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="unique_tag_name_per_user"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "name", "id"],
+                condition=Q(recipe_count__gt=0),
+                name="tag_assigned_idx",
+            )
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Ingredient(models.Model):
+class Ingredient(RecipeAttr):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Maintained by database triggers on the recipe link table
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # Keeps nested tags and ingredients in a stable order in responses
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="unique_ingredient_name_per_user"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "name", "id"],
+                condition=Q(recipe_count__gt=0),
+                name="ingredient_assigned_idx",
+            )
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ImageBlobManager(models.Manager):
+    def touch(self, name):
+        """Register a blob about to be written, or keep an existing one alive"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self.model._meta.db_table} (name, refcount, touched_at) "
+                "VALUES (%s, 0, clock_timestamp()) "
+                "ON CONFLICT (name) DO UPDATE SET touched_at = EXCLUDED.touched_at",
+                [name],
+            )
+
+
+class ImageBlob(models.Model):
+    """A stored image file, shared by every recipe whose image it is"""
+
+    name = models.CharField(max_length=255, primary_key=True)
+    # Recipes whose image is this blob, maintained by database triggers
+    refcount = models.PositiveIntegerField(default=0)
+    # Last write or release, garbage is only collected after a grace period
+    touched_at = models.DateTimeField()
+
+    objects = ImageBlobManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["touched_at"],
+                condition=Q(refcount=0),
+                name="imageblob_garbage_idx",
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -0,0 +1,218 @@
+"""Per-request performance instrumentation
+
+RequestPerformanceMiddleware measures every request and reports it in a
+Server-Timing header and a structured log line:
+
+- total time;
+- database query count and time, through a connection execute wrapper;
+- serializer time, through `timer("serializer")` and TimedSerializerMixin;
+- cache hits and misses, through `record_cache()`.
+
+Requests over the thresholds in settings.REQUEST_PERF are logged as warnings
+with their slowest SQL statements. Metrics live in a context variable, so
+work done for the request on other threads, such as the ASGI read pool, is
+counted too.
+"""
+
+import contextlib
+import heapq
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Measurements of one request"""
+
+    def __init__(self, slow_sql_count):
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.label = None
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.timings = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._slow_sql_count = slow_sql_count
+        self._slowest = []
+        self._active = {}
+
+    def add_query(self, sql, seconds):
+        self.db_queries += 1
+        self.db_seconds += seconds
+        # Keep only the slowest statements so bulk requests stay bounded
+        entry = (seconds, self.db_queries, sql)
+        if len(self._slowest) < self._slow_sql_count:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest_queries(self):
+        return [
+            {"ms": _ms(seconds), "sql": sql[:1000]}
+            for seconds, _, sql in sorted(self._slowest, reverse=True)
+        ]
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self.started
+
+    def as_dict(self, request, response):
+        return {
+            "method": request.method,
+            "path": request.path,
+            "view": self.label,
+            "status": response.status_code,
+            "total_ms": _ms(self.seconds),
+            "db_queries": self.db_queries,
+            "db_ms": _ms(self.db_seconds),
+            "serializer_ms": _ms(self.timings.get("serializer", 0.0)),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+@contextlib.contextmanager
+def timer(name):
+    """Add the time spent in the block to the `name` timing
+
+    Nested blocks with the same name are only counted once.
+    """
+    metrics = _current.get()
+    if metrics is None or metrics._active.get(name):
+        yield
+        return
+    metrics._active[name] = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._active[name] = False
+        metrics.timings[name] = (
+            metrics.timings.get(name, 0.0) + time.perf_counter() - started
+        )
+
+
+def record_cache(hit):
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+# No docstring: drf-spectacular would use it to describe every serializer
+class TimedSerializerMixin:
+    def to_representation(self, instance):
+        with timer("serializer"):
+            return super().to_representation(instance)
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - started)
+
+
+def install(connection):
+    """Time the queries `connection` runs for instrumented requests"""
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+@receiver(connection_created)
+def _install_on_connect(sender, connection, **kwargs):
+    # Covers connections opened by other threads, e.g. the ASGI read pool
+    install(connection)
+
+
+def _label(view_func, method):
+    view_class = getattr(view_func, "cls", None)
+    if view_class is None:
+        return f"{view_func.__module__}.{view_func.__name__}"
+    actions = getattr(view_func, "actions", None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f"{view_class.__name__}.{action}"
+
+
+def _server_timing(metrics):
+    return ", ".join(
+        [
+            f"total;dur={_ms(metrics.seconds)}",
+            f'db;dur={_ms(metrics.db_seconds)};desc="{metrics.db_queries} queries"',
+            f"serializer;dur={_ms(metrics.timings.get('serializer', 0.0))}",
+            f'cache;desc="hits={metrics.cache_hits} misses={metrics.cache_misses}"',
+        ]
+    )
+
+
+class RequestPerformanceMiddleware:
+    """Record where each request's time goes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @property
+    def options(self):
+        return settings.REQUEST_PERF
+
+    def __call__(self, request):
+        options = self.options
+        if not options["ENABLED"]:
+            return self.get_response(request)
+
+        for connection in connections.all():
+            install(connection)
+        metrics = RequestMetrics(options["SLOW_SQL_COUNT"])
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        metrics.stop()
+
+        if options["SERVER_TIMING"]:
+            response["Server-Timing"] = _server_timing(metrics)
+        self.report(request, response, metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.label = _label(view_func, request.method)
+
+    def report(self, request, response, metrics):
+        record = metrics.as_dict(request, response)
+        options = self.options
+        slow = (
+            record["total_ms"] > options["SLOW_REQUEST_MS"]
+            or record["db_ms"] > options["SLOW_DB_MS"]
+            or record["db_queries"] > options["SLOW_QUERY_COUNT"]
+        )
+        if slow:
+            record["slowest_queries"] = metrics.slowest_queries()
+            logger.warning(
+                "Slow request %s", json.dumps(record), extra={"perf": record}
+            )
+        elif logger.isEnabledFor(logging.INFO):
+            logger.info("Request %s", json.dumps(record), extra={"perf": record})
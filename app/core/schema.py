@@ -0,0 +1,105 @@
+"""OpenAPI schema served from a precomputed artifact
+
+Introspecting every viewset and serializer takes far longer than serving
+the result, so `manage.py build_api_schema` writes the schema to
+settings.API_SCHEMA_FILE and PrecomputedSchemaView serves it. Each process
+loads the artifact once, or generates the schema on the first request when
+there is no artifact, and keeps every rendering of it in memory with an
+ETag.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from drf_spectacular.renderers import OpenApiJsonRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.renderers import JSONRenderer
+
+
+logger = logging.getLogger(__name__)
+
+
+def generate_schema():
+    """Introspect the API and return the schema as a dict"""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return generator.get_schema(request=None, public=True)
+
+
+def render_artifact(schema):
+    """Serialize `schema` as stored in the artifact"""
+    renderer_context = {"indent": 2}
+    return OpenApiJsonRenderer().render(schema, renderer_context=renderer_context)
+
+
+@functools.lru_cache(maxsize=None)
+def get_schema():
+    """The schema of this process, from the artifact when there is one"""
+    try:
+        with open(settings.API_SCHEMA_FILE, "rb") as artifact:
+            return json.load(artifact)
+    except FileNotFoundError:
+        logger.warning(
+            "No API schema artifact at %s, generating it",
+            settings.API_SCHEMA_FILE,
+        )
+    # Round trip so the schema matches what a loaded artifact would hold
+    return json.loads(render_artifact(generate_schema()))
+
+
+# Keyed on the renderer and the few indents JSON renderers accept, never on
+# the client's Accept header, so requests cannot grow it.
+@functools.lru_cache(maxsize=32)
+def render_schema(renderer_class, indent=None):
+    """Rendered schema and its ETag"""
+    content = renderer_class().render(get_schema(), None, {"indent": indent})
+    return content, f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def clear_cache():
+    get_schema.cache_clear()
+    render_schema.cache_clear()
+
+
+class PrecomputedSchemaView(SpectacularAPIView):
+    """
+    OpenApi3 schema for this API, served from a precomputed artifact with an
+    ETag. Format can be selected via content negotiation.
+
+    - YAML: application/vnd.oai.openapi
+    - JSON: application/vnd.oai.openapi+json
+    """
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        # The artifact holds the default language and version only
+        if (
+            not settings.API_SCHEMA_PRECOMPUTED
+            or request.GET.get("lang")
+            or request.GET.get("version")
+        ):
+            return super().get(request, *args, **kwargs)
+
+        renderer = request.accepted_renderer
+        indent = None
+        if isinstance(renderer, JSONRenderer):
+            indent = renderer.get_indent(request.accepted_media_type, {})
+        content, etag = render_schema(type(renderer), indent)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type = f"{content_type}; charset={renderer.charset}"
+            response = HttpResponse(content, content_type=content_type)
+            response["Content-Disposition"] = (
+                f'inline; filename="{self._get_filename(request, None)}"'
+            )
+        response["ETag"] = etag
+        return response
@@ -0,0 +1,49 @@
+"""Signal handlers for core models"""
+
+from core.authentication import token_cache
+from core.models import Ingredient
+from core.models import Recipe
+from core.models import Tag
+from core.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_collection_version(sender, instance, **kwargs):
+    """Invalidate ETags handed out for the owner's collection"""
+    User.objects.bump_collection_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Token)
+def revoke_deleted_token(sender, instance, **kwargs):
+    """Deleted tokens must not authenticate"""
+    _revoke_on_commit([instance.key])
+
+
+@receiver(post_save, sender=User)
+def revoke_user_tokens(sender, instance, created, **kwargs):
+    """Changed or deactivated users must not be served from the cache"""
+    if not created:
+        keys = Token.objects.filter(user=instance).values_list("key", flat=True)
+        _revoke_on_commit(keys)
+
+
+def _revoke_on_commit(keys):
+    # After commit, so a lookup racing with the change can only cache the old
+    # row under the epoch this moves past.
+    keys = list(keys)
+
+    def revoke():
+        for key in keys:
+            token_cache.revoke(key)
+
+    transaction.on_commit(revoke)
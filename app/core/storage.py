@@ -0,0 +1,88 @@
+"""Content-addressed storage for recipe images
+
+Files are named by the SHA-256 of their content and sharded into two levels
+of directories, so identical uploads share one file. Every stored blob gets
+an ImageBlob row before its file is written; database triggers count the
+recipes referencing it, and recipe.images.collect_garbage deletes blobs
+nobody has referenced for a grace period.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that ignores the requested name and stores by hash
+
+    Files written with `save_derived` keep their name; they belong to the
+    blob whose name they extend and are collected with it.
+    """
+
+    prefix = "images"
+    incoming = ".incoming"
+
+    def blob_name(self, digest, extension):
+        return f"{self.prefix}/{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}"
+
+    def get_available_name(self, name, max_length=None):
+        # The name is replaced by the content hash in _save
+        return name
+
+    def _save(self, name, content):
+        from core.models import ImageBlob
+
+        directory = self.path(os.path.join(self.prefix, self.incoming))
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            name = self.blob_name(digest.hexdigest(), os.path.splitext(name)[1])
+            # Registering first makes the garbage collector, which holds the
+            # row lock while deleting, leave the file alone or finish first.
+            ImageBlob.objects.touch(name)
+            self._place(temp_path, name)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+    def save_derived(self, name, content):
+        """Write `content` at exactly `name`, replacing what is there"""
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                for chunk in content.chunks():
+                    temp_file.write(chunk)
+            self._place(temp_path, name, replace=True)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+    def _place(self, temp_path, name, replace=False):
+        path = self.path(name)
+        if not replace and os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(temp_path, self.file_permissions_mode)
+        # Atomic, a concurrent writer of the same blob wrote the same bytes
+        os.replace(temp_path, path)
+
+
+recipe_image_storage = ContentAddressedStorage()
+
+
+def get_recipe_image_storage():
+    return recipe_image_storage
@@ -0,0 +1,106 @@
+"""Tests for the ASGI entrypoint"""
+
+import json
+
+from app.asgi import application
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from core.models import Recipe
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+
+
+RECIPES_PATH = "/api/recipe/recipes/"
+
+
+async def asgi_request(method, path, headers=(), body=b""):
+    """Send one request through the ASGI application"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    communicator = ApplicationCommunicator(application, scope)
+    await communicator.send_input(
+        {"type": "http.request", "body": body, "more_body": False}
+    )
+    start = await communicator.receive_output(timeout=5)
+    content = b""
+    while True:
+        message = await communicator.receive_output(timeout=5)
+        content += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    await communicator.wait()
+    return start["status"], dict(start["headers"]), content
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class AsgiApplicationTests(TransactionTestCase):
+    """Pool threads use their own connections, so data must be committed"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("a@example.com", "pass123")
+        self.token = f"Token {Token.objects.create(user=self.user).key}"
+        self.auth = [(b"authorization", self.token.encode())]
+
+    def request(self, *args, **kwargs):
+        return async_to_sync(asgi_request)(*args, **kwargs)
+
+    def test_health_check(self):
+        status, _, content = self.request("GET", "/api/health-check/")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(content, b'{"healthy":true}')
+
+    @override_settings(REQUEST_PERF={**settings.REQUEST_PERF, "SERVER_TIMING": True})
+    def test_recipe_list_matches_wsgi(self):
+        Recipe.objects.create(user=self.user, title="Soup", time_minutes=5, price=2)
+
+        status, headers, content = self.request("GET", RECIPES_PATH, self.auth)
+
+        self.assertEqual(status, 200)
+        res = self.client.get(RECIPES_PATH, HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(content, res.content)
+        self.assertEqual(headers[b"ETag"].decode(), res["ETag"])
+        # Queries run on the read pool thread are still measured
+        self.assertNotIn(b'desc="0 queries"', headers[b"Server-Timing"])
+
+    def test_recipe_list_requires_auth(self):
+        status, _, _ = self.request("GET", RECIPES_PATH)
+
+        self.assertEqual(status, 401)
+
+    def test_create_recipe(self):
+        payload = {"title": "Tart", "time_minutes": 5, "price": "3.00"}
+
+        status, _, content = self.request(
+            "POST",
+            RECIPES_PATH,
+            self.auth + [(b"content-type", b"application/json")],
+            json.dumps(payload).encode(),
+        )
+
+        self.assertEqual(status, 201)
+        self.assertEqual(json.loads(content)["title"], "Tart")
+        self.assertTrue(Recipe.objects.filter(user=self.user, title="Tart").exists())
+
+    def test_unrouted_paths_fall_back_to_default_urls(self):
+        status, _, _ = self.request("GET", "/api/schema/")
+
+        self.assertEqual(status, 200)
@@ -0,0 +1,160 @@
+"""Tests for cached token authentication"""
+
+from unittest.mock import patch
+
+from core.authentication import token_cache
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+ME_URL = reverse("user:me")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+def auth_queries(ctx):
+    return [q for q in ctx.captured_queries if "authtoken_token" in q["sql"]]
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the token cache in front of TokenAuthentication"""
+
+    def setUp(self):
+        token_cache.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "auth@example.com", "pass12345", name="Auth"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_token_lookup_is_cached(self):
+        self.assertEqual(self.client.get(TAGS_URL).status_code, status.HTTP_200_OK)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(auth_queries(ctx), [])
+
+    def test_deleted_token_rejected_immediately(self):
+        self.client.get(ME_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected_immediately(self):
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_is_not_served_stale(self):
+        self.client.get(ME_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(ME_URL, {"name": "Renamed"})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data["name"], "Renamed")
+
+    def test_revocation_is_per_user(self):
+        other = get_user_model().objects.create_user("o@example.com", "pass")
+        other_token = Token.objects.create(user=other)
+        self.client.get(ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.is_active = False
+            other.save()
+            get_user_model().objects.create_user("new@example.com", "pass")
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(auth_queries(ctx), [])
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {other_token.key}")
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token invalid")
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_CACHE={"MAX_SIZE": 2, "TIMEOUT": 60})
+    def test_cache_size_is_bounded(self):
+        tokens = [
+            Token.objects.create(
+                user=get_user_model().objects.create_user(f"u{i}@example.com", "pass")
+            )
+            for i in range(4)
+        ]
+        for token in tokens:
+            self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+            self.client.get(ME_URL)
+
+        self.assertEqual(len(token_cache), 2)
+
+    @override_settings(TOKEN_AUTH_CACHE={"MAX_SIZE": 10, "TIMEOUT": 60})
+    def test_entries_expire(self):
+        self.client.get(ME_URL)
+
+        with patch("core.authentication.time.monotonic", return_value=1e12):
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(ME_URL)
+
+        self.assertEqual(len(auth_queries(ctx)), 1)
+
+    @override_settings(
+        TOKEN_AUTH_CACHE={"MAX_SIZE": 10, "TIMEOUT": 60, "SHARED_ALIAS": "default"}
+    )
+    def test_shared_tier_serves_other_processes(self):
+        self.client.get(ME_URL)
+        # Simulate another worker: its local tier is empty.
+        token_cache.clear()
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(auth_queries(ctx), [])
+
+    @override_settings(
+        TOKEN_AUTH_CACHE={"MAX_SIZE": 10, "TIMEOUT": 60, "SHARED_ALIAS": "default"}
+    )
+    def test_shared_tier_revocation(self):
+        self.client.get(ME_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        token_cache.clear()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_reaches_other_processes(self):
+        self.client.get(ME_URL)
+        entries = dict(token_cache._entries)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        # Another worker still holds the entry in its local tier
+        token_cache._entries.update(entries)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,22 +1,48 @@
 from unittest.mock import patch
-from psycopg2 import OperationalError as Psycopg2Error
+
+from django.core.management import CommandError
 from django.core.management import call_command
 from django.db.utils import OperationalError
 from django.test import SimpleTestCase
+from psycopg2 import OperationalError as Psycopg2Error
 
 
-# @patch('core.management.commands.2.Command.check')
+@patch("core.management.commands.wait_for_db.Command.check")
 class CommandTest(SimpleTestCase):
-    pass
-    # def test_wait_for_db(self, patched_check):
-    #     patched_check.return_value = True
-    #     call_command(('wait_for_db'))
-    #     patched_check.assert_called_once_with(database=['default'])
-
-    # @patch('time.sleep')
-    # def test_wait_for_db_delay(self, patched_sleep, patched_check):
-    #     patched_check.side_effects = [Psycopg2Error] * 2 + \
-    #         [OperationalError] * 3 + [True]
-    #     call_command(('wait_for_db'))
-    #     self.assertEqual(patched_check.call_count, 6)
-    #     patched_check.assert_called_with(database=['default'])
+    def test_wait_for_db(self, patched_check):
+        patched_check.return_value = True
+
+        call_command("wait_for_db")
+
+        patched_check.assert_called_once_with(databases=["default"])
+
+    @patch("time.sleep")
+    def test_wait_for_db_delay(self, patched_sleep, patched_check):
+        patched_check.side_effect = (
+            [Psycopg2Error] * 2 + [OperationalError] * 3 + [True]
+        )
+
+        call_command("wait_for_db")
+
+        self.assertEqual(patched_check.call_count, 6)
+        patched_check.assert_called_with(databases=["default"])
+
+    @patch("time.sleep")
+    def test_wait_for_db_backs_off(self, patched_sleep, patched_check):
+        patched_check.side_effect = [OperationalError] * 5 + [True]
+
+        call_command("wait_for_db", initial_delay=1, max_delay=4)
+
+        delays = [c.args[0] for c in patched_sleep.call_args_list]
+        self.assertEqual(delays, [1, 2, 4, 4, 4])
+
+    @patch("time.monotonic")
+    @patch("time.sleep")
+    def test_wait_for_db_timeout(self, patched_sleep, patched_time, patched_check):
+        patched_check.side_effect = OperationalError
+        patched_time.side_effect = [0, 1, 2, 11]
+
+        with self.assertRaises(CommandError):
+            call_command("wait_for_db", timeout=10)
+
+        self.assertEqual(patched_check.call_count, 3)
@@ -0,0 +1,121 @@
+"""Tests for the request performance middleware"""
+
+import re
+from unittest.mock import patch
+
+from core import perf
+from core.models import Recipe
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.test import override_settings
+from django.urls import reverse
+from recipe.cache import attr_list_cache
+from rest_framework.test import APIClient
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+PERF = {
+    "ENABLED": True,
+    "SERVER_TIMING": True,
+    "SLOW_REQUEST_MS": 10000,
+    "SLOW_DB_MS": 10000,
+    "SLOW_QUERY_COUNT": 1000,
+    "SLOW_SQL_COUNT": 2,
+}
+
+
+def timing_entries(header):
+    return {entry.split(";")[0]: entry for entry in header.split(", ")}
+
+
+@override_settings(REQUEST_PERF=PERF)
+class RequestPerformanceTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("p@example.com", "pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(user=self.user, title="Soup", time_minutes=5, price=2)
+
+    def test_server_timing_header(self):
+        res = self.client.get(RECIPES_URL)
+
+        entries = timing_entries(res["Server-Timing"])
+        self.assertEqual(list(entries), ["total", "db", "serializer", "cache"])
+        queries = int(re.search(r'desc="(\d+) queries"', entries["db"]).group(1))
+        self.assertGreater(queries, 0)
+
+    def test_log_line(self):
+        with self.assertLogs(perf.logger, "INFO") as logs:
+            self.client.get(reverse("recipe:recipe-detail", args=[1]))
+            self.client.get(RECIPES_URL)
+
+        record = logs.records[-1].perf
+        self.assertEqual(record["view"], "RecipeViewSet.list")
+        self.assertEqual(record["status"], 200)
+        self.assertGreater(record["db_queries"], 0)
+        self.assertGreaterEqual(record["total_ms"], record["db_ms"])
+        self.assertEqual(logs.records[0].perf["view"], "RecipeViewSet.retrieve")
+
+    def test_serializer_time_recorded(self):
+        with self.assertLogs(perf.logger, "INFO") as logs:
+            self.client.post(
+                RECIPES_URL, {"title": "Tart", "time_minutes": 5, "price": "3.00"}
+            )
+
+        self.assertEqual(logs.records[0].perf["view"], "RecipeViewSet.create")
+        self.assertGreater(logs.records[0].perf["serializer_ms"], 0)
+
+    def test_cache_hits_and_misses(self):
+        attr_list_cache.cache.clear()
+        with self.assertLogs(perf.logger, "INFO") as logs:
+            self.client.get(TAGS_URL)
+            self.client.get(TAGS_URL)
+
+        first, second = (record.perf for record in logs.records)
+        self.assertEqual((first["cache_hits"], first["cache_misses"]), (0, 1))
+        self.assertEqual((second["cache_hits"], second["cache_misses"]), (1, 0))
+
+    @override_settings(REQUEST_PERF={**PERF, "SLOW_QUERY_COUNT": 0})
+    def test_slow_request_logs_slowest_sql(self):
+        with self.assertLogs(perf.logger, "WARNING") as logs:
+            self.client.get(RECIPES_URL)
+
+        record = logs.records[0].perf
+        self.assertIn("RecipeViewSet.list", logs.output[0])
+        self.assertEqual(len(record["slowest_queries"]), 2)
+        slowest = [query["ms"] for query in record["slowest_queries"]]
+        self.assertEqual(slowest, sorted(slowest, reverse=True))
+        self.assertTrue(record["slowest_queries"][0]["sql"].startswith("SELECT"))
+
+    def test_api_views_labelled_by_method(self):
+        with self.assertLogs(perf.logger, "INFO") as logs:
+            self.client.get(reverse("health-check"))
+
+        self.assertEqual(logs.records[0].perf["view"], "health_check.get")
+
+    @override_settings(REQUEST_PERF={**PERF, "SERVER_TIMING": False})
+    def test_server_timing_can_be_disabled(self):
+        res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.has_header("Server-Timing"))
+
+    @override_settings(REQUEST_PERF={**PERF, "ENABLED": False})
+    def test_disabled(self):
+        res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.has_header("Server-Timing"))
+
+    def test_nested_timers_count_once(self):
+        metrics = perf.RequestMetrics(slow_sql_count=1)
+        token = perf._current.set(metrics)
+        try:
+            with patch("time.perf_counter", side_effect=[1.0, 3.0]):
+                with perf.timer("serializer"):
+                    with perf.timer("serializer"):
+                        pass
+        finally:
+            perf._current.reset(token)
+
+        self.assertEqual(metrics.timings, {"serializer": 2.0})
@@ -0,0 +1,117 @@
+"""Check that hot queries are planned on the access path indexes"""
+
+from decimal import Decimal
+
+from core import models
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
+from django.test import TestCase
+
+
+def seed(users=4, recipes=200, attrs=50):
+    """Seed enough rows for the planner to care about indexes"""
+    seeded = []
+    for u in range(users):
+        user = get_user_model().objects.create_user(f"plan{u}@example.com", "pass")
+        tags = models.Tag.objects.bulk_create(
+            [models.Tag(user=user, name=f"tag {i}") for i in range(attrs)]
+        )
+        ingredients = models.Ingredient.objects.bulk_create(
+            [models.Ingredient(user=user, name=f"ing {i}") for i in range(attrs)]
+        )
+        recipe_objs = models.Recipe.objects.bulk_create(
+            [
+                models.Recipe(
+                    user=user, title=f"r {i}", time_minutes=5, price=Decimal("1.00")
+                )
+                for i in range(recipes)
+            ]
+        )
+        models.Recipe.tags.through.objects.bulk_create(
+            [
+                models.Recipe.tags.through(recipe=r, tag=tags[(r.id + k) % attrs])
+                for r in recipe_objs
+                for k in range(3)
+            ]
+        )
+        models.Recipe.ingredients.through.objects.bulk_create(
+            [
+                models.Recipe.ingredients.through(
+                    recipe=r, ingredient=ingredients[(r.id + k) % attrs]
+                )
+                for r in recipe_objs
+                for k in range(3)
+            ]
+        )
+        seeded.append((user, tags, ingredients))
+    return seeded
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN the access paths used by the recipe API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.tags, cls.ingredients = seed()[0]
+        with connection.cursor() as cursor:
+            for table in (
+                "core_recipe",
+                "core_tag",
+                "core_ingredient",
+                "core_recipe_tags",
+                "core_recipe_ingredients",
+            ):
+                cursor.execute(f"ANALYZE {table}")
+
+    def setUp(self):
+        # Tables in tests stay small, so rule out sequential scans, and sorts
+        # a LIMIT would avoid, to see which index the planner would pick on a
+        # large table.
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_recipe_list_uses_user_id_index(self):
+        queryset = models.Recipe.objects.filter(user=self.user).order_by("-id")[:100]
+        self.assertUsesIndex(queryset, "recipe_user_id_idx")
+
+    def test_tag_list_uses_unique_name_index(self):
+        queryset = models.Tag.objects.filter(user=self.user).order_by("-name")[:100]
+        self.assertUsesIndex(queryset, "unique_tag_name_per_user")
+
+    def test_ingredient_list_uses_unique_name_index(self):
+        queryset = models.Ingredient.objects.filter(user=self.user).order_by("-name")
+        self.assertUsesIndex(queryset[:100], "unique_ingredient_name_per_user")
+
+    def test_assigned_tags_use_partial_index(self):
+        queryset = models.Tag.objects.filter(user=self.user, recipe_count__gt=0)
+        queryset = queryset.order_by("-name", "-id")[:100]
+        self.assertUsesIndex(queryset, "tag_assigned_idx")
+
+    def test_assigned_ingredients_use_partial_index(self):
+        queryset = models.Ingredient.objects.filter(
+            user=self.user, recipe_count__gt=0
+        ).order_by("-name", "-id")
+        self.assertUsesIndex(queryset[:100], "ingredient_assigned_idx")
+
+    def test_tag_filter_probes_through_from_tag_side(self):
+        through = models.Recipe.tags.through
+        ids = [tag.id for tag in self.tags[:3]]
+        queryset = through.objects.filter(tag_id__in=ids).values("recipe_id")
+        self.assertUsesIndex(queryset, "recipe_tags_tag_recipe_idx")
+
+    def test_ingredient_filter_probes_through_from_ingredient_side(self):
+        through = models.Recipe.ingredients.through
+        ids = [ing.id for ing in self.ingredients[:3]]
+        queryset = through.objects.filter(ingredient_id__in=ids).values("recipe_id")
+        self.assertUsesIndex(queryset, "recipe_ingredients_ing_recipe_idx")
+
+    def test_search_uses_gin_index(self):
+        query = SearchQuery("r", config="english")
+        queryset = models.Recipe.objects.filter(search_vector=query)
+        self.assertUsesIndex(queryset, "recipe_search_idx")
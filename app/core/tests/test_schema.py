@@ -0,0 +1,96 @@
+"""Tests for the precomputed OpenAPI schema"""
+
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from core import schema
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+SCHEMA_URL = reverse("api-schema")
+
+
+class PrecomputedSchemaTests(SimpleTestCase):
+    def setUp(self):
+        schema.clear_cache()
+        self.addCleanup(schema.clear_cache)
+        self.client = APIClient()
+
+    def live(self, **params):
+        with override_settings(API_SCHEMA_PRECOMPUTED=False):
+            return self.client.get(SCHEMA_URL, params)
+
+    def test_matches_generated_schema(self):
+        for fmt in ("json", "yaml"):
+            with self.subTest(format=fmt):
+                res = self.client.get(SCHEMA_URL, {"format": fmt})
+                live = self.live(format=fmt)
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(res.content, live.content)
+                self.assertEqual(res["Content-Type"], live["Content-Type"])
+                self.assertEqual(
+                    res["Content-Disposition"], live["Content-Disposition"]
+                )
+
+    def test_etag(self):
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertTrue(res.has_header("ETag"))
+        cached = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached.content, b"")
+        other = self.client.get(SCHEMA_URL, {"format": "json"})
+        self.assertNotEqual(other["ETag"], res["ETag"])
+
+    def test_accept_parameters_do_not_grow_cache(self):
+        for quality in range(1, 51):
+            accept = f"application/json; q=0.{quality:02d}"
+            self.client.get(SCHEMA_URL, HTTP_ACCEPT=accept)
+
+        self.assertEqual(schema.render_schema.cache_info().currsize, 1)
+
+    def test_indent_from_accept_header(self):
+        accept = "application/json; indent=2"
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT=accept)
+
+        with override_settings(API_SCHEMA_PRECOMPUTED=False):
+            live = self.client.get(SCHEMA_URL, HTTP_ACCEPT=accept)
+        self.assertEqual(res.content, live.content)
+        default = self.client.get(SCHEMA_URL, HTTP_ACCEPT="application/json")
+        self.assertNotEqual(res.content, default.content)
+
+    def test_without_artifact_generates_once(self):
+        missing = os.path.join(tempfile.mkdtemp(), "openapi.json")
+
+        with override_settings(API_SCHEMA_FILE=missing), self.assertLogs(schema.logger):
+            with patch.object(
+                schema, "generate_schema", wraps=schema.generate_schema
+            ) as generate:
+                first = self.client.get(SCHEMA_URL, {"format": "json"})
+                second = self.client.get(SCHEMA_URL, {"format": "yaml"})
+
+        generate.assert_called_once()
+        self.assertEqual(first.content, self.live(format="json").content)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+
+    def test_artifact_is_up_to_date(self):
+        """Run `python manage.py build_api_schema` when this fails"""
+        call_command("build_api_schema", "--check", stdout=StringIO())
+
+    def test_check_detects_stale_artifact(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as artifact:
+            json.dump({"openapi": "3.0.3", "paths": {}}, artifact)
+            artifact.flush()
+
+            with override_settings(API_SCHEMA_FILE=artifact.name):
+                with self.assertRaises(SystemExit):
+                    call_command("build_api_schema", "--check", stderr=StringIO())
@@ -0,0 +1,39 @@
+"""Tests for the pre-traffic warm-up"""
+
+from unittest.mock import patch
+
+from core import warmup
+from django.db import connection
+from django.test import TransactionTestCase
+from django.urls import get_resolver
+from recipe.views import RecipeViewSet
+
+
+class WarmUpTests(TransactionTestCase):
+    def test_runs_every_step(self):
+        timings = warmup.warm_up()
+
+        self.assertEqual(
+            list(timings), ["databases", "urlconfs", "serializers", "schema"]
+        )
+
+    def test_populates_url_resolvers(self):
+        warmup.warm_up()
+
+        self.assertTrue(get_resolver()._populated)
+        self.assertTrue(get_resolver("app.urls_async")._populated)
+
+    def test_finds_routed_viewsets(self):
+        self.assertIn(RecipeViewSet, warmup.load_urlconfs())
+
+    def test_closes_connections(self):
+        warmup.warm_up()
+
+        self.assertIsNone(connection.connection)
+
+    def test_closes_connections_when_a_step_fails(self):
+        with patch.object(warmup, "load_urlconfs", side_effect=ImportError):
+            with self.assertRaises(ImportError):
+                warmup.warm_up()
+
+        self.assertIsNone(connection.connection)
@@ -0,0 +1,90 @@
+"""Pre-traffic warm-up of a serving process
+
+Called from app.wsgi and app.asgi once Django is set up, so the work happens
+before the server hands the process any requests. uWSGI loads the application
+in its master and forks the workers from it, so they start out warm.
+"""
+
+import logging
+import time
+
+from core import schema
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections
+from django.urls import get_resolver
+from django.utils.module_loading import autodiscover_modules
+
+
+logger = logging.getLogger(__name__)
+
+
+def check_databases():
+    """Open a connection to each database and run a trivial query"""
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+
+def load_urlconfs():
+    """Import every URLconf and the views it routes to"""
+    views = []
+    for urlconf in [settings.ROOT_URLCONF, *settings.WARM_UP_URLCONFS]:
+        resolver = get_resolver(urlconf)
+        # Building the reverse lookup tables imports and walks every pattern
+        resolver.reverse_dict
+        views.extend(_views(resolver.url_patterns))
+    return views
+
+
+def load_serializers(views):
+    """Import serializer modules and build the fields of routed serializers"""
+    autodiscover_modules("serializers")
+    for view in views:
+        serializer_class = getattr(view, "serializer_class", None)
+        if serializer_class is not None:
+            serializer_class().fields
+
+
+def prime_schema_caches():
+    """Fill the model metadata, content type and OpenAPI schema caches"""
+    models = apps.get_models()
+    for model in models:
+        model._meta.get_fields()
+    ContentType.objects.get_for_models(*models)
+    if settings.API_SCHEMA_PRECOMPUTED:
+        schema.get_schema()
+
+
+def warm_up():
+    """Run every warm-up step and return the seconds each one took"""
+    timings = {}
+
+    def timed(name, step, *args):
+        started = time.perf_counter()
+        result = step(*args)
+        timings[name] = round(time.perf_counter() - started, 4)
+        return result
+
+    try:
+        timed("databases", check_databases)
+        views = timed("urlconfs", load_urlconfs)
+        timed("serializers", load_serializers, views)
+        timed("schema", prime_schema_caches)
+    finally:
+        # Forked workers must not share the warm-up connection
+        connections.close_all()
+    logger.info("Warm-up finished: %s", timings)
+    return timings
+
+
+def _views(patterns):
+    for pattern in patterns:
+        if hasattr(pattern, "url_patterns"):
+            yield from _views(pattern.url_patterns)
+            continue
+        callback = pattern.callback
+        view = getattr(callback, "cls", None) or getattr(callback, "view_class", None)
+        if view is not None:
+            yield view
@@ -0,0 +1,199 @@
+"""Batched create, update and delete of recipes, tags and ingredients"""
+
+from core.models import Ingredient
+from core.models import Recipe
+from core.models import Tag
+from core.models import User
+from django.db import transaction
+from recipe import serializers
+from recipe.cache import attr_list_cache
+from rest_framework import status
+
+
+def _result(code, obj_id):
+    return {"status": code, "id": obj_id}
+
+
+def _error(errors, code=status.HTTP_400_BAD_REQUEST):
+    return {"status": code, "errors": errors}
+
+
+NOT_FOUND = _error({"id": ["Not found."]}, status.HTTP_404_NOT_FOUND)
+
+
+class BulkWriter:
+    """Apply a batch of operations on behalf of one user
+
+    Each item is validated with the serializer its own endpoint uses. Valid
+    items are then written with set-based queries inside one transaction and
+    every item gets its own result, so a bad item does not fail the batch.
+    Tags and ingredients run before recipes; within a model creates run
+    before updates and updates before deletes.
+    """
+
+    attr_serializers = {
+        "tags": (Tag, serializers.TagSerializer),
+        "ingredients": (Ingredient, serializers.IngredientSerializer),
+    }
+
+    def __init__(self, request):
+        self.user = request.user
+        self.context = {"request": request}
+
+    def run(self, operations):
+        results = {}
+        with transaction.atomic():
+            for key, (model, serializer_class) in self.attr_serializers.items():
+                if key in operations:
+                    results[key] = self._write_attrs(
+                        model, serializer_class, operations[key]
+                    )
+            if "recipes" in operations:
+                results["recipes"] = self._write_recipes(operations["recipes"])
+            # Set-based writes skip model signals, so bump the ETag version
+            # for the whole batch here.
+            User.objects.bump_collection_version(self.user.pk)
+        attr_list_cache.invalidate_on_commit(self.user.pk, Tag, Ingredient)
+        return results
+
+    def _instances(self, model, items):
+        ids = [item.get("id") for item in items]
+        ids = [obj_id for obj_id in ids if isinstance(obj_id, int)]
+        if not ids:
+            return {}
+        return model.objects.filter(user=self.user, id__in=ids).in_bulk()
+
+    def _validate(self, serializer_class, items, instances=None):
+        """Run every item through the serializer
+
+        Returns the per-item results, with None for valid items, and a map of
+        item index to (instance, validated data) for the valid ones.
+        """
+        results = [None] * len(items)
+        valid = {}
+        for index, item in enumerate(items):
+            instance = None
+            if instances is not None:
+                obj_id = item.get("id")
+                instance = instances.get(obj_id) if isinstance(obj_id, int) else None
+                if instance is None:
+                    results[index] = NOT_FOUND
+                    continue
+            serializer = serializer_class(
+                instance,
+                data=item,
+                partial=instance is not None,
+                context=self.context,
+            )
+            if serializer.is_valid():
+                valid[index] = (instance, serializer.validated_data)
+            else:
+                results[index] = _error(serializer.errors)
+        return results, valid
+
+    def _delete(self, model, ids):
+        queryset = model.objects.filter(user=self.user, id__in=ids)
+        found = set(queryset.values_list("id", flat=True))
+        if found:
+            queryset.delete()
+        deleted = status.HTTP_204_NO_CONTENT
+        return [
+            _result(deleted, obj_id) if obj_id in found else NOT_FOUND for obj_id in ids
+        ]
+
+    def _write_attrs(self, model, serializer_class, operations):
+        results = {}
+
+        created, valid = self._validate(serializer_class, operations["create"])
+        objs = serializers.get_or_create_attrs(
+            model, self.user, [data["name"] for _, data in valid.values()]
+        )
+        for index, (_, data) in valid.items():
+            created[index] = _result(status.HTTP_201_CREATED, objs[data["name"]].id)
+        results["create"] = created
+
+        items = operations["update"]
+        updated, valid = self._validate(
+            serializer_class, items, self._instances(model, items)
+        )
+        renamed = {}
+        for index, (instance, data) in valid.items():
+            name = data.get("name", instance.name)
+            if renamed.setdefault(name, instance) is not instance:
+                updated[index] = _error({"name": ["Name already exists"]})
+                continue
+            instance.name = name
+            updated[index] = _result(status.HTTP_200_OK, instance.id)
+        model.objects.bulk_update(renamed.values(), ["name"])
+        results["update"] = updated
+
+        results["delete"] = self._delete(model, operations["delete"])
+        return results
+
+    def _write_recipes(self, operations):
+        results = {}
+        serializer_class = serializers.RecipeDetailSerializer
+
+        created, valid = self._validate(serializer_class, operations["create"])
+        recipes = Recipe.objects.bulk_create(
+            Recipe(user=self.user, **self._fields(data)) for _, data in valid.values()
+        )
+        for index, recipe in zip(valid, recipes):
+            created[index] = _result(status.HTTP_201_CREATED, recipe.id)
+        self._set_related(zip(recipes, [data for _, data in valid.values()]))
+        results["create"] = created
+
+        items = operations["update"]
+        updated, valid = self._validate(
+            serializer_class, items, self._instances(Recipe, items)
+        )
+        fields = set()
+        for index, (recipe, data) in valid.items():
+            for attr, value in self._fields(data).items():
+                setattr(recipe, attr, value)
+                fields.add(attr)
+            updated[index] = _result(status.HTTP_200_OK, recipe.id)
+        if fields:
+            Recipe.objects.bulk_update(
+                [recipe for recipe, _ in valid.values()], sorted(fields)
+            )
+        self._set_related(valid.values(), replace=True)
+        results["update"] = updated
+
+        results["delete"] = self._delete(Recipe, operations["delete"])
+        return results
+
+    def _fields(self, data):
+        return {
+            attr: value
+            for attr, value in data.items()
+            if attr not in ("tags", "ingredients")
+        }
+
+    def _set_related(self, pairs, replace=False):
+        """Link recipes to the tags and ingredients named in their data"""
+        pairs = list(pairs)
+        for field_name, model in (("tags", Tag), ("ingredients", Ingredient)):
+            rows = {
+                recipe: [item["name"] for item in data[field_name]]
+                for recipe, data in pairs
+                if field_name in data
+            }
+            if not rows:
+                continue
+            field = Recipe._meta.get_field(field_name)
+            through = field.remote_field.through
+            recipe_id = f"{field.m2m_field_name()}_id"
+            related_id = f"{field.m2m_reverse_field_name()}_id"
+            if replace:
+                through.objects.filter(
+                    **{f"{recipe_id}__in": [recipe.id for recipe in rows]}
+                ).delete()
+            objs = serializers.get_or_create_attrs(
+                model, self.user, [name for names in rows.values() for name in names]
+            )
+            through.objects.bulk_create(
+                through(**{recipe_id: recipe.id, related_id: objs[name].id})
+                for recipe, names in rows.items()
+                for name in dict.fromkeys(names)
+            )
@@ -0,0 +1,38 @@
+"""COPY based bulk loading shared by the importer and the dataset generator"""
+
+import csv
+import io
+
+
+def reserve_ids(cursor, model, count):
+    """Take `count` ids from the id sequence of `model`"""
+    cursor.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+        "FROM generate_series(1, %s)",
+        [model._meta.db_table, count],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def copy_rows(cursor, table, columns, rows):
+    """COPY rows into table"""
+    buffer = io.StringIO()
+    # Quoted fields are never read as NULL, so blank strings stay blank
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+    )
+
+
+def copy_via_staging(cursor, table, columns, rows):
+    """COPY rows into a session staging table, then merge them into table"""
+    staging = f"import_{table}"
+    select = ", ".join(columns)
+    cursor.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} AS "
+        f"SELECT {select} FROM {table} WITH NO DATA"
+    )
+    cursor.execute(f"TRUNCATE {staging}")
+    copy_rows(cursor, staging, columns, rows)
+    cursor.execute(f"INSERT INTO {table} ({select}) SELECT {select} FROM {staging}")
@@ -0,0 +1,111 @@
+"""Cache for serialized tag and ingredient lists"""
+
+import hashlib
+import time
+
+from core import perf
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+
+class AttrListCache:
+    """Per-user list cache invalidated through a generation key
+
+    Every entry key embeds the user's current generation for the model, so
+    invalidating a user means moving the generation on, never deleting keys.
+    """
+
+    prefix = "recipe-attrs"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[settings.RECIPE_ATTR_CACHE_ALIAS]
+
+    def _generation_key(self, model, user_id):
+        return f"{self.prefix}:{model._meta.model_name}:{user_id}:gen"
+
+    def _generation(self, model, user_id):
+        key = self._generation_key(model, user_id)
+        generation = self.cache.get(key)
+        if generation is None:
+            # Start from a fresh value so entries written under an evicted
+            # generation can never be read again.
+            self.cache.add(key, time.time_ns(), timeout=None)
+            generation = self.cache.get(key)
+        return generation
+
+    def _entry_key(self, model, user_id, variant):
+        digest = hashlib.sha1(variant.encode()).hexdigest()
+        generation = self._generation(model, user_id)
+        return f"{self.prefix}:{model._meta.model_name}:{user_id}:{generation}:{digest}"
+
+    def get(self, model, user_id, variant):
+        """Return (key, data), data is None on a miss
+
+        A miss must be filled with `set(key, ...)`: the key pins the
+        generation seen before the rows were read, so an invalidation in
+        between leaves the entry unreachable instead of serving it as fresh.
+        """
+        key = self._entry_key(model, user_id, variant)
+        data = self.cache.get(key)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        perf.record_cache(data is not None)
+        return key, data
+
+    def set(self, key, data):
+        self.cache.set(key, data, timeout=settings.RECIPE_ATTR_CACHE_TIMEOUT)
+
+    def invalidate(self, user_id, *models):
+        for model in models:
+            key = self._generation_key(model, user_id)
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.set(key, time.time_ns(), timeout=None)
+
+    def invalidate_on_commit(self, user_id, *models):
+        """Invalidate once the current transaction commits
+
+        Invalidating earlier lets a concurrent miss cache the rows committed
+        before this write under the new generation.
+        """
+        transaction.on_commit(lambda: self.invalidate(user_id, *models))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+
+attr_list_cache = AttrListCache()
+
+
+class CachedListMixin:
+    """Serve list responses from `attr_list_cache`, keyed by the full URL"""
+
+    def list(self, request, *args, **kwargs):
+        model = self.queryset.model
+        variant = request.build_absolute_uri()
+        key, data = attr_list_cache.get(model, request.user.pk, variant)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        attr_list_cache.set(key, response.data)
+        return response
@@ -0,0 +1,65 @@
+"""Repair of the recipe counts kept on tags and ingredients
+
+Database triggers on the recipe link tables keep `recipe_count` current, see
+core/migrations/0015_recipe_counts.py. Writes that bypass them, such as a
+TRUNCATE or a restore with triggers disabled, leave counts behind; these
+functions recompute them from the link tables.
+"""
+
+from core.models import User
+from django.db import connection
+from django.db import transaction
+from django.db.models import Max
+from django.db.models import Min
+from recipe.cache import attr_list_cache
+
+
+def recount(model, start_id, stop_id):
+    """Fix counts of ids in [start_id, stop_id), return the owners changed"""
+    rel = model._meta.get_field("recipe")
+    table = connection.ops.quote_name(model._meta.db_table)
+    links = connection.ops.quote_name(rel.through._meta.db_table)
+    column = connection.ops.quote_name(rel.field.m2m_reverse_name())
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Writers lock the same rows from their triggers, so the counts read
+        # below cannot miss a link committed meanwhile.
+        cursor.execute(
+            f"SELECT 1 FROM {table} WHERE id >= %s AND id < %s "
+            "ORDER BY id FOR NO KEY UPDATE",
+            [start_id, stop_id],
+        )
+        cursor.execute(
+            f"""
+            UPDATE {table} SET recipe_count = actual.links
+            FROM (
+                SELECT counted.id, count(link.{column}) AS links
+                FROM {table} AS counted
+                LEFT JOIN {links} AS link ON link.{column} = counted.id
+                WHERE counted.id >= %s AND counted.id < %s
+                GROUP BY counted.id
+            ) AS actual
+            WHERE {table}.id = actual.id
+                AND {table}.recipe_count <> actual.links
+            RETURNING {table}.user_id
+            """,
+            [start_id, stop_id],
+        )
+        return [user_id for user_id, in cursor.fetchall()]
+
+
+def repair_recipe_counts(model, batch_size=10000, progress=None):
+    """Recompute every count of `model` in id batches, return how many changed"""
+    bounds = model.objects.aggregate(low=Min("id"), high=Max("id"))
+    if bounds["low"] is None:
+        return 0
+    fixed = 0
+    for start_id in range(bounds["low"], bounds["high"] + 1, batch_size):
+        user_ids = recount(model, start_id, start_id + batch_size)
+        fixed += len(user_ids)
+        for user_id in set(user_ids):
+            # Counts are part of list and recipe responses
+            User.objects.bump_collection_version(user_id)
+            attr_list_cache.invalidate(user_id, model)
+        if progress:
+            progress(min(start_id + batch_size - 1, bounds["high"]), fixed)
+    return fixed
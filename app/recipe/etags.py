@@ -0,0 +1,55 @@
+"""Conditional GET support for recipe APIs"""
+
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _opaque(etag):
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+class CollectionETagMixin:
+    """Answer GETs with 304 while the user's collection is unchanged
+
+    The ETag is derived from the per-user collection version, which is bumped
+    on every write to the user's recipes, tags or ingredients, so checking it
+    costs one primary key lookup and no list query or serialization.
+    """
+
+    def get_collection_etag(self, request):
+        version = (
+            get_user_model()
+            .objects.filter(pk=request.user.pk)
+            .values_list("collection_version", flat=True)
+            .first()
+        )
+        key = ":".join(
+            [
+                str(request.user.pk),
+                str(version),
+                request.get_full_path(),
+                request.headers.get("Accept", ""),
+            ]
+        )
+        return f'W/"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+    def _conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_collection_etag(request)
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if "*" in if_none_match or _opaque(etag) in map(_opaque, if_none_match):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+            patch_vary_headers(response, ["Authorization"])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(super().list, request, *args, **kwargs)
@@ -0,0 +1,89 @@
+"""Serializer-free rendering of recipe lists
+
+List responses are built straight from values() rows plus one grouped
+lookup per nested relation, skipping the per-field to_representation calls
+of RecipeSerializer. The output must stay identical to the serializer's;
+recipe/tests/test_fastpath.py checks the two against each other.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from core import perf
+from core.models import Recipe
+from recipe import serializers
+from rest_framework.response import Response
+
+
+# Nested relations and the fields rendered for each of their objects
+NESTED = {
+    "tags": serializers.TagSerializer.Meta.fields,
+    "ingredients": serializers.IngredientSerializer.Meta.fields,
+}
+
+
+def group_related(field_name, recipe_ids, fields=("id", "name")):
+    """Map recipe id to dicts of `fields` of its tags or ingredients"""
+    field = Recipe._meta.get_field(field_name)
+    recipe_id = f"{field.m2m_field_name()}_id"
+    related = field.m2m_reverse_field_name()
+    rows = (
+        field.remote_field.through.objects.filter(**{f"{recipe_id}__in": recipe_ids})
+        .order_by(f"{related}_id")
+        .values_list(recipe_id, *(f"{related}__{name}" for name in fields))
+    )
+    grouped = defaultdict(list)
+    for owner_id, *values in rows:
+        grouped[owner_id].append(dict(zip(fields, values)))
+    return grouped
+
+
+def list_columns(fields):
+    """Columns to select with values() to render `fields`"""
+    return ["id"] + [name for name in fields if name != "id" and name not in NESTED]
+
+
+def render_recipes(rows, fields):
+    """Render values() rows like RecipeSerializer(many=True).data"""
+    rows = list(rows)
+    ids = [row["id"] for row in rows]
+    nested = {
+        name: group_related(name, ids, NESTED[name])
+        for name in NESTED
+        if name in fields
+    }
+    data = []
+    with perf.timer("serializer"):
+        for row in rows:
+            item = {}
+            for name in fields:
+                if name in nested:
+                    item[name] = nested[name][row["id"]]
+                    continue
+                value = row[name]
+                # DRF renders decimals as fixed point strings
+                item[name] = (
+                    format(value, "f") if isinstance(value, Decimal) else value
+                )
+            data.append(item)
+    return data
+
+
+class FastRecipeListMixin:
+    """List action for RecipeViewSet rendered without the serializer"""
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is None:
+            fields = list(serializers.RecipeSerializer.Meta.fields)
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = list_columns(fields)
+        if "rank" in queryset.query.annotations:
+            # The cursor reads the rank of the last row on a search page
+            columns.append("rank")
+        rows = queryset.values(*columns)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(render_recipes(page, fields))
+        return Response(render_recipes(rows, fields))
@@ -0,0 +1,85 @@
+"""Sparse fieldsets: `?fields=` and `?omit=` on read endpoints"""
+
+from django.core.exceptions import FieldDoesNotExist
+from drf_spectacular.utils import OpenApiParameter
+from drf_spectacular.utils import OpenApiTypes
+from rest_framework import serializers
+
+
+FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        OpenApiTypes.STR,
+        description="Comma separated list of the only fields to return",
+    ),
+    OpenApiParameter(
+        "omit",
+        OpenApiTypes.STR,
+        description="Comma separated list of fields to leave out",
+    ),
+]
+
+
+def _names(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class SparseFieldsSerializerMixin:
+    """Serializer that renders only the fields passed as `fields`
+
+    Fields backed by something other than a model field of the same name
+    list the model fields they read in Meta.field_sources.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SparseFieldsMixin:
+    """Pick the fields of GET responses and load only what they need"""
+
+    def get_requested_fields(self):
+        """Field names asked for by the client, None for all of them"""
+        if self.request.method != "GET":
+            return None
+        params = self.request.query_params
+        if "fields" not in params and "omit" not in params:
+            return None
+        available = list(self.get_serializer_class()().fields)
+        fields = _names(params["fields"]) if "fields" in params else available
+        omit = _names(params.get("omit", ""))
+        unknown = [name for name in fields + omit if name not in available]
+        if unknown:
+            raise serializers.ValidationError(
+                {"fields": [f"Unknown field: {name}" for name in unknown]}
+            )
+        return [name for name in available if name in fields and name not in omit]
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs["fields"] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def trim_queryset(self, queryset, fields):
+        """Select the columns and prefetch the relations `fields` read"""
+        serializer_class = self.get_serializer_class()
+        sources = getattr(serializer_class.Meta, "field_sources", {})
+        declared = serializer_class().fields
+        columns = set()
+        prefetch = []
+        for name in fields:
+            for source in sources.get(name, [declared[name].source]):
+                try:
+                    model_field = queryset.model._meta.get_field(source)
+                except FieldDoesNotExist:
+                    continue
+                if model_field.many_to_many:
+                    prefetch.append(source)
+                elif model_field.concrete:
+                    columns.add(source)
+        pk = queryset.model._meta.pk.name
+        return queryset.only(pk, *columns).prefetch_related(*prefetch)
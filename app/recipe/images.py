@@ -0,0 +1,207 @@
+"""Background processing of uploaded recipe images"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone as dt_timezone
+from io import BytesIO
+
+from core.models import ImageBlob
+from core.models import Recipe
+from core.models import User
+from core.models import recipe_image_file_path
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.db import connection
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+from PIL import ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def variant_name(name, label):
+    """Storage name of the resized `label` variant of image `name`"""
+    root, _ = os.path.splitext(name)
+    return f"{root}_{label}.jpg"
+
+
+def variant_names(name):
+    return {label: variant_name(name, label) for label in settings.RECIPE_IMAGE_SIZES}
+
+
+def is_variant_name(name):
+    return any(name.endswith(f"_{label}.jpg") for label in settings.RECIPE_IMAGE_SIZES)
+
+
+def _encode(image):
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=settings.RECIPE_IMAGE_QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def process_recipe_image(recipe_id):
+    """Normalize, re-encode and resize the pending image of a recipe"""
+    claimed = Recipe.objects.filter(
+        pk=recipe_id, image_status=Recipe.ImageStatus.PENDING
+    ).update(image_status=Recipe.ImageStatus.PROCESSING)
+    if not claimed:
+        return
+
+    recipe = Recipe.objects.get(pk=recipe_id)
+    storage = recipe.image.storage
+    original = recipe.image.name
+    try:
+        with recipe.image.open("rb") as image_file:
+            image = ImageOps.exif_transpose(Image.open(image_file))
+            image = image.convert("RGB")
+
+        processed = storage.save(
+            recipe_image_file_path(recipe, "processed.jpg"), _encode(image)
+        )
+        for label, size in settings.RECIPE_IMAGE_SIZES.items():
+            name = variant_name(processed, label)
+            # Identical images share their variants
+            if storage.exists(name):
+                continue
+            variant = image.copy()
+            variant.thumbnail((size, size))
+            storage.save_derived(name, _encode(variant))
+    except Exception:
+        logger.exception("Processing image of recipe %s failed", recipe_id)
+        Recipe.objects.filter(pk=recipe_id, image=original).update(
+            image_status=Recipe.ImageStatus.FAILED
+        )
+        User.objects.bump_collection_version(recipe.user_id)
+        return
+
+    # The recipe may have received a new upload meanwhile, keep that one.
+    # Files nothing references any more are left to collect_garbage.
+    Recipe.objects.filter(pk=recipe_id, image=original).update(
+        image=processed, image_status=Recipe.ImageStatus.READY
+    )
+    User.objects.bump_collection_version(recipe.user_id)
+
+
+def collect_garbage(grace=None):
+    """Delete blobs unreferenced for `grace` seconds, return how many
+
+    Each blob row is locked while its files are deleted. Storage registers a
+    blob before writing it, so a concurrent upload of the same content
+    either waits for the deletion and writes the file again, or has already
+    refreshed the row and keeps it out of reach.
+    """
+    if grace is None:
+        grace = settings.RECIPE_IMAGE_GC_GRACE
+    storage = Recipe._meta.get_field("image").storage
+    garbage = ImageBlob.objects.filter(
+        refcount=0, touched_at__lt=timezone.now() - timedelta(seconds=grace)
+    )
+    deleted = 0
+    for name in garbage.order_by("touched_at").values_list("name", flat=True):
+        with transaction.atomic():
+            # Re-checked under the lock, the blob may have been reused
+            blob = garbage.select_for_update(skip_locked=True).filter(name=name)
+            if not blob.exists():
+                continue
+            for path in [name, *variant_names(name).values()]:
+                storage.delete(path)
+            blob.delete()
+        deleted += 1
+    return deleted
+
+
+def adopt_orphans(directory):
+    """Register files under `directory` as unreferenced blobs
+
+    Files written before blobs were tracked, or left by an interrupted
+    deletion, get a row so collect_garbage removes them unless a recipe
+    references them. Variants are collected with their image and skipped.
+    """
+    storage = Recipe._meta.get_field("image").storage
+    table = ImageBlob._meta.db_table
+    root = storage.path(directory)
+    adopted = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        names = []
+        for filename in filenames:
+            if filename.startswith(".") or is_variant_name(filename):
+                continue
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, "/")
+            mtime = datetime.fromtimestamp(os.path.getmtime(path), tz=dt_timezone.utc)
+            names.append((name, mtime))
+        if not names:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (name, refcount, touched_at) "
+                "SELECT name, 0, touched_at FROM unnest(%s::text[], %s::timestamptz[]) "
+                "AS orphan (name, touched_at) "
+                "ON CONFLICT (name) DO NOTHING",
+                [[name for name, _ in names], [mtime for _, mtime in names]],
+            )
+            adopted += cursor.rowcount
+    return adopted
+
+
+def migrate_image(recipe):
+    """Move a recipe image stored under its upload name to a blob
+
+    Returns whether the recipe was updated; it is left alone when its image
+    changed meanwhile. The old file is released to collect_garbage.
+    """
+    storage = recipe.image.storage
+    name = recipe.image.name
+    with storage.open(name, "rb") as source:
+        blob = storage.save(name, source)
+    for label, variant in variant_names(name).items():
+        target = variant_name(blob, label)
+        if storage.exists(variant) and not storage.exists(target):
+            with storage.open(variant, "rb") as source:
+                storage.save_derived(target, source)
+    updated = Recipe.objects.filter(pk=recipe.pk, image=name).update(image=blob)
+    if updated:
+        User.objects.bump_collection_version(recipe.user_id)
+    return bool(updated)
+
+
+def _run(recipe_id):
+    try:
+        process_recipe_image(recipe_id)
+    finally:
+        close_old_connections()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.RECIPE_IMAGE_WORKERS,
+            thread_name_prefix="recipe-image",
+        )
+    return _executor
+
+
+def enqueue_recipe_image(recipe_id):
+    """Process the image once the upload is committed
+
+    With RECIPE_IMAGE_WORKERS set to 0 the image is processed in the calling
+    thread, which keeps tests and management commands synchronous.
+    """
+
+    def submit():
+        if settings.RECIPE_IMAGE_WORKERS:
+            get_executor().submit(_run, recipe_id)
+        else:
+            process_recipe_image(recipe_id)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,28 @@
+"""Delete recipe image files no recipe references any more"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from recipe.images import collect_garbage
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stored recipe images, with their resized variants, that have "
+        "been unreferenced for longer than the grace period."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=settings.RECIPE_IMAGE_GC_GRACE,
+            help="Seconds an image must have been unreferenced",
+        )
+
+    def handle(self, *args, **options):
+        if options["grace"] < 0:
+            raise CommandError("--grace must not be negative")
+
+        deleted = collect_garbage(grace=options["grace"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} images"))
@@ -0,0 +1,78 @@
+"""Generate a large synthetic dataset for benchmarks"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from recipe.synthetic import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users with Zipf distributed recipe collections, tags, "
+        "ingredients and links, loaded through COPY. The same arguments "
+        "always generate the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--recipes", type=int, default=10000, help="In total")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--zipf-exponent",
+            type=float,
+            default=1.1,
+            help="Skew of recipe counts across users, 0 spreads them evenly",
+        )
+        parser.add_argument("--max-tags", type=int, default=5)
+        parser.add_argument("--max-ingredients", type=int, default=12)
+        parser.add_argument("--email-domain", default="synthetic.example.com")
+        parser.add_argument(
+            "--password",
+            default="password123",
+            help="Password of every generated user",
+        )
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--defer-foreign-keys",
+            action="store_true",
+            help=(
+                "Drop foreign keys during the load and add them back after, "
+                "which is faster for large datasets. Only use it on databases "
+                "nothing else writes to meanwhile."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["recipes"] < 0:
+            raise CommandError("Need at least one user and no negative recipes")
+        domain = options["email_domain"]
+        if get_user_model().objects.filter(email__endswith=f"@{domain}").exists():
+            raise CommandError(
+                f"Users @{domain} already exist, pick another --email-domain"
+            )
+
+        generator = DatasetGenerator(
+            users=options["users"],
+            recipes=options["recipes"],
+            seed=options["seed"],
+            zipf_exponent=options["zipf_exponent"],
+            max_tags=options["max_tags"],
+            max_ingredients=options["max_ingredients"],
+            email_domain=domain,
+            password=options["password"],
+            batch_size=options["batch_size"],
+            defer_foreign_keys=options["defer_foreign_keys"],
+        )
+
+        def progress(report):
+            self.stdout.write(f"{report.recipes} of {options['recipes']} recipes")
+
+        report = generator.run(progress=progress if options["verbosity"] > 1 else None)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {report.users} users, {report.recipes} recipes, "
+                f"{report.tags} tags, {report.ingredients} ingredients and "
+                f"{report.links} links in {report.seconds:.1f}s "
+                f"({report.recipes_per_second} recipes/s)"
+            )
+        )
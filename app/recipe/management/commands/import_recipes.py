@@ -0,0 +1,60 @@
+"""Bulk load recipes for a user from a CSV or NDJSON file"""
+
+import io
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from recipe.importer import FORMATS
+from recipe.importer import RecipeImporter
+from recipe.importer import guess_format
+
+
+class Command(BaseCommand):
+    help = (
+        "Import recipes with their tags and ingredients through COPY. CSV "
+        "input has title, description, time_minutes, price, link, tags and "
+        "ingredients columns with names separated by '|'; NDJSON input uses "
+        "the layout of the recipe export."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Input file, '-' reads stdin")
+        parser.add_argument("--user", required=True, help="Email of the owner")
+        parser.add_argument(
+            "--input-format",
+            choices=FORMATS,
+            help="Defaults to the extension of the input file",
+        )
+        parser.add_argument("--batch-size", type=int, help="Rows per COPY batch")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}")
+
+        path = options["path"]
+        input_format = options["input_format"] or guess_format(path)
+        if input_format is None:
+            raise CommandError("Cannot tell the input format, pass --input-format")
+
+        importer = RecipeImporter(user, batch_size=options["batch_size"])
+        if path == "-":
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+            report = importer.run(stream, input_format)
+        else:
+            with open(path, encoding="utf-8", newline="") as stream:
+                report = importer.run(stream, input_format)
+
+        for error in report.errors:
+            self.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'])}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {report.imported} of {report.rows} rows in "
+                f"{report.seconds:.2f}s ({report.rows_per_second} rows/s), "
+                f"{report.failed} failed"
+            )
+        )
@@ -0,0 +1,39 @@
+"""Move recipe images to content-addressed storage"""
+
+from core.models import Recipe
+from django.core.management.base import BaseCommand
+from recipe.images import adopt_orphans
+from recipe.images import migrate_image
+
+
+LEGACY_DIRECTORY = "uploads/recipe"
+
+
+class Command(BaseCommand):
+    help = (
+        "Store every recipe image still named by its upload under its content "
+        "hash, sharing identical files, and hand the old files to "
+        "collect_recipe_images."
+    )
+
+    def handle(self, *args, **options):
+        storage = Recipe._meta.get_field("image").storage
+        recipes = (
+            Recipe.objects.exclude(image="")
+            .exclude(image=None)
+            .exclude(image__startswith=f"{storage.prefix}/")
+            .only("id", "user_id", "image")
+            .order_by("id")
+        )
+        moved = 0
+        for recipe in recipes.iterator():
+            try:
+                moved += migrate_image(recipe)
+            except FileNotFoundError:
+                self.stderr.write(f"Recipe {recipe.id}: missing {recipe.image.name}")
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} images"))
+
+        # Files of deleted recipes and replaced uploads never had a reference
+        if storage.exists(LEGACY_DIRECTORY):
+            adopted = adopt_orphans(LEGACY_DIRECTORY)
+            self.stdout.write(f"Registered {adopted} unreferenced files")
@@ -0,0 +1,30 @@
+"""Process recipe images left pending, e.g. after a worker restart"""
+
+from core.models import Recipe
+from django.core.management.base import BaseCommand
+from recipe.images import process_recipe_image
+
+
+class Command(BaseCommand):
+    help = "Process pending recipe images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retry-processing",
+            action="store_true",
+            help="Also retry images stuck in processing by a worker that died",
+        )
+
+    def handle(self, *args, **options):
+        if options["retry_processing"]:
+            Recipe.objects.filter(image_status=Recipe.ImageStatus.PROCESSING).update(
+                image_status=Recipe.ImageStatus.PENDING
+            )
+        pending = Recipe.objects.filter(
+            image_status=Recipe.ImageStatus.PENDING
+        ).values_list("id", flat=True)
+        count = 0
+        for recipe_id in pending.iterator():
+            process_recipe_image(recipe_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {count} images"))
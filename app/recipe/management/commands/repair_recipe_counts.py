@@ -0,0 +1,42 @@
+"""Recompute the recipe counts of tags and ingredients"""
+
+from core.models import Ingredient
+from core.models import Tag
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from recipe.counts import repair_recipe_counts
+
+
+MODELS = {"tags": Tag, "ingredients": Ingredient}
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute recipe_count on tags and ingredients from the recipe links, "
+        "in batches of ids each locked and fixed in its own transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            choices=list(MODELS),
+            help="Only repair this model, can be repeated",
+        )
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        for name in options["model"] or list(MODELS):
+
+            def progress(last_id, fixed):
+                self.stdout.write(f"{name}: up to id {last_id}, {fixed} fixed")
+
+            fixed = repair_recipe_counts(
+                MODELS[name],
+                batch_size=options["batch_size"],
+                progress=progress if options["verbosity"] > 1 else None,
+            )
+            self.stdout.write(self.style.SUCCESS(f"{name}: fixed {fixed} counts"))
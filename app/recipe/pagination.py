@@ -0,0 +1,42 @@
+"""Pagination for recipe APIs"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination, clients may pass `paginate=0` for a plain list"""
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = ("-id",)
+    paginate_query_param = "paginate"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.paginate_query_param) in ("0", "false"):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if "rank" in queryset.query.annotations:
+            # Search results are paged by relevance first
+            return ("-rank",) + tuple(ordering)
+        return ordering
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append(
+            {
+                "name": self.paginate_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to 0 to return the full list unpaginated",
+                "schema": {"type": "integer", "enum": [0, 1]},
+            }
+        )
+        return parameters
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    ordering = ("-name", "-id")
@@ -1,26 +1,74 @@
 from core.models import Ingredient
 from core.models import Recipe
 from core.models import Tag
+from core.models import User
+from core.perf import TimedSerializerMixin
+from django.conf import settings
+from django.db import transaction
+from drf_spectacular.utils import extend_schema_field
+from recipe import images
+from recipe.cache import attr_list_cache
+from recipe.fieldsets import SparseFieldsSerializerMixin
 from rest_framework import serializers
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+def get_or_create_attrs(model, user, names):
+    """Map names to the user's objects with one lookup and one insert"""
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    objs = {obj.name: obj for obj in model.objects.filter(user=user, name__in=names)}
+    missing = [name for name in names if name not in objs]
+    if missing:
+        # Rows inserted by a concurrent request are skipped by the unique
+        # constraint, so the ids are read back instead of returned.
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        objs.update(
+            (obj.name, obj) for obj in model.objects.filter(user=user, name__in=missing)
+        )
+    return objs
+
+
+class RecipeAttrSerializer(
+    TimedSerializerMixin, SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
+    """Base serializer for names unique per user"""
+
+    def validate_name(self, value):
+        if self.instance is None:
+            return value
+        taken = (
+            type(self.instance)
+            .objects.filter(user=self.instance.user, name=value)
+            .exclude(id=self.instance.id)
+        )
+        if taken.exists():
+            raise serializers.ValidationError("Name already exists")
+        return value
+
+
+class IngredientSerializer(RecipeAttrSerializer):
 
     class Meta:
         model = Ingredient
-        fields = ["id", "name"]
-        read_only_fields = ["id"]
+        fields = ["id", "name", "recipe_count"]
+        read_only_fields = ["id", "recipe_count"]
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(RecipeAttrSerializer):
 
     class Meta:
         model = Tag
-        fields = ["id", "name"]
-        read_only_fields = ["id"]
+        fields = ["id", "name", "recipe_count"]
+        read_only_fields = ["id", "recipe_count"]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(
+    TimedSerializerMixin, SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
 
@@ -29,55 +77,161 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = ["id", "title", "time_minutes", "price", "link", "tags", "ingredients"]
         read_only_fields = ["id"]
 
-    def _get_or_create_tags(self, tags, recipe):
+    def _get_or_create_attrs(self, model, items):
         auth_user = self.context["request"].user
-        for tag in tags:
-            tag_obj, _ = Tag.objects.get_or_create(user=auth_user, **tag)
-            recipe.tags.add(tag_obj)
-
-    def _get_or_create_ingredients(self, ingredients, recipe):
-        auth_user = self.context["request"].user
-        for ingredient in ingredients:
-            ing_obj, _ = Ingredient.objects.get_or_create(user=auth_user, **ingredient)
-            recipe.ingredients.add(ing_obj)
-
+        objs = get_or_create_attrs(model, auth_user, [item["name"] for item in items])
+        return list(objs.values())
+
+    def _set_attrs(self, recipe, field_name, items, created=False):
+        """Link the recipe to exactly the tags or ingredients named in items
+
+        Only the difference to the current links is written, with at most one
+        delete and one insert, and nothing at all when the set is unchanged.
+        """
+        field = Recipe._meta.get_field(field_name)
+        model = field.related_model
+        through = field.remote_field.through
+        recipe_id = f"{field.m2m_field_name()}_id"
+        related_id = f"{field.m2m_reverse_field_name()}_id"
+        wanted = {obj.id for obj in self._get_or_create_attrs(model, items)}
+        links = through.objects.filter(**{recipe_id: recipe.id})
+        current = set() if created else set(links.values_list(related_id, flat=True))
+
+        if current - wanted:
+            links.filter(**{f"{related_id}__in": current - wanted}).delete()
+        if wanted - current:
+            # A concurrent update of the same recipe may have linked some of
+            # these already, so conflicts are ignored
+            through.objects.bulk_create(
+                [
+                    through(**{recipe_id: recipe.id, related_id: obj_id})
+                    for obj_id in sorted(wanted - current)
+                ],
+                ignore_conflicts=True,
+            )
+        if current != wanted:
+            attr_list_cache.invalidate_on_commit(recipe.user_id, model)
+        # Like the related manager, drop prefetched rows that may be stale
+        getattr(recipe, "_prefetched_objects_cache", {}).pop(field_name, None)
+
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop("tags", [])
         ingredients = validated_data.pop("ingredients", [])
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        self._set_attrs(recipe, "tags", tags, created=True)
+        self._set_attrs(recipe, "ingredients", ingredients, created=True)
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop("tags", None)
         ingredients = validated_data.pop("ingredients", None)
 
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._set_attrs(instance, "tags", tags)
 
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._set_attrs(instance, "ingredients", ingredients)
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
-        instance.save()
+        # Only the submitted columns, the loaded image and image_status may
+        # have been replaced by the image worker since.
+        if validated_data:
+            instance.save(update_fields=list(validated_data))
+        else:
+            User.objects.bump_collection_version(instance.user_id)
         return instance
 
 
-class RecipeDetailSerializer(RecipeSerializer):
+class RecipeImageVariantsMixin(serializers.Serializer):
+    image_variants = serializers.SerializerMethodField()
+
+    @extend_schema_field(
+        {
+            "type": "object",
+            "additionalProperties": {"type": "string", "format": "uri"},
+            "nullable": True,
+        }
+    )
+    def get_image_variants(self, obj):
+        """URLs of the resized images once processing is done"""
+        if obj.image_status != Recipe.ImageStatus.READY:
+            return None
+        request = self.context.get("request")
+        storage = obj.image.storage
+        urls = {
+            label: storage.url(name)
+            for label, name in images.variant_names(obj.image.name).items()
+        }
+        if request is not None:
+            urls = {
+                label: request.build_absolute_uri(url) for label, url in urls.items()
+            }
+        return urls
+
+
+class RecipeDetailSerializer(RecipeImageVariantsMixin, RecipeSerializer):
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ["description", "image"]
-
-
-class RecipeImageSerializer(serializers.ModelSerializer):
+        fields = RecipeSerializer.Meta.fields + [
+            "description",
+            "image",
+            "image_status",
+            "image_variants",
+        ]
+        # Images are replaced through upload_image only
+        read_only_fields = ["id", "image", "image_status"]
+        field_sources = {"image_variants": ["image", "image_status"]}
+
+
+class RecipeImageSerializer(
+    TimedSerializerMixin, RecipeImageVariantsMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Recipe
-        fields = ["id", "image"]
-        read_only_files = ["id"]
+        fields = ["id", "image", "image_status", "image_variants"]
+        read_only_fields = ["id", "image_status"]
         extra_kwargs = {"image": {"required": "True"}}
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+class BulkOperationsSerializer(serializers.Serializer):
+    """Operations on one model, items are validated by its own serializer"""
+
+    create = serializers.ListField(child=serializers.DictField(), default=list)
+    update = serializers.ListField(child=serializers.DictField(), default=list)
+    delete = serializers.ListField(child=serializers.IntegerField(), default=list)
+
+
+class RecipeBulkSerializer(serializers.Serializer):
+    recipes = BulkOperationsSerializer(required=False)
+    tags = BulkOperationsSerializer(required=False)
+    ingredients = BulkOperationsSerializer(required=False)
+
+    def validate(self, attrs):
+        size = sum(
+            len(items) for operations in attrs.values() for items in operations.values()
+        )
+        if size > settings.RECIPE_BULK_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f"A batch holds at most {settings.RECIPE_BULK_MAX_ITEMS} items"
+            )
+        return attrs
+
+
+class RecipeImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    input_format = serializers.ChoiceField(
+        choices=["csv", "ndjson"],
+        required=False,
+        help_text="Defaults to the extension of the uploaded file",
+    )
@@ -0,0 +1,375 @@
+"""Synthetic recipe collections for benchmarks and query plan checks
+
+Recipe counts per user follow a Zipf-like curve, so a few users own most of
+the data as in production. Tag and ingredient names are drawn from one
+shared vocabulary with skewed popularity, so users overlap on common names
+and each has a long tail of rare ones. Everything is derived from a seeded
+random generator; the same arguments always produce the same data.
+
+Users are created with bulk_create. Recipes, tags, ingredients and their
+links are written with COPY, using ids reserved from the sequences.
+"""
+
+import contextlib
+import random
+import time
+from decimal import Decimal
+from itertools import accumulate
+
+from core.models import Ingredient
+from core.models import Recipe
+from core.models import Tag
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.db import transaction
+from recipe.bulkload import copy_rows
+from recipe.bulkload import reserve_ids
+
+
+CUISINES = [
+    "Italian", "Mexican", "Thai", "Indian", "Japanese", "Greek", "French",
+    "Spanish", "Korean", "Lebanese", "Moroccan", "Vietnamese", "Peruvian",
+    "Turkish", "Ethiopian", "Brazilian", "Chinese", "German", "Nordic", "Cajun",
+]
+DIETS = [
+    "Vegan", "Vegetarian", "Gluten free", "Dairy free", "Keto", "Paleo",
+    "Low carb", "High protein", "Nut free", "Pescatarian",
+]
+OCCASIONS = [
+    "Breakfast", "Brunch", "Lunch", "Dinner", "Dessert", "Snack", "Party",
+    "Weeknight", "Holiday", "Picnic", "Barbecue", "Meal prep", "Quick",
+    "One pot", "Slow cooker", "Comfort food", "Spicy", "Healthy", "Kids",
+]
+INGREDIENT_BASES = [
+    "Salt", "Pepper", "Garlic", "Onion", "Tomato", "Olive oil", "Butter",
+    "Flour", "Sugar", "Egg", "Milk", "Rice", "Pasta", "Chicken", "Beef",
+    "Pork", "Tofu", "Lentils", "Chickpeas", "Potato", "Carrot", "Spinach",
+    "Basil", "Parsley", "Cilantro", "Lemon", "Lime", "Ginger", "Chili",
+    "Cumin", "Paprika", "Cinnamon", "Honey", "Yogurt", "Cheese", "Cream",
+    "Mushroom", "Bell pepper", "Zucchini", "Eggplant", "Salmon", "Shrimp",
+    "Coconut milk", "Soy sauce", "Vinegar", "Mustard", "Oats", "Almonds",
+    "Walnuts", "Apple", "Banana", "Berries", "Chocolate", "Vanilla",
+]
+INGREDIENT_VARIANTS = [
+    "", "Fresh", "Dried", "Smoked", "Ground", "Organic", "Roasted", "Chopped",
+    "Frozen", "Red", "Green", "Wild", "Sweet", "Sea", "Baby",
+]
+DISHES = [
+    "soup", "stew", "salad", "curry", "pie", "tart", "bowl", "wrap", "pasta",
+    "risotto", "tacos", "burger", "bake", "stir fry", "skewers", "cake",
+    "bread", "pancakes", "omelette", "noodles", "dumplings", "gratin",
+]
+STYLES = [
+    "Classic", "Easy", "Crispy", "Creamy", "Rustic", "Grandma's", "Smoky",
+    "Zesty", "Spiced", "Herby", "Golden", "Hearty", "Light", "Sticky",
+]
+
+
+def tag_vocabulary():
+    pairs = [
+        f"{cuisine} {occasion.lower()}"
+        for cuisine in CUISINES
+        for occasion in OCCASIONS
+    ]
+    return CUISINES + DIETS + OCCASIONS + pairs
+
+
+def ingredient_vocabulary():
+    return [
+        f"{variant} {base.lower()}" if variant else base
+        for variant in INGREDIENT_VARIANTS
+        for base in INGREDIENT_BASES
+    ]
+
+
+def zipf_weights(count, exponent):
+    """Weight of each rank, most popular first"""
+    return [1 / rank**exponent for rank in range(1, count + 1)]
+
+
+def zipf_counts(total, buckets, exponent):
+    """Split `total` over `buckets` proportionally to Zipf weights
+
+    Largest remainders get the leftovers, so the counts add up to `total`.
+    """
+    weights = zipf_weights(buckets, exponent)
+    scale = total / sum(weights)
+    shares = [weight * scale for weight in weights]
+    counts = [int(share) for share in shares]
+    by_remainder = sorted(
+        range(buckets), key=lambda i: shares[i] - counts[i], reverse=True
+    )
+    for i in by_remainder[: total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+class Vocabulary:
+    """Names with skewed popularity, drawn by a shared random generator"""
+
+    def __init__(self, names, rng, exponent):
+        self.names = list(names)
+        # Popularity must not follow the order of the word lists
+        rng.shuffle(self.names)
+        self.cum_weights = list(accumulate(zipf_weights(len(self.names), exponent)))
+
+    def sample(self, rng, count):
+        names = rng.choices(self.names, cum_weights=self.cum_weights, k=count)
+        return list(dict.fromkeys(names))
+
+
+@contextlib.contextmanager
+def foreign_keys_dropped(tables):
+    """Drop the foreign keys of `tables` and add them back on exit
+
+    Adding a constraint checks every row in one pass, which is much faster
+    than the per-row checks at commit of a bulk load.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) "
+            "FROM pg_constraint WHERE contype = 'f' "
+            "AND conrelid = ANY(%s::regclass[])",
+            [tables],
+        )
+        constraints = cursor.fetchall()
+        for table, name, _ in constraints:
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for table, name, definition in constraints:
+                cursor.execute(
+                    f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}'
+                )
+
+
+class DatasetReport:
+    def __init__(self):
+        self.users = 0
+        self.recipes = 0
+        self.tags = 0
+        self.ingredients = 0
+        self.links = 0
+        self.started = time.monotonic()
+        self.seconds = 0.0
+
+    @property
+    def recipes_per_second(self):
+        return round(self.recipes / self.seconds) if self.seconds else 0
+
+
+class DatasetGenerator:
+    """Generate users and their recipe collections
+
+    `users` accounts named user<n>@<email_domain> share `recipes` recipes,
+    the n-th user owning about 1/n**zipf_exponent of the largest share.
+    """
+
+    recipe_columns = [
+        "id",
+        "user_id",
+        "title",
+        "description",
+        "time_minutes",
+        "price",
+        "link",
+        "image",
+        "image_status",
+    ]
+
+    def __init__(
+        self,
+        users,
+        recipes,
+        seed=0,
+        zipf_exponent=1.1,
+        max_tags=5,
+        max_ingredients=12,
+        email_domain="synthetic.example.com",
+        password="password123",
+        batch_size=10000,
+        defer_foreign_keys=False,
+    ):
+        self.users = users
+        self.recipes = recipes
+        self.seed = seed
+        self.zipf_exponent = zipf_exponent
+        self.max_tags = max_tags
+        self.max_ingredients = max_ingredients
+        self.email_domain = email_domain
+        self.password = password
+        self.batch_size = batch_size
+        self.defer_foreign_keys = defer_foreign_keys
+
+    def email(self, number):
+        return f"user{number}@{self.email_domain}"
+
+    def run(self, progress=None):
+        """Write the dataset and return a DatasetReport"""
+        rng = random.Random(self.seed)
+        tags = Vocabulary(tag_vocabulary(), rng, 1.0)
+        ingredients = Vocabulary(ingredient_vocabulary(), rng, 1.0)
+        counts = zipf_counts(self.recipes, self.users, self.zipf_exponent)
+        # The biggest collections should not all sit at the lowest user ids
+        rng.shuffle(counts)
+
+        report = DatasetReport()
+        user_ids = self._create_users()
+        report.users = len(user_ids)
+
+        tables = [model._meta.db_table for model in _loaded_models()]
+        constraints = (
+            foreign_keys_dropped(tables)
+            if self.defer_foreign_keys
+            else contextlib.nullcontext()
+        )
+        with constraints:
+            batch = _Batch()
+            for user_id, count in zip(user_ids, counts):
+                # Names are unique per user, so the maps never outlive the user
+                names = {Tag: {}, Ingredient: {}}
+                for _ in range(count):
+                    batch.add(
+                        user_id,
+                        self._recipe(rng),
+                        tags.sample(rng, self._fan_out(rng, self.max_tags)),
+                        ingredients.sample(
+                            rng, self._fan_out(rng, self.max_ingredients, low=1)
+                        ),
+                        names,
+                    )
+                    if len(batch) >= self.batch_size:
+                        self._flush(batch, report)
+                        batch = _Batch()
+                        if progress:
+                            progress(report)
+            if len(batch):
+                self._flush(batch, report)
+
+        with connection.cursor() as cursor:
+            # Fresh statistics so EXPLAIN reflects the new data
+            for table in [get_user_model()._meta.db_table, *tables]:
+                cursor.execute(f"ANALYZE {table}")
+        report.seconds = time.monotonic() - report.started
+        return report
+
+    def _create_users(self):
+        # Hashing is slow by design; every user shares one hash
+        password = make_password(self.password)
+        model = get_user_model()
+        users = model.objects.bulk_create(
+            [
+                model(
+                    email=self.email(number), name=f"User {number}", password=password
+                )
+                for number in range(1, self.users + 1)
+            ],
+            batch_size=1000,
+        )
+        return [user.pk for user in users]
+
+    def _fan_out(self, rng, maximum, low=0):
+        # Most recipes have a few links, some have many
+        return min(maximum, low + int(rng.expovariate(1 / max(1, maximum / 3))))
+
+    def _recipe(self, rng):
+        title = (
+            f"{rng.choice(STYLES)} {rng.choice(CUISINES)} "
+            f"{rng.choice(INGREDIENT_BASES).lower()} {rng.choice(DISHES)}"
+        )
+        description = ""
+        if rng.random() < 0.6:
+            description = (
+                f"A {rng.choice(STYLES).lower()} {rng.choice(DISHES)} "
+                f"for {rng.choice(OCCASIONS).lower()}, ready in no time."
+            )
+        link = ""
+        if rng.random() < 0.3:
+            link = f"https://example.com/recipes/{rng.getrandbits(32):08x}"
+        return [
+            title,
+            description,
+            min(600, 5 + int(rng.expovariate(1 / 40))),
+            Decimal(rng.randint(50, 99999)) / 100,
+            link,
+        ]
+
+    def _flush(self, batch, report):
+        with transaction.atomic(), connection.cursor() as cursor:
+            recipe_ids = reserve_ids(cursor, Recipe, len(batch.recipes))
+            new_rows = {}
+            for model, pending in batch.new_names.items():
+                ids = reserve_ids(cursor, model, len(pending))
+                for obj_id, (user_id, name, names) in zip(ids, pending):
+                    names[name] = obj_id
+                # Counts start at zero, the link table triggers raise them
+                new_rows[model] = [
+                    (obj_id, user_id, name, 0)
+                    for obj_id, (user_id, name, _) in zip(ids, pending)
+                ]
+                copy_rows(
+                    cursor,
+                    model._meta.db_table,
+                    ["id", "user_id", "name", "recipe_count"],
+                    new_rows[model],
+                )
+            report.tags += len(new_rows[Tag])
+            report.ingredients += len(new_rows[Ingredient])
+
+            copy_rows(
+                cursor,
+                Recipe._meta.db_table,
+                self.recipe_columns,
+                [
+                    [recipe_id, user_id, *values, "", Recipe.ImageStatus.NONE]
+                    for recipe_id, (user_id, values) in zip(recipe_ids, batch.recipes)
+                ],
+            )
+            for field_name, model in (("tags", Tag), ("ingredients", Ingredient)):
+                field = Recipe._meta.get_field(field_name)
+                rows = [
+                    (recipe_ids[index], names[name])
+                    for index, name, names in batch.links[model]
+                ]
+                copy_rows(
+                    cursor,
+                    field.remote_field.through._meta.db_table,
+                    [field.m2m_column_name(), field.m2m_reverse_name()],
+                    rows,
+                )
+                report.links += len(rows)
+        report.recipes += len(batch.recipes)
+
+
+def _loaded_models():
+    return [Recipe, Tag, Ingredient] + [
+        Recipe._meta.get_field(name).remote_field.through
+        for name in ("tags", "ingredients")
+    ]
+
+
+class _Batch:
+    """Recipes waiting to be written, with their names and links"""
+
+    def __init__(self):
+        self.recipes = []
+        self.new_names = {Tag: [], Ingredient: []}
+        self.links = {Tag: [], Ingredient: []}
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def add(self, user_id, values, tags, ingredients, names):
+        index = len(self.recipes)
+        self.recipes.append((user_id, values))
+        for model, chosen in ((Tag, tags), (Ingredient, ingredients)):
+            known = names[model]
+            for name in chosen:
+                if name not in known:
+                    # Placeholder until the batch reserves an id for it
+                    known[name] = None
+                    self.new_names[model].append((user_id, name, known))
+                self.links[model].append((index, name, known))
@@ -0,0 +1,30 @@
+"""Query budget helpers for API tests"""
+
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Fail a test when a block runs more queries than it declared"""
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        with CaptureQueriesContext(connection) as ctx:
+            yield ctx
+        executed = len(ctx.captured_queries)
+        if executed > budget:
+            queries = "\n".join(
+                f"{i}. {query['sql']}"
+                for i, query in enumerate(ctx.captured_queries, start=1)
+            )
+            self.fail(
+                f"{executed} queries executed, budget is {budget}:\n{queries}"
+            )
+
+    def assertRequestWithinBudget(self, budget, method, url, *args, **kwargs):
+        """Run one request against `self.client` inside a query budget"""
+        with self.assertQueryBudget(budget):
+            res = getattr(self.client, method)(url, *args, **kwargs)
+        return res
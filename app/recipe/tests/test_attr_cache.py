@@ -0,0 +1,167 @@
+"""Tests for cached tag and ingredient lists"""
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from core.models import Ingredient
+from core.models import Recipe
+from core.models import Tag
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from recipe.cache import attr_list_cache
+from recipe.tests.query_budget import QueryBudgetMixin
+from recipe.views import TagViewSet
+from rest_framework.test import APIClient
+
+
+RECIPE_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+
+
+def names(res):
+    return [item["name"] for item in res.data["results"]]
+
+
+class AttrListCacheTests(QueryBudgetMixin, TestCase):
+    """Test list caching and invalidation"""
+
+    def setUp(self):
+        cache.clear()
+        attr_list_cache.reset_stats()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "cache@example.com", "pass12345"
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, **params):
+        defaults = {"title": "Soup", "time_minutes": 5, "price": Decimal("1.00")}
+        defaults.update(params)
+        return Recipe.objects.create(user=self.user, **defaults)
+
+    def test_second_list_is_served_from_cache(self):
+        Tag.objects.create(user=self.user, name="Vegan")
+        self.client.get(TAGS_URL)
+
+        # Only the collection version lookup for the ETag reaches the DB.
+        with self.assertQueryBudget(1):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(names(res), ["Vegan"])
+        self.assertEqual(attr_list_cache.stats()["hits"], 1)
+        self.assertEqual(attr_list_cache.stats()["misses"], 1)
+
+    def test_assigned_only_cached_separately(self):
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        Tag.objects.create(user=self.user, name="Quick")
+        self.create_recipe().tags.add(tag)
+
+        self.assertEqual(len(names(self.client.get(TAGS_URL))), 2)
+        res = self.client.get(TAGS_URL, {"assigned_only": 1})
+        self.assertEqual(names(res), ["Vegan"])
+
+    def test_update_invalidates(self):
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        self.client.get(TAGS_URL)
+
+        url = reverse("recipe:tag-detail", args=[tag.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, {"name": "Raw"})
+
+        self.assertEqual(names(self.client.get(TAGS_URL)), ["Raw"])
+
+    def test_destroy_invalidates(self):
+        ing = Ingredient.objects.create(user=self.user, name="Salt")
+        self.client.get(INGREDIENTS_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("recipe:ingredient-detail", args=[ing.id]))
+
+        self.assertEqual(names(self.client.get(INGREDIENTS_URL)), [])
+
+    def test_recipe_create_with_tags_invalidates(self):
+        self.client.get(TAGS_URL)
+        payload = {
+            "title": "Curry",
+            "time_minutes": 20,
+            "price": Decimal("3.00"),
+            "tags": [{"name": "Spicy"}],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(RECIPE_URL, payload, format="json")
+
+        self.assertEqual(names(self.client.get(TAGS_URL)), ["Spicy"])
+
+    def test_recipe_update_ingredients_invalidates_assigned_only(self):
+        recipe = self.create_recipe()
+        Ingredient.objects.create(user=self.user, name="Rice")
+        self.client.get(INGREDIENTS_URL, {"assigned_only": 1})
+
+        url = reverse("recipe:recipe-detail", args=[recipe.id])
+        payload = {"ingredients": [{"name": "Rice"}]}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, payload, format="json")
+
+        res = self.client.get(INGREDIENTS_URL, {"assigned_only": 1})
+        self.assertEqual(names(res), ["Rice"])
+
+    def test_recipe_delete_invalidates_assigned_only(self):
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        recipe = self.create_recipe()
+        recipe.tags.add(tag)
+        self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("recipe:recipe-detail", args=[recipe.id]))
+
+        self.assertEqual(names(self.client.get(TAGS_URL, {"assigned_only": 1})), [])
+
+    def test_recipe_title_update_keeps_cache(self):
+        recipe = self.create_recipe()
+        self.client.get(TAGS_URL)
+
+        url = reverse("recipe:recipe-detail", args=[recipe.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, {"title": "Stew"})
+        self.client.get(TAGS_URL)
+
+        self.assertEqual(attr_list_cache.stats()["hits"], 1)
+
+    def test_entry_read_before_invalidation_is_not_served(self):
+        Tag.objects.create(user=self.user, name="Vegan")
+        get_queryset = TagViewSet.get_queryset
+
+        def get_queryset_then_invalidate(view):
+            # A write commits after this request missed but before it stores
+            attr_list_cache.invalidate(self.user.pk, Tag)
+            return get_queryset(view)
+
+        with patch.object(TagViewSet, "get_queryset", get_queryset_then_invalidate):
+            self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+
+        self.assertEqual(attr_list_cache.stats()["misses"], 2)
+
+    def test_invalidation_waits_for_commit(self):
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        url = reverse("recipe:tag-detail", args=[tag.id])
+        generation = attr_list_cache._generation(Tag, self.user.pk)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.patch(url, {"name": "Raw"})
+        self.assertEqual(attr_list_cache._generation(Tag, self.user.pk), generation)
+        for callback in callbacks:
+            callback()
+
+        self.assertNotEqual(attr_list_cache._generation(Tag, self.user.pk), generation)
+
+    def test_users_do_not_share_entries(self):
+        other = get_user_model().objects.create_user("other@example.com", "pass")
+        Tag.objects.create(user=other, name="Fruit")
+        self.client.get(TAGS_URL)
+
+        self.client.force_authenticate(other)
+        self.assertEqual(names(self.client.get(TAGS_URL)), ["Fruit"])
@@ -0,0 +1,226 @@
+"""Tests for the recipe bulk endpoint"""
+
+from decimal import Decimal
+
+from core.models import Ingredient
+from core.models import Recipe
+from core.models import Tag
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.test import override_settings
+from django.urls import reverse
+from recipe.cache import attr_list_cache
+from recipe.tests.query_budget import QueryBudgetMixin
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+BULK_URL = reverse("recipe:recipe-bulk")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+def recipe_payload(i, **params):
+    payload = {"title": f"Recipe {i}", "time_minutes": 10, "price": "5.00"}
+    payload.update(params)
+    return payload
+
+
+def create_recipe(user, **params):
+    defaults = {"title": "Sample", "time_minutes": 5, "price": Decimal("2.50")}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicBulkApiTests(TestCase):
+    def test_auth_required(self):
+        res = APIClient().post(BULK_URL, {}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBulkApiTests(QueryBudgetMixin, TestCase):
+    """Test batched writes"""
+
+    def setUp(self):
+        attr_list_cache.cache.clear()
+        self.user = get_user_model().objects.create_user("bulk@example.com", "pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, payload):
+        return self.client.post(BULK_URL, payload, format="json")
+
+    def test_create_recipes_with_tags_and_ingredients(self):
+        Tag.objects.create(user=self.user, name="Vegan")
+        payload = {
+            "recipes": {
+                "create": [
+                    recipe_payload(
+                        i,
+                        tags=[{"name": "Vegan"}, {"name": "Quick"}],
+                        ingredients=[{"name": "Salt"}],
+                    )
+                    for i in range(3)
+                ]
+            }
+        }
+
+        res = self.post(payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data["recipes"]["create"]
+        self.assertEqual([r["status"] for r in results], [201] * 3)
+        for result in results:
+            recipe = Recipe.objects.get(id=result["id"], user=self.user)
+            names = sorted(tag.name for tag in recipe.tags.all())
+            self.assertEqual(names, ["Quick", "Vegan"])
+            self.assertEqual(recipe.ingredients.get().name, "Salt")
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_invalid_items_do_not_fail_the_batch(self):
+        payload = {
+            "recipes": {
+                "create": [
+                    recipe_payload(0),
+                    {"title": "No time", "price": "1.00"},
+                    recipe_payload(2),
+                ]
+            }
+        }
+
+        res = self.post(payload)
+
+        results = res.data["recipes"]["create"]
+        self.assertEqual([r["status"] for r in results], [201, 400, 201])
+        self.assertIn("time_minutes", results[1]["errors"])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_update_recipes(self):
+        tag = Tag.objects.create(user=self.user, name="Old")
+        recipes = [create_recipe(self.user, title=f"R{i}") for i in range(2)]
+        for recipe in recipes:
+            recipe.tags.add(tag)
+        payload = {
+            "recipes": {
+                "update": [
+                    {"id": recipes[0].id, "title": "Renamed"},
+                    {"id": recipes[1].id, "tags": [{"name": "New"}]},
+                ]
+            }
+        }
+
+        res = self.post(payload)
+
+        results = res.data["recipes"]["update"]
+        self.assertEqual([r["status"] for r in results], [200, 200])
+        recipes[0].refresh_from_db()
+        self.assertEqual(recipes[0].title, "Renamed")
+        self.assertEqual([t.name for t in recipes[0].tags.all()], ["Old"])
+        self.assertEqual([t.name for t in recipes[1].tags.all()], ["New"])
+
+    def test_delete_recipes(self):
+        recipe = create_recipe(self.user)
+        other = get_user_model().objects.create_user("other@example.com", "pass123")
+        foreign = create_recipe(other)
+
+        res = self.post({"recipes": {"delete": [recipe.id, foreign.id]}})
+
+        results = res.data["recipes"]["delete"]
+        self.assertEqual([r["status"] for r in results], [204, 404])
+        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=foreign.id).exists())
+
+    def test_other_users_recipes_cannot_be_updated(self):
+        other = get_user_model().objects.create_user("other@example.com", "pass123")
+        foreign = create_recipe(other, title="Theirs")
+
+        res = self.post({"recipes": {"update": [{"id": foreign.id, "title": "Mine"}]}})
+
+        self.assertEqual(res.data["recipes"]["update"][0]["status"], 404)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.title, "Theirs")
+
+    def test_tag_and_ingredient_operations(self):
+        tag = Tag.objects.create(user=self.user, name="Old")
+        Tag.objects.create(user=self.user, name="Taken")
+        ingredient = Ingredient.objects.create(user=self.user, name="Salt")
+        payload = {
+            "tags": {
+                "create": [{"name": "Fresh"}, {"name": ""}],
+                "update": [
+                    {"id": tag.id, "name": "Taken"},
+                    {"id": tag.id, "name": "Renamed"},
+                ],
+            },
+            "ingredients": {"delete": [ingredient.id]},
+        }
+
+        res = self.post(payload)
+
+        tags = res.data["tags"]
+        self.assertEqual([r["status"] for r in tags["create"]], [201, 400])
+        self.assertEqual([r["status"] for r in tags["update"]], [400, 200])
+        self.assertEqual(res.data["ingredients"]["delete"][0]["status"], 204)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, "Renamed")
+        self.assertTrue(Tag.objects.filter(user=self.user, name="Fresh").exists())
+        self.assertFalse(Ingredient.objects.filter(id=ingredient.id).exists())
+
+    def test_duplicate_renames_in_one_batch(self):
+        first = Tag.objects.create(user=self.user, name="A")
+        second = Tag.objects.create(user=self.user, name="B")
+        payload = {
+            "tags": {
+                "update": [
+                    {"id": first.id, "name": "C"},
+                    {"id": second.id, "name": "C"},
+                ]
+            }
+        }
+
+        res = self.post(payload)
+
+        self.assertEqual([r["status"] for r in res.data["tags"]["update"]], [200, 400])
+
+    def test_batch_invalidates_caches(self):
+        self.client.get(TAGS_URL)
+        version = self.user.collection_version
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post({"tags": {"create": [{"name": "Fresh"}]}})
+
+        res = self.client.get(TAGS_URL)
+        self.assertEqual([t["name"] for t in res.data["results"]], ["Fresh"])
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.collection_version, version)
+
+    @override_settings(RECIPE_BULK_MAX_ITEMS=2)
+    def test_batch_size_is_limited(self):
+        payload = {"recipes": {"create": [recipe_payload(i) for i in range(3)]}}
+
+        res = self.post(payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_query_count_does_not_grow_with_batch(self):
+        def payload(count):
+            return {
+                "recipes": {
+                    "create": [
+                        recipe_payload(
+                            i,
+                            tags=[{"name": f"Tag {i}"}, {"name": "Shared"}],
+                            ingredients=[{"name": f"Ing {i}"}],
+                        )
+                        for i in range(count)
+                    ]
+                }
+            }
+
+        with self.assertQueryBudget(12):
+            self.post(payload(1))
+        with self.assertQueryBudget(12):
+            res = self.post(payload(50))
+
+        self.assertEqual(len(res.data["recipes"]["create"]), 50)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 51)
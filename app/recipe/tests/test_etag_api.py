@@ -0,0 +1,99 @@
+"""Tests for ETag / If-None-Match on recipe APIs"""
+
+from decimal import Decimal
+
+from core.models import Ingredient
+from core.models import Recipe
+from core.models import Tag
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from recipe.tests.query_budget import QueryBudgetMixin
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+RECIPE_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    defaults = {"title": "Soup", "time_minutes": 10, "price": Decimal("3.00")}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ETagApiTests(QueryBudgetMixin, TestCase):
+    """Test conditional GETs"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "etag@example.com", "pass12345"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_modified(self):
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        etag = res["ETag"]
+
+        with self.assertQueryBudget(1):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertFalse(res.content)
+
+    def test_detail_not_modified(self):
+        recipe = create_recipe(user=self.user)
+        res = self.client.get(detail_url(recipe.id))
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_recipe_write_changes_etag(self):
+        recipe = create_recipe(user=self.user)
+        etag = self.client.get(RECIPE_URL)["ETag"]
+
+        self.client.patch(detail_url(recipe.id), {"title": "Stew"})
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_delete_changes_etag(self):
+        recipe = create_recipe(user=self.user)
+        etag = self.client.get(detail_url(recipe.id))["ETag"]
+
+        recipe.delete()
+
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tag_and_ingredient_writes_change_etag(self):
+        for url, model in ((TAGS_URL, Tag), (INGREDIENTS_URL, Ingredient)):
+            obj = model.objects.create(user=self.user, name="Spicy")
+            etag = self.client.get(url)["ETag"]
+            obj.name = "Mild"
+            obj.save()
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_other_users_writes_keep_etag(self):
+        other = get_user_model().objects.create_user("other@example.com", "pass")
+        etag = self.client.get(RECIPE_URL)["ETag"]
+
+        create_recipe(user=other)
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_varies_with_query(self):
+        etag = self.client.get(RECIPE_URL)["ETag"]
+        res = self.client.get(RECIPE_URL, {"page_size": 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,160 @@
+"""Tests for the streaming recipe export"""
+
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+from decimal import Decimal
+
+from core.models import Ingredient
+from core.models import Recipe
+from core.models import Tag
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase
+from django.test import override_settings
+from django.urls import reverse
+from recipe.tests.query_budget import QueryBudgetMixin
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+def create_recipe(user, **params):
+    defaults = {"title": "Sample", "time_minutes": 5, "price": Decimal("2.50")}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def read_ndjson(content):
+    return [json.loads(line) for line in content.decode().splitlines()]
+
+
+class PublicExportApiTests(TestCase):
+    def test_auth_required(self):
+        res = APIClient().get(EXPORT_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateExportApiTests(QueryBudgetMixin, TestCase):
+    """Test exporting the recipes of the authenticated user"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("exp@example.com", "pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return res, b"".join(res.streaming_content)
+
+    def test_export_ndjson(self):
+        recipe = create_recipe(self.user, title="Soup", description="Hot")
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+        quick = Tag.objects.create(user=self.user, name="Quick")
+        salt = Ingredient.objects.create(user=self.user, name="Salt")
+        recipe.tags.add(quick, vegan)
+        recipe.ingredients.add(salt)
+        create_recipe(self.user, title="Plain")
+        other = get_user_model().objects.create_user("o@example.com", "pass123")
+        create_recipe(other, title="Theirs")
+
+        res, content = self.export()
+
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        rows = read_ndjson(content)
+        self.assertEqual([row["title"] for row in rows], ["Soup", "Plain"])
+        self.assertEqual(rows[0]["price"], "2.50")
+        self.assertEqual(rows[0]["description"], "Hot")
+        self.assertEqual(
+            rows[0]["tags"],
+            [{"id": vegan.id, "name": "Vegan"}, {"id": quick.id, "name": "Quick"}],
+        )
+        self.assertEqual(rows[0]["ingredients"], [{"id": salt.id, "name": "Salt"}])
+        self.assertEqual(rows[1]["tags"], [])
+        self.assertIsNone(rows[1]["image"])
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_spans_chunks(self):
+        tag = Tag.objects.create(user=self.user, name="Tag")
+        recipes = [create_recipe(self.user, title=f"R{i}") for i in range(5)]
+        for recipe in recipes:
+            recipe.tags.add(tag)
+
+        _, content = self.export()
+
+        rows = read_ndjson(content)
+        self.assertEqual([row["id"] for row in rows], [r.id for r in recipes])
+        for row in rows:
+            self.assertEqual(row["tags"], [{"id": tag.id, "name": "Tag"}])
+
+    def test_export_queries_per_chunk_not_per_recipe(self):
+        tag = Tag.objects.create(user=self.user, name="Tag")
+        for i in range(20):
+            create_recipe(self.user, title=f"R{i}").tags.add(tag)
+
+        # The cursor query, plus one lookup each for the tags and ingredients
+        # of the single chunk.
+        with self.assertQueryBudget(3):
+            self.export()
+
+
+class ZipExportApiTests(TestCase):
+    """Test the ZIP export with image files"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user("zip@example.com", "pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_export_zip_with_images(self):
+        recipe = create_recipe(self.user, title="Pictured")
+        recipe.image.save("photo.jpg", ContentFile(b"jpeg bytes"))
+        create_recipe(self.user, title="Plain")
+
+        res = self.client.get(EXPORT_URL, {"include_images": 1})
+
+        self.assertEqual(res["Content-Type"], "application/zip")
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(res.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        # Streamed entries carry zip64 headers so they may exceed 2 GiB
+        for info in archive.infolist():
+            self.assertGreaterEqual(info.extract_version, zipfile.ZIP64_VERSION)
+        rows = read_ndjson(archive.read("recipes.ndjson"))
+        self.assertEqual([row["title"] for row in rows], ["Pictured", "Plain"])
+        self.assertEqual(rows[0]["image"], recipe.image.name)
+        self.assertEqual(archive.read(recipe.image.name), b"jpeg bytes")
+
+    def test_shared_image_exported_once(self):
+        for title in ("First", "Second"):
+            recipe = create_recipe(self.user, title=title)
+            recipe.image.save("photo.jpg", ContentFile(b"jpeg bytes"))
+
+        res = self.client.get(EXPORT_URL, {"include_images": 1})
+
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(res.streaming_content)))
+        self.assertEqual(archive.namelist(), ["recipes.ndjson", recipe.image.name])
+
+    def test_missing_image_file_is_skipped(self):
+        recipe = create_recipe(self.user)
+        recipe.image.save("photo.jpg", ContentFile(b"jpeg bytes"))
+        recipe.image.storage.delete(recipe.image.name)
+
+        with self.assertLogs("recipe.export", level="WARNING"):
+            res = self.client.get(EXPORT_URL, {"include_images": 1})
+            content = b"".join(res.streaming_content)
+
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertEqual(archive.namelist(), ["recipes.ndjson"])
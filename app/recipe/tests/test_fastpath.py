@@ -0,0 +1,104 @@
+"""Parity of the serializer-free recipe list with RecipeSerializer"""
+
+from decimal import Decimal
+from itertools import combinations
+
+from core.models import Ingredient
+from core.models import Recipe
+from core.models import Tag
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from recipe import fastpath
+from recipe.serializers import RecipeSerializer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+
+RECIPE_URL = reverse("recipe:recipe-list")
+
+FIELDS = list(RecipeSerializer.Meta.fields)
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+class FastPathParityTests(TestCase):
+    """The fast path must render byte for byte what RecipeSerializer does"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("fp@example.com", "pass123")
+        tags = [Tag.objects.create(user=cls.user, name=n) for n in ["b", "a", "Ünï"]]
+        salt = Ingredient.objects.create(user=cls.user, name="Salt")
+        samples = [
+            ("Plain", Decimal("5"), ""),
+            ("Priced", Decimal("999.99"), "https://example.com/?q=1&x=\"y\""),
+            ("Cheap", Decimal("0.10"), ""),
+            ("Ünïcode ☃ title", Decimal("12.30"), "link"),
+        ]
+        cls.recipes = []
+        for i, (title, price, link) in enumerate(samples):
+            recipe = Recipe.objects.create(
+                user=cls.user, title=title, time_minutes=i, price=price, link=link
+            )
+            cls.recipes.append(recipe)
+        # Link tags out of id order to check nested ordering
+        cls.recipes[0].tags.add(tags[2], tags[0])
+        cls.recipes[1].tags.add(*tags)
+        cls.recipes[1].ingredients.add(salt)
+        cls.recipes[3].ingredients.add(salt)
+
+    def serializer_output(self, fields=None):
+        queryset = Recipe.objects.filter(user=self.user).order_by("-id")
+        serializer = RecipeSerializer(
+            queryset.prefetch_related("tags", "ingredients"), many=True, fields=fields
+        )
+        return render(serializer.data)
+
+    def fast_output(self, fields=FIELDS):
+        queryset = Recipe.objects.filter(user=self.user).order_by("-id")
+        rows = queryset.values(*fastpath.list_columns(fields))
+        return render(fastpath.render_recipes(rows, fields))
+
+    def test_full_parity(self):
+        self.assertEqual(self.fast_output(), self.serializer_output())
+
+    def test_parity_for_field_subsets(self):
+        for size in (1, 2, 3):
+            for fields in combinations(FIELDS, size):
+                with self.subTest(fields=fields):
+                    self.assertEqual(
+                        self.fast_output(list(fields)),
+                        self.serializer_output(list(fields)),
+                    )
+
+    def test_serializer_fields_are_all_handled(self):
+        """Adding a serializer field needs a matching fast path change"""
+        declared = RecipeSerializer().fields
+        for name in FIELDS:
+            with self.subTest(field=name):
+                if name in fastpath.NESTED:
+                    continue
+                self.assertEqual(declared[name].source, name)
+                Recipe._meta.get_field(name)
+
+    def test_api_list_matches_serializer(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(RECIPE_URL, {"paginate": 0})
+
+        self.assertEqual(res.content, self.serializer_output())
+
+    def test_api_search_pages_match_serializer(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(RECIPE_URL, {"search": "title", "paginate": 0})
+
+        expected = RecipeSerializer(
+            Recipe.objects.filter(id=self.recipes[3].id), many=True
+        ).data
+        self.assertEqual(res.content, render(expected))
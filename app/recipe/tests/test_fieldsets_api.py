@@ -0,0 +1,101 @@
+"""Tests for ?fields= and ?omit= on recipe endpoints"""
+
+from decimal import Decimal
+
+from core.models import Recipe
+from core.models import Tag
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+RECIPE_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def recipe_queries(ctx):
+    return [q["sql"] for q in ctx.captured_queries if 'FROM "core_recipe"' in q["sql"]]
+
+
+def tables_queried(ctx):
+    return " ".join(q["sql"] for q in ctx.captured_queries)
+
+
+class SparseFieldsetApiTests(TestCase):
+    """Test clients can trim responses and the queries behind them"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("f@example.com", "pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title="Soup",
+            description="Hot",
+            time_minutes=10,
+            price=Decimal("2.00"),
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+
+    def test_list_fields(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {"fields": "id,title"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"], [{"id": self.recipe.id, "title": "Soup"}])
+        [sql] = recipe_queries(ctx)
+        self.assertNotIn('"core_recipe"."price"', sql)
+        self.assertNotIn('"core_recipe"."description"', sql)
+        self.assertNotIn("core_recipe_tags", tables_queried(ctx))
+        self.assertNotIn("core_recipe_ingredients", tables_queried(ctx))
+
+    def test_list_omit_prefetches_only_requested_relations(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {"omit": "ingredients,link"})
+
+        result = res.data["results"][0]
+        self.assertNotIn("ingredients", result)
+        self.assertNotIn("link", result)
+        self.assertEqual(result["tags"][0]["name"], "Vegan")
+        self.assertIn("core_recipe_tags", tables_queried(ctx))
+        self.assertNotIn("core_recipe_ingredients", tables_queried(ctx))
+
+    def test_detail_fields_with_derived_field(self):
+        res = self.client.get(
+            detail_url(self.recipe.id), {"fields": "description,image_variants"}
+        )
+
+        self.assertEqual(res.data, {"description": "Hot", "image_variants": None})
+
+    def test_unknown_field_rejected(self):
+        res = self.client.get(RECIPE_URL, {"fields": "id,secret"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", res.data)
+
+    def test_fields_ignored_on_writes(self):
+        payload = {"title": "Tart", "time_minutes": 5, "price": "3.00"}
+
+        res = self.client.post(f"{RECIPE_URL}?fields=id", payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["title"], "Tart")
+
+    def test_tag_list_fields(self):
+        res = self.client.get(TAGS_URL, {"fields": "name"})
+
+        self.assertEqual(res.data["results"], [{"name": "Vegan"}])
+
+    def test_sparse_and_full_responses_get_different_etags(self):
+        full = self.client.get(detail_url(self.recipe.id))
+        sparse = self.client.get(detail_url(self.recipe.id), {"fields": "id"})
+
+        self.assertNotEqual(full["ETag"], sparse["ETag"])
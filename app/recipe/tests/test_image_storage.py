@@ -0,0 +1,193 @@
+"""Tests for content-addressed recipe image storage"""
+
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from io import StringIO
+
+from core.models import ImageBlob
+from core.models import Recipe
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import OperationalError
+from django.db import connection
+from django.db import connections
+from django.db import transaction
+from django.test import TestCase
+from django.test import TransactionTestCase
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from recipe import images
+from rest_framework.test import APIClient
+
+
+def image_upload_url(recipe_id):
+    return reverse("recipe:recipe-upload-image", args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    defaults = {"title": "Sample", "time_minutes": 5, "price": Decimal("2.50")}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def jpeg_bytes(color="red"):
+    buffer = BytesIO()
+    Image.new("RGB", (40, 20), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def refcounts():
+    return dict(ImageBlob.objects.values_list("name", "refcount"))
+
+
+@override_settings(RECIPE_IMAGE_WORKERS=0)
+class ImageStorageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user("i@example.com", "pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipes = [create_recipe(self.user) for _ in range(2)]
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(path, name), self.media_root)
+            for path, _, names in os.walk(self.media_root)
+            for name in names
+        )
+
+    def upload(self, recipe, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                image_upload_url(recipe.id),
+                {"image": ContentFile(data, name="upload.jpg")},
+                format="multipart",
+            )
+        recipe.refresh_from_db()
+        return recipe.image.name
+
+    def test_identical_uploads_share_one_blob(self):
+        data = jpeg_bytes()
+        names = [self.upload(recipe, data) for recipe in self.recipes]
+
+        self.assertEqual(names[0], names[1])
+        self.assertRegex(names[0], r"^images/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}.jpg$")
+        self.assertEqual(refcounts()[names[0]], 2)
+        variants = [
+            name for name in self.stored_files() if images.is_variant_name(name)
+        ]
+        self.assertEqual(len(variants), 3)
+
+    def test_refcount_follows_recipes(self):
+        name = self.recipes[0].image.storage.save("a.jpg", ContentFile(b"a"))
+        self.assertEqual(refcounts(), {name: 0})
+
+        for recipe in self.recipes:
+            recipe.image = name
+            recipe.save()
+        self.assertEqual(refcounts(), {name: 2})
+
+        Recipe.objects.filter(id=self.recipes[0].id).update(image="")
+        self.recipes[1].delete()
+        self.assertEqual(refcounts(), {name: 0})
+
+    def test_collect_garbage_keeps_referenced_blobs(self):
+        kept = self.upload(self.recipes[0], jpeg_bytes("red"))
+        dropped = self.upload(self.recipes[1], jpeg_bytes("blue"))
+        self.recipes[1].delete()
+
+        deleted = images.collect_garbage(grace=0)
+
+        # Both raw uploads and the processed image of the deleted recipe
+        self.assertEqual(deleted, 3)
+        files = self.stored_files()
+        self.assertIn(kept, files)
+        for name in [kept, *images.variant_names(kept).values()]:
+            self.assertIn(name, files)
+        for name in [dropped, *images.variant_names(dropped).values()]:
+            self.assertNotIn(name, files)
+        self.assertEqual(refcounts(), {kept: 1})
+
+    def test_collect_garbage_respects_grace(self):
+        storage = self.recipes[0].image.storage
+        name = storage.save("a.jpg", ContentFile(b"a"))
+
+        self.assertEqual(images.collect_garbage(grace=60), 0)
+        ImageBlob.objects.filter(name=name).update(
+            touched_at=timezone.now() - timedelta(seconds=120)
+        )
+        # Saving the same content again restarts the grace period
+        storage.save("b.jpg", ContentFile(b"a"))
+        self.assertEqual(images.collect_garbage(grace=60), 0)
+        self.assertTrue(storage.exists(name))
+
+    def test_migrate_legacy_images(self):
+        legacy = os.path.join(self.media_root, "uploads", "recipe")
+        os.makedirs(legacy)
+        data = jpeg_bytes()
+        for filename in ["one.jpg", "one_thumb.jpg", "two.jpg", "orphan.jpg"]:
+            with open(os.path.join(legacy, filename), "wb") as legacy_file:
+                legacy_file.write(data)
+        for recipe, filename in zip(self.recipes, ["one.jpg", "two.jpg"]):
+            Recipe.objects.filter(id=recipe.id).update(
+                image=f"uploads/recipe/{filename}"
+            )
+        out = StringIO()
+
+        call_command("migrate_recipe_images", stdout=out)
+
+        self.assertIn("Moved 2 images", out.getvalue())
+        self.assertIn("Registered 1 unreferenced files", out.getvalue())
+        names = {recipe.image.name for recipe in Recipe.objects.all()}
+        self.assertEqual(len(names), 1)
+        (blob,) = names
+        self.assertTrue(blob.startswith("images/"))
+        self.assertIn(images.variant_name(blob, "thumb"), self.stored_files())
+
+        call_command("collect_recipe_images", grace=0, stdout=StringIO())
+
+        self.assertEqual(
+            self.stored_files(), sorted([blob, images.variant_name(blob, "thumb")])
+        )
+
+
+class BlobLockTests(TransactionTestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("l@example.com", "pass123")
+        self.recipe = create_recipe(user, image="images/shared.jpg")
+        # Holds the blob row lock, as collect_garbage does while deleting
+        self.other = connections.create_connection("default")
+        self.addCleanup(self.other.close)
+        self.other.set_autocommit(False)
+        with self.other.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM core_imageblob WHERE name = %s FOR UPDATE",
+                ["images/shared.jpg"],
+            )
+        self.addCleanup(self.other.rollback)
+
+    def update(self, **values):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL lock_timeout = '200ms'")
+            Recipe.objects.filter(id=self.recipe.id).update(**values)
+
+    def test_updates_keeping_the_image_do_not_wait(self):
+        self.update(title="Stew", image_status=Recipe.ImageStatus.READY)
+
+    def test_image_changes_wait(self):
+        with self.assertRaises(OperationalError):
+            self.update(image="")
@@ -0,0 +1,208 @@
+"""Tests for the COPY based recipe import"""
+
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from core.models import Ingredient
+from core.models import Recipe
+from core.models import Tag
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.test import override_settings
+from django.urls import reverse
+from recipe.importer import RecipeImporter
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+IMPORT_URL = reverse("recipe:recipe-import")
+EXPORT_URL = reverse("recipe:recipe-export")
+RECIPE_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+CSV_INPUT = """title,description,time_minutes,price,link,tags,ingredients
+Soup,Hot tomato soup,20,4.50,,Vegan|Quick,Tomato|Salt
+Tart,,45,7.25,https://example.com,Vegan,Flour
+,No title,10,1.00,,,
+Stew,,slow,3.00,,,
+"""
+
+
+def ndjson(*rows):
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+class RecipeImporterTests(TestCase):
+    """Test the importer against the database"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("imp@example.com", "pass123")
+
+    def test_import_csv(self):
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+
+        report = RecipeImporter(self.user).run(StringIO(CSV_INPUT), "csv")
+
+        self.assertEqual((report.rows, report.imported, report.failed), (4, 2, 2))
+        self.assertEqual([e["row"] for e in report.errors], [3, 4])
+        self.assertIn("title", report.errors[0]["errors"])
+        self.assertIn("time_minutes", report.errors[1]["errors"])
+        soup = Recipe.objects.get(user=self.user, title="Soup")
+        self.assertEqual(soup.price, Decimal("4.50"))
+        self.assertEqual(soup.description, "Hot tomato soup")
+        self.assertEqual(
+            sorted(soup.tags.values_list("name", flat=True)), ["Quick", "Vegan"]
+        )
+        self.assertEqual(
+            sorted(soup.ingredients.values_list("name", flat=True)),
+            ["Salt", "Tomato"],
+        )
+        tart = Recipe.objects.get(user=self.user, title="Tart")
+        self.assertEqual(list(tart.tags.all()), [vegan])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_import_ndjson_in_batches(self):
+        rows = [
+            {
+                "title": f"Recipe {i}",
+                "time_minutes": i,
+                "price": "2.00",
+                "tags": [{"name": f"Tag {i % 2}"}],
+                "ingredients": ["Water"],
+            }
+            for i in range(5)
+        ]
+        lines = ndjson(*rows) + "\nnot json\n[1]\n"
+
+        report = RecipeImporter(self.user, batch_size=2).run(StringIO(lines), "ndjson")
+
+        self.assertEqual((report.imported, report.failed), (5, 2))
+        recipes = Recipe.objects.filter(user=self.user).order_by("id")
+        self.assertEqual([r.title for r in recipes], [r["title"] for r in rows])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        for recipe in recipes:
+            self.assertEqual(recipe.ingredients.get().name, "Water")
+
+    def test_imported_ids_do_not_collide_with_new_recipes(self):
+        RecipeImporter(self.user).run(StringIO(CSV_INPUT), "csv")
+        imported = list(Recipe.objects.values_list("id", flat=True))
+
+        recipe = Recipe.objects.create(
+            user=self.user, title="After", time_minutes=1, price=Decimal("1.00")
+        )
+
+        self.assertGreater(recipe.id, max(imported))
+
+    def test_rejects_unknown_format(self):
+        with self.assertRaises(ValueError):
+            RecipeImporter(self.user).run(StringIO(""), "xml")
+
+
+class ImportCommandTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("cmd@example.com", "pass123")
+
+    def test_import_command_reports_throughput_and_errors(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write(CSV_INPUT)
+        self.addCleanup(os.remove, f.name)
+        out, err = StringIO(), StringIO()
+
+        call_command(
+            "import_recipes", f.name, user=self.user.email, stdout=out, stderr=err
+        )
+
+        self.assertIn("Imported 2 of 4 rows", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+        self.assertIn("Row 3:", err.getvalue())
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_import_command_unknown_user(self):
+        with self.assertRaises(CommandError):
+            call_command("import_recipes", "in.csv", user="nobody@example.com")
+
+
+class ImportApiTests(TestCase):
+    """Test the upload endpoint"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("api@example.com", "pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, **data):
+        if isinstance(content, str):
+            content = content.encode()
+        upload = SimpleUploadedFile(name, content)
+        data["file"] = upload
+        return self.client.post(IMPORT_URL, data, format="multipart")
+
+    def test_auth_required(self):
+        res = APIClient().post(IMPORT_URL, {})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_upload_csv(self):
+        version = self.user.collection_version
+
+        res = self.upload("recipes.csv", CSV_INPUT)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["imported"], 2)
+        self.assertEqual(len(res.data["errors"]), 2)
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.collection_version, version)
+
+    @override_settings(RECIPE_IMPORT_BATCH_SIZE=50)
+    def test_undecodable_input_keeps_committed_batches(self):
+        self.client.get(TAGS_URL)
+        version = self.user.collection_version
+        row = {"title": "Soup", "time_minutes": 5, "price": "1.00", "tags": ["Vegan"]}
+        # Well past the first chunk the decoder reads
+        content = ndjson(*[row] * 400).encode() + b"\xff\n"
+
+        res = self.upload("recipes.ndjson", content)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("file", res.data)
+        imported = res.data["report"]["imported"]
+        self.assertGreater(imported, 0)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), imported)
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.collection_version, version)
+        res = self.client.get(TAGS_URL)
+        self.assertEqual([tag["name"] for tag in res.data["results"]], ["Vegan"])
+
+    def test_imported_recipes_are_searchable(self):
+        self.upload("recipes.csv", CSV_INPUT)
+
+        res = self.client.get(RECIPE_URL, {"search": "tomato"})
+
+        self.assertEqual([r["title"] for r in res.data["results"]], ["Soup"])
+
+    def test_export_round_trip(self):
+        self.upload("recipes.csv", CSV_INPUT)
+        exported = b"".join(self.client.get(EXPORT_URL).streaming_content).decode()
+        other = get_user_model().objects.create_user("o@example.com", "pass123")
+        self.client.force_authenticate(other)
+
+        res = self.upload("export.ndjson", exported)
+
+        self.assertEqual(res.data["imported"], 2)
+        titles = Recipe.objects.filter(user=other).values_list("title", flat=True)
+        self.assertEqual(sorted(titles), ["Soup", "Tart"])
+        self.assertEqual(Tag.objects.filter(user=other).count(), 2)
+
+    def test_format_from_field(self):
+        res = self.upload("upload.txt", CSV_INPUT, input_format="csv")
+        self.assertEqual(res.data["imported"], 2)
+
+    def test_unknown_format_rejected(self):
+        res = self.upload("upload.txt", CSV_INPUT)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -45,7 +45,7 @@ class PrivateIngredientAPI(TestCase):
         ingredients = Ingredient.objects.all().order_by("-name")
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_ingredient_limited_to_user(self):
         user2 = create_user(email="user2@example.com")
@@ -53,9 +53,9 @@ class PrivateIngredientAPI(TestCase):
         Ingredient.objects.create(user=user2, name="Pepper")
         res = self.client.get(INGREDIENT_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], ing.name)
-        self.assertEqual(res.data[0]["id"], ing.id)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], ing.name)
+        self.assertEqual(res.data["results"][0]["id"], ing.id)
 
     def test_update_ingredient(self):
         ingredient = Ingredient.objects.create(user=self.user, name="Fruit")
@@ -82,10 +82,11 @@ class PrivateIngredientAPI(TestCase):
         )
         recipe.ingredients.add(in1)
         res = self.client.get(INGREDIENT_URL, {"assigned_only": 1})
+        in1.refresh_from_db()
         s1 = IngredientSerializer(in1)
         s2 = IngredientSerializer(in2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertNotIn(s2.data, res.data["results"])
 
     def test_filter_distinct_ingredients(self):
         """Check no duplicates in response"""
@@ -100,4 +101,4 @@ class PrivateIngredientAPI(TestCase):
         recipe1.ingredients.add(in1)
         recipe2.ingredients.add(in1)
         res = self.client.get(INGREDIENT_URL, {"assigned_only": 1})
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
@@ -0,0 +1,215 @@
+"""Query budget tests for recipe endpoints"""
+
+from decimal import Decimal
+
+from core.models import Ingredient
+from core.models import Recipe
+from core.models import Tag
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from recipe.tests.query_budget import QueryBudgetMixin
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+RECIPE_URL = reverse("recipe:recipe-list")
+
+# Declared number of queries each endpoint may run, independent of row count.
+RECIPE_LIST_BUDGET = 4
+RECIPE_DETAIL_BUDGET = 4
+RECIPE_CREATE_BUDGET = 14
+RECIPE_UPDATE_BUDGET = 19
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def create_recipes(user, count, tags_per_recipe=3, ingredients_per_recipe=3):
+    recipes = []
+    for i in range(count):
+        recipe = Recipe.objects.create(
+            user=user,
+            title=f"Recipe {i}",
+            time_minutes=10,
+            price=Decimal("5.00"),
+        )
+        for j in range(tags_per_recipe):
+            tag, _ = Tag.objects.get_or_create(user=user, name=f"Tag {j}")
+            recipe.tags.add(tag)
+        for j in range(ingredients_per_recipe):
+            ing, _ = Ingredient.objects.get_or_create(user=user, name=f"Ing {j}")
+            recipe.ingredients.add(ing)
+        recipes.append(recipe)
+    return recipes
+
+
+class QueryBudgetHarnessTests(QueryBudgetMixin, TestCase):
+    """Test the harness itself"""
+
+    def test_budget_exceeded_fails(self):
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget(1):
+                list(Tag.objects.all())
+                list(Tag.objects.all())
+
+    def test_budget_respected_passes(self):
+        with self.assertQueryBudget(1):
+            list(Tag.objects.all())
+
+
+class RecipeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Recipe endpoints must run a fixed number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "budget@example.com", "pass12345"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_budget_does_not_grow_with_rows(self):
+        for count in (1, 10):
+            create_recipes(self.user, count)
+            res = self.assertRequestWithinBudget(RECIPE_LIST_BUDGET, "get", RECIPE_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_deep_page_uses_keyset_only(self):
+        create_recipes(self.user, 5, tags_per_recipe=0, ingredients_per_recipe=0)
+        res = self.client.get(RECIPE_URL, {"page_size": 2})
+        res = self.client.get(res.data["next"])
+        with self.assertQueryBudget(RECIPE_LIST_BUDGET) as ctx:
+            res = self.client.get(res.data["next"])
+        self.assertEqual(len(res.data["results"]), 1)
+        for query in ctx.captured_queries:
+            self.assertNotIn("COUNT(", query["sql"])
+            self.assertNotIn("OFFSET", query["sql"])
+
+    def test_filtered_list_budget(self):
+        recipes = create_recipes(self.user, 10)
+        tag_ids = ",".join(str(t.id) for t in recipes[0].tags.all())
+        for match in ("any", "all"):
+            with self.assertQueryBudget(RECIPE_LIST_BUDGET) as ctx:
+                res = self.client.get(RECIPE_URL, {"tags": tag_ids, "match": match})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data["results"]), 10)
+            self.assertNotIn("DISTINCT", ctx.captured_queries[0]["sql"])
+
+    def test_detail_budget(self):
+        recipe = create_recipes(self.user, 1, tags_per_recipe=10)[0]
+        res = self.assertRequestWithinBudget(
+            RECIPE_DETAIL_BUDGET, "get", detail_url(recipe.id)
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["tags"]), 10)
+
+
+class RecipeWriteQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Recipe writes must not scale queries with tags or ingredients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "writer@example.com", "pass12345"
+        )
+        self.client.force_authenticate(self.user)
+
+    def _payload(self, count):
+        return {
+            "title": "Bulk",
+            "time_minutes": 10,
+            "price": Decimal("1.00"),
+            "tags": [{"name": f"Tag {i}"} for i in range(count)],
+            "ingredients": [{"name": f"Ing {i}"} for i in range(count)],
+        }
+
+    def test_create_budget(self):
+        Tag.objects.create(user=self.user, name="Tag 0")
+        for count in (1, 30):
+            res = self.assertRequestWithinBudget(
+                RECIPE_CREATE_BUDGET,
+                "post",
+                RECIPE_URL,
+                self._payload(count),
+                format="json",
+            )
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            recipe = Recipe.objects.get(id=res.data["id"])
+            self.assertEqual(recipe.tags.count(), count)
+            self.assertEqual(recipe.ingredients.count(), count)
+
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 30)
+
+    def test_update_budget(self):
+        recipe = create_recipes(self.user, 1)[0]
+        for count in (1, 30):
+            res = self.assertRequestWithinBudget(
+                RECIPE_UPDATE_BUDGET,
+                "patch",
+                detail_url(recipe.id),
+                self._payload(count),
+                format="json",
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(recipe.tags.count(), count)
+
+    def test_duplicate_names_in_payload(self):
+        payload = self._payload(0)
+        payload["tags"] = [{"name": "Dup"}, {"name": "Dup"}]
+        res = self.client.post(RECIPE_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user, name="Dup").count(), 1)
+
+
+class RecipeLinkDiffTests(TestCase):
+    """Updates write only the tags and ingredients that changed"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("diff@example.com", "pass123")
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipes(self.user, 1, ingredients_per_recipe=40)[0]
+        self.names = [f"Ing {j}" for j in range(40)]
+        self.through = Recipe.ingredients.through
+
+    def patch(self, names):
+        payload = {"ingredients": [{"name": name} for name in names]}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(detail_url(self.recipe.id), payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        table = f'"{self.through._meta.db_table}"'
+        writes = [
+            query["sql"].split()[0]
+            for query in ctx.captured_queries
+            if query["sql"].startswith(("INSERT", "DELETE")) and table in query["sql"]
+        ]
+        return res, writes
+
+    def test_unchanged_set_writes_nothing(self):
+        _, writes = self.patch(reversed(self.names))
+
+        self.assertEqual(writes, [])
+
+    def test_one_changed_ingredient(self):
+        links = dict(self.through.objects.values_list("ingredient__name", "id"))
+
+        res, writes = self.patch(self.names[1:] + ["Saffron"])
+
+        self.assertEqual(writes, ["DELETE", "INSERT"])
+        kept = dict(self.through.objects.values_list("ingredient__name", "id"))
+        self.assertNotIn("Ing 0", kept)
+        # Unchanged links keep their rows
+        for name in self.names[1:]:
+            self.assertEqual(kept[name], links[name])
+        self.assertIn("Saffron", [item["name"] for item in res.data["ingredients"]])
+        self.assertEqual(len(res.data["ingredients"]), 40)
+
+    def test_clear(self):
+        res, writes = self.patch([])
+
+        self.assertEqual(writes, ["DELETE"])
+        self.assertEqual(res.data["ingredients"], [])
+        self.assertFalse(self.recipe.ingredients.exists())
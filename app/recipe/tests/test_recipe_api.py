@@ -1,16 +1,25 @@
 import os
+import shutil
 import tempfile
 from decimal import Decimal
+from functools import partial
+from io import StringIO
+from unittest.mock import patch
 
 from core.models import Ingredient
 from core.models import Recipe
 from core.models import Tag
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
 from django.test import TestCase
+from django.test import override_settings
 from django.urls import reverse
 from PIL import Image
+from recipe import images
 from recipe.serializers import RecipeDetailSerializer
 from recipe.serializers import RecipeSerializer
+from recipe.views import RecipeViewSet
 from rest_framework import status
 from rest_framework.test import APIClient
 
@@ -67,7 +76,7 @@ class PrivateRecipeAPITest(TestCase):
         recipes = Recipe.objects.all().order_by("-id")
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_recipe_limited_to_user(self):
         other_user = create_user(email="other@example.com", password="pas123")
@@ -78,7 +87,7 @@ class PrivateRecipeAPITest(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_get_recipe_detail(self):
         recipe = create_recipe(user=self.user)
@@ -305,9 +314,9 @@ class PrivateRecipeAPITest(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertIn(s2.data, res.data["results"])
+        self.assertNotIn(s3.data, res.data["results"])
 
     def test_filter_by_ingredients(self):
         """Test filter by ingredients"""
@@ -323,9 +332,128 @@ class PrivateRecipeAPITest(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertIn(s2.data, res.data["results"])
+        self.assertNotIn(s3.data, res.data["results"])
+
+    def test_filter_tags_match_all(self):
+        """Test match=all keeps recipes having every listed tag"""
+        tag1 = Tag.objects.create(user=self.user, name="Vegan")
+        tag2 = Tag.objects.create(user=self.user, name="Quick")
+        r1 = create_recipe(user=self.user, title="Salad")
+        r1.tags.add(tag1, tag2)
+        r2 = create_recipe(user=self.user, title="Stew")
+        r2.tags.add(tag1)
+
+        params = {"tags": f"{tag1.id},{tag2.id},{tag2.id}", "match": "all"}
+        res = self.client.get(RECIPE_URL, params)
+
+        ids = [r["id"] for r in res.data["results"]]
+        self.assertEqual(ids, [r1.id])
+
+    def test_filter_ingredients_match_all(self):
+        """Test match=all works for ingredients"""
+        in1 = Ingredient.objects.create(user=self.user, name="Salt")
+        in2 = Ingredient.objects.create(user=self.user, name="Rice")
+        r1 = create_recipe(user=self.user, title="Risotto")
+        r1.ingredients.add(in1, in2)
+        r2 = create_recipe(user=self.user, title="Brine")
+        r2.ingredients.add(in1)
+
+        params = {"ingredients": f"{in1.id},{in2.id}", "match": "all"}
+        res = self.client.get(RECIPE_URL, params)
+
+        ids = [r["id"] for r in res.data["results"]]
+        self.assertEqual(ids, [r1.id])
+
+    def test_filter_no_duplicates(self):
+        """Test a recipe matching several tags is listed once"""
+        tag1 = Tag.objects.create(user=self.user, name="Vegan")
+        tag2 = Tag.objects.create(user=self.user, name="Quick")
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPE_URL, {"tags": f"{tag1.id},{tag2.id}"})
+
+        ids = [r["id"] for r in res.data["results"]]
+        self.assertEqual(ids, [recipe.id])
+
+    def test_search_ranks_title_above_description(self):
+        """Test full-text search over title and description"""
+        in_description = create_recipe(
+            user=self.user, title="Soup", description="with roasted tomatoes"
+        )
+        in_title = create_recipe(
+            user=self.user, title="Tomato tart", description="buttery pastry"
+        )
+        create_recipe(user=self.user, title="Fish", description="and chips")
+
+        res = self.client.get(RECIPE_URL, {"search": "tomato"})
+
+        ids = [r["id"] for r in res.data["results"]]
+        self.assertEqual(ids, [in_title.id, in_description.id])
+
+    def test_search_paginates_by_rank(self):
+        """Test search pages follow relevance order"""
+        create_recipe(user=self.user, title="Soup", description="tomato")
+        create_recipe(user=self.user, title="Tomato soup", description="tomato")
+        create_recipe(user=self.user, title="Tomato tart", description="pastry")
+        create_recipe(user=self.user, title="Tomato tart", description="pastry")
+
+        seen = []
+        res = self.client.get(RECIPE_URL, {"search": "tomato", "page_size": 1})
+        while True:
+            seen.extend(r["id"] for r in res.data["results"])
+            if not res.data["next"]:
+                break
+            res = self.client.get(res.data["next"])
+
+        res = self.client.get(RECIPE_URL, {"search": "tomato", "paginate": 0})
+        self.assertEqual(seen, [r["id"] for r in res.data])
+
+    def test_search_follows_edits(self):
+        """Test the search vector is kept current on update"""
+        recipe = create_recipe(user=self.user, title="Soup")
+        self.client.patch(detail_url(recipe.id), {"title": "Gazpacho"})
+
+        res = self.client.get(RECIPE_URL, {"search": "gazpacho"})
+
+        self.assertEqual([r["id"] for r in res.data["results"]], [recipe.id])
+
+    def test_search_limited_to_user(self):
+        other = create_user(email="other@example.com", password="pas123")
+        create_recipe(user=other, title="Tomato tart")
+
+        res = self.client.get(RECIPE_URL, {"search": "tomato"})
+
+        self.assertEqual(res.data["results"], [])
+
+    def test_list_paginated_by_cursor(self):
+        """Test recipes are returned in keyset pages"""
+        recipes = [create_recipe(user=self.user, title=f"R{i}") for i in range(3)]
+
+        res = self.client.get(RECIPE_URL, {"page_size": 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]], [recipes[2].id, recipes[1].id]
+        )
+        self.assertIsNotNone(res.data["next"])
+
+        res = self.client.get(res.data["next"])
+        self.assertEqual([r["id"] for r in res.data["results"]], [recipes[0].id])
+        self.assertIsNone(res.data["next"])
+
+    def test_list_pagination_opt_out(self):
+        """Test paginate=0 returns the plain list"""
+        create_recipe(user=self.user)
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPE_URL, {"paginate": 0})
+
+        recipes = Recipe.objects.all().order_by("-id")
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, serializer.data)
 
 
 class TestImageUpload(TestCase):
@@ -378,3 +506,131 @@ class TestImageUpload(TestCase):
         payload = {"image": "notanimage"}
         res = self.client.post(url, payload, format="multipart")
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def jpeg_upload(size=(20, 10), orientation=None):
+    image_file = tempfile.NamedTemporaryFile(suffix=".jpg")
+    img = Image.new("RGB", size)
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    img.save(image_file, format="JPEG", exif=exif)
+    image_file.seek(0)
+    return image_file
+
+
+@override_settings(RECIPE_IMAGE_WORKERS=0)
+class TestImageProcessing(TestCase):
+    """Test images are processed off the request path"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "password123"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_upload_is_acknowledged_pending(self):
+        url = image_upload_url(self.recipe.id)
+        with jpeg_upload() as image_file:
+            res = self.client.post(url, {"image": image_file}, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data["image_status"], Recipe.ImageStatus.PENDING)
+        self.recipe.refresh_from_db()
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    def test_image_processed_after_commit(self):
+        url = image_upload_url(self.recipe.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            with jpeg_upload(size=(2000, 1000), orientation=6) as image_file:
+                self.client.post(url, {"image": image_file}, format="multipart")
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.ImageStatus.READY)
+        with Image.open(self.recipe.image.path) as img:
+            # EXIF orientation 6 is a 90 degree rotation
+            self.assertEqual(img.size, (1000, 2000))
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(res.data["image_status"], Recipe.ImageStatus.READY)
+        self.assertEqual(set(res.data["image_variants"]), {"large", "medium", "thumb"})
+        thumb = self.recipe.image.path.replace(".jpg", "_thumb.jpg")
+        with Image.open(thumb) as img:
+            self.assertEqual(max(img.size), 128)
+
+    def test_replaced_upload_removed(self):
+        url = image_upload_url(self.recipe.id)
+        with jpeg_upload() as image_file:
+            self.client.post(url, {"image": image_file}, format="multipart")
+        self.recipe.refresh_from_db()
+        upload = self.recipe.image.path
+
+        call_command("process_recipe_images", stdout=StringIO())
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.ImageStatus.READY)
+        # Unreferenced files are only deleted by garbage collection
+        self.assertTrue(os.path.exists(upload))
+        call_command("collect_recipe_images", grace=0, stdout=StringIO())
+        self.assertFalse(os.path.exists(upload))
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    def after_get_object(self, callback):
+        """Patch the view to run `callback` once it has loaded the recipe"""
+        get_object = RecipeViewSet.get_object
+
+        def get_object_then_callback(view):
+            obj = get_object(view)
+            callback()
+            return obj
+
+        return patch.object(RecipeViewSet, "get_object", get_object_then_callback)
+
+    def test_edit_during_processing_keeps_processed_image(self):
+        url = image_upload_url(self.recipe.id)
+        with jpeg_upload() as image_file:
+            self.client.post(url, {"image": image_file}, format="multipart")
+
+        process = partial(images.process_recipe_image, self.recipe.id)
+        with self.after_get_object(process):
+            res = self.client.patch(detail_url(self.recipe.id), {"title": "Stew"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        processed = Recipe.objects.get(id=self.recipe.id)
+        self.assertEqual(processed.title, "Stew")
+        self.assertEqual(processed.image_status, Recipe.ImageStatus.READY)
+        self.assertTrue(os.path.exists(processed.image.path))
+
+    def test_upload_keeps_edit_made_meanwhile(self):
+        recipes = Recipe.objects.filter(id=self.recipe.id)
+
+        with self.after_get_object(lambda: recipes.update(title="Stew")):
+            with jpeg_upload() as image_file:
+                self.client.post(
+                    image_upload_url(self.recipe.id),
+                    {"image": image_file},
+                    format="multipart",
+                )
+
+        self.assertEqual(recipes.get().title, "Stew")
+        self.assertEqual(recipes.get().image_status, Recipe.ImageStatus.PENDING)
+
+    def test_corrupt_image_marked_failed(self):
+        self.recipe.image.save("broken.jpg", ContentFile(b"not an image"))
+        Recipe.objects.filter(id=self.recipe.id).update(
+            image_status=Recipe.ImageStatus.PENDING
+        )
+
+        with self.assertLogs("recipe.images", level="ERROR"):
+            call_command("process_recipe_images", stdout=StringIO())
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.ImageStatus.FAILED)
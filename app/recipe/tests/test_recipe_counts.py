@@ -0,0 +1,217 @@
+"""Tests for the recipe counts kept on tags and ingredients"""
+
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from core.models import Ingredient
+from core.models import Recipe
+from core.models import Tag
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from recipe import counts
+from recipe.synthetic import DatasetGenerator
+from recipe.views import TagViewSet
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+BULK_URL = reverse("recipe:recipe-bulk")
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    defaults = {"title": "Sample", "time_minutes": 5, "price": Decimal("2.50")}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def stored_counts(model):
+    return dict(model.objects.values_list("name", "recipe_count"))
+
+
+class RecipeCountTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("c@example.com", "pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertCountsMatchLinks(self):
+        for model in (Tag, Ingredient):
+            drifted = model.objects.annotate(links=Count("recipe")).exclude(
+                recipe_count=F("links")
+            )
+            self.assertFalse(drifted.exists(), model.__name__)
+
+    def create(self, tags=(), ingredients=()):
+        payload = {
+            "title": "Soup",
+            "time_minutes": 10,
+            "price": "5.00",
+            "tags": [{"name": name} for name in tags],
+            "ingredients": [{"name": name} for name in ingredients],
+        }
+        res = self.client.post(RECIPES_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data["id"]
+
+    def test_create_update_delete(self):
+        first = self.create(tags=["Vegan", "Quick"], ingredients=["Salt"])
+        self.create(tags=["Vegan"], ingredients=["Salt", "Water"])
+        self.assertEqual(stored_counts(Tag), {"Vegan": 2, "Quick": 1})
+        self.assertEqual(stored_counts(Ingredient), {"Salt": 2, "Water": 1})
+
+        self.client.patch(
+            detail_url(first), {"tags": [{"name": "Dinner"}]}, format="json"
+        )
+        self.assertEqual(stored_counts(Tag), {"Vegan": 1, "Quick": 0, "Dinner": 1})
+
+        self.client.delete(detail_url(first))
+        self.assertEqual(stored_counts(Tag), {"Vegan": 1, "Quick": 0, "Dinner": 0})
+        self.assertEqual(stored_counts(Ingredient), {"Salt": 1, "Water": 1})
+        self.assertCountsMatchLinks()
+
+    def test_m2m_add_remove_clear(self):
+        tags = [Tag.objects.create(user=self.user, name=n) for n in ["a", "b"]]
+        recipes = [create_recipe(self.user) for _ in range(3)]
+        for recipe in recipes:
+            recipe.tags.add(*tags)
+        recipes[0].tags.remove(tags[0])
+        recipes[1].tags.clear()
+        tags[1].recipe_set.add(recipes[1])
+
+        self.assertEqual(stored_counts(Tag), {"a": 1, "b": 3})
+        self.assertCountsMatchLinks()
+
+    def test_bulk_writes(self):
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Old"))
+        payload = {
+            "recipes": {
+                "create": [
+                    {
+                        "title": f"Bulk {i}",
+                        "time_minutes": 5,
+                        "price": "1.00",
+                        "tags": [{"name": "New"}],
+                    }
+                    for i in range(2)
+                ],
+                "update": [{"id": recipe.id, "tags": [{"name": "New"}]}],
+            }
+        }
+
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(stored_counts(Tag), {"Old": 0, "New": 3})
+
+    def test_user_delete_cascades(self):
+        other = get_user_model().objects.create_user("o@example.com", "pass123")
+        for user in (self.user, other):
+            recipe = create_recipe(user)
+            recipe.tags.add(Tag.objects.create(user=user, name="Shared"))
+
+        self.user.delete()
+
+        self.assertEqual(list(Tag.objects.values_list("recipe_count", flat=True)), [1])
+        self.assertCountsMatchLinks()
+
+    def test_saving_stale_instance_keeps_count(self):
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        create_recipe(self.user).tags.add(tag)
+
+        tag.name = "Plant based"
+        tag.save()
+
+        self.assertEqual(stored_counts(Tag), {"Plant based": 1})
+
+    def test_rename_keeps_count_of_link_added_meanwhile(self):
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        recipe = create_recipe(self.user)
+        get_object = TagViewSet.get_object
+
+        def get_object_then_link(view):
+            obj = get_object(view)
+            recipe.tags.add(tag)
+            return obj
+
+        with patch.object(TagViewSet, "get_object", get_object_then_link):
+            res = self.client.patch(
+                reverse("recipe:tag-detail", args=[tag.id]), {"name": "Plant based"}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(stored_counts(Tag), {"Plant based": 1})
+
+    def test_synthetic_dataset(self):
+        DatasetGenerator(users=3, recipes=200, seed=1, batch_size=50).run()
+
+        self.assertTrue(Tag.objects.filter(recipe_count__gt=1).exists())
+        self.assertCountsMatchLinks()
+
+    def test_exposed_and_assigned_only(self):
+        self.create(tags=["Vegan"])
+        Tag.objects.create(user=self.user, name="Unused")
+
+        res = self.client.get(TAGS_URL)
+        listed = {tag["name"]: tag["recipe_count"] for tag in res.data["results"]}
+        self.assertEqual(listed, {"Vegan": 1, "Unused": 0})
+
+        res = self.client.get(TAGS_URL, {"assigned_only": 1})
+        self.assertEqual([tag["name"] for tag in res.data["results"]], ["Vegan"])
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data["results"][0]["tags"][0]["recipe_count"], 1)
+
+
+class RepairRecipeCountsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("r@example.com", "pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tags = [Tag.objects.create(user=self.user, name=f"t{i}") for i in range(5)]
+        salt = Ingredient.objects.create(user=self.user, name="Salt")
+        for i in range(4):
+            recipe = create_recipe(self.user)
+            recipe.tags.add(*tags[: i + 1])
+            recipe.ingredients.add(salt)
+        self.expected = {model: stored_counts(model) for model in (Tag, Ingredient)}
+
+    def test_repairs_drift_in_batches(self):
+        Tag.objects.filter(name__in=["t0", "t4"]).update(recipe_count=7)
+        Ingredient.objects.update(recipe_count=0)
+
+        self.assertEqual(counts.repair_recipe_counts(Tag, batch_size=2), 2)
+        self.assertEqual(counts.repair_recipe_counts(Ingredient, batch_size=2), 1)
+        for model, expected in self.expected.items():
+            self.assertEqual(stored_counts(model), expected)
+
+    def test_repair_invalidates_cached_lists(self):
+        self.client.get(TAGS_URL)
+        Tag.objects.update(recipe_count=0)
+
+        counts.repair_recipe_counts(Tag)
+
+        res = self.client.get(TAGS_URL)
+        listed = {tag["name"]: tag["recipe_count"] for tag in res.data["results"]}
+        self.assertEqual(listed, self.expected[Tag])
+
+    def test_command(self):
+        Tag.objects.update(recipe_count=0)
+        out = StringIO()
+
+        call_command("repair_recipe_counts", batch_size=3, stdout=out)
+
+        self.assertIn("tags: fixed 4 counts", out.getvalue())
+        self.assertIn("ingredients: fixed 0 counts", out.getvalue())
+        self.assertEqual(stored_counts(Tag), self.expected[Tag])
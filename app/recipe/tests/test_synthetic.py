@@ -0,0 +1,129 @@
+"""Tests for the synthetic dataset generator"""
+
+from io import StringIO
+
+from core.models import Ingredient
+from core.models import Recipe
+from core.models import Tag
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import SimpleTestCase
+from django.test import TestCase
+from recipe import synthetic
+
+
+def snapshot(domain):
+    """Everything generated for `domain`, independent of database ids"""
+    users = get_user_model().objects.filter(email__endswith=f"@{domain}")
+    recipes = (
+        Recipe.objects.filter(user__in=users)
+        .order_by("id")
+        .prefetch_related("tags", "ingredients")
+    )
+    return [
+        (
+            recipe.user.email.split("@")[0],
+            recipe.title,
+            recipe.description,
+            recipe.time_minutes,
+            recipe.price,
+            recipe.link,
+            sorted(tag.name for tag in recipe.tags.all()),
+            sorted(ingredient.name for ingredient in recipe.ingredients.all()),
+        )
+        for recipe in recipes.select_related("user")
+    ]
+
+
+class ZipfTests(SimpleTestCase):
+    def test_counts_add_up(self):
+        counts = synthetic.zipf_counts(1000, 7, 1.1)
+
+        self.assertEqual(sum(counts), 1000)
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+    def test_exponent_zero_is_even(self):
+        self.assertEqual(synthetic.zipf_counts(10, 5, 0), [2] * 5)
+
+
+class DatasetGeneratorTests(TestCase):
+    def generate(self, domain, **kwargs):
+        options = {"users": 6, "recipes": 300, "seed": 1, "batch_size": 70}
+        options.update(kwargs)
+        return synthetic.DatasetGenerator(email_domain=domain, **options).run()
+
+    def test_generates_requested_rows(self):
+        report = self.generate("a.example.com")
+
+        users = get_user_model().objects.filter(email__endswith="@a.example.com")
+        self.assertEqual(users.count(), 6)
+        self.assertEqual(Recipe.objects.filter(user__in=users).count(), 300)
+        self.assertEqual(report.recipes, 300)
+        self.assertEqual(report.tags, Tag.objects.count())
+        self.assertEqual(report.ingredients, Ingredient.objects.count())
+        links = (
+            Recipe.tags.through.objects.count()
+            + Recipe.ingredients.through.objects.count()
+        )
+        self.assertEqual(report.links, links)
+
+    def test_same_seed_same_data(self):
+        self.generate("a.example.com")
+        self.generate("b.example.com")
+        self.generate("c.example.com", seed=2)
+
+        first = snapshot("a.example.com")
+        self.assertEqual(first, snapshot("b.example.com"))
+        self.assertNotEqual(first, snapshot("c.example.com"))
+
+    def test_skewed_collections(self):
+        self.generate("a.example.com", zipf_exponent=1.5)
+
+        per_user = Recipe.objects.values("user").annotate(n=Count("id"))
+        counts = sorted(per_user.values_list("n", flat=True))
+        self.assertGreater(counts[-1], 10 * counts[0])
+
+    def test_fan_out_and_shared_vocabulary(self):
+        self.generate("a.example.com")
+
+        self.assertTrue(Recipe.objects.filter(ingredients__isnull=False).exists())
+        self.assertLessEqual(
+            Recipe.objects.annotate(n=Count("tags")).order_by("-n").first().n, 5
+        )
+        # Popular names are shared between users, with one row per user
+        shared = Ingredient.objects.values("name").annotate(users=Count("user"))
+        self.assertGreater(shared.order_by("-users").first()["users"], 1)
+
+    def test_recipes_are_searchable(self):
+        self.generate("a.example.com")
+
+        self.assertFalse(Recipe.objects.filter(search_vector__isnull=True).exists())
+
+    def test_defer_foreign_keys(self):
+        self.generate("a.example.com", defer_foreign_keys=True)
+        self.generate("b.example.com")
+
+        self.assertEqual(snapshot("a.example.com"), snapshot("b.example.com"))
+
+    def test_users_can_log_in(self):
+        self.generate("a.example.com", password="secret123")
+
+        user = get_user_model().objects.get(email="user3@a.example.com")
+        self.assertTrue(user.check_password("secret123"))
+
+
+class GenerateDatasetCommandTests(TestCase):
+    def test_command(self):
+        out = StringIO()
+
+        call_command("generate_dataset", users=3, recipes=20, stdout=out)
+
+        self.assertIn("Generated 3 users, 20 recipes", out.getvalue())
+
+    def test_existing_domain_rejected(self):
+        call_command("generate_dataset", users=1, recipes=1, stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command("generate_dataset", users=1, recipes=1)
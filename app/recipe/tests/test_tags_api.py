@@ -47,7 +47,7 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by("-name")
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_tag_limited_to_user(self):
         user2 = create_user(email="user2@example.com")
@@ -56,8 +56,8 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], tag.name)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], tag.name)
 
     def test_update_tag(self):
         tag = Tag.objects.create(user=self.user, name="Fruit")
@@ -68,6 +68,13 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload["name"])
 
+    def test_update_tag_duplicate_name(self):
+        """Test renaming a tag to an existing name is rejected"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        tag = Tag.objects.create(user=self.user, name="Fruit")
+        res = self.client.patch(detail_url(tag.id), {"name": "Vegan"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_delete_tag(self):
         tag = Tag.objects.create(user=self.user, name="Fruit")
         url = detail_url(tag.id)
@@ -75,7 +82,7 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Tag.objects.filter(id=tag.id).exists())
 
-    def tet_filter_ingredients_assigned_to_recipes(self):
+    def test_filter_tags_assigned_to_recipes(self):
         """Test listing tags by recipes"""
         tag1 = Tag.objects.create(user=self.user, name="Breakfast")
         tag2 = Tag.objects.create(user=self.user, name="Brunch")
@@ -84,10 +91,11 @@ class PrivateTagsApiTests(TestCase):
         )
         recipe.tags.add(tag1)
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
+        tag1.refresh_from_db()
         s1 = TagSerializer(tag1)
         s2 = TagSerializer(tag2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertNotIn(s2.data, res.data["results"])
 
     def test_filter_distinct(self):
         """Check no duplicates in response"""
@@ -102,4 +110,17 @@ class PrivateTagsApiTests(TestCase):
         recipe1.tags.add(tag1)
         recipe2.tags.add(tag1)
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_tags_paginated_by_name(self):
+        """Test tags are paged by descending name"""
+        for name in ["Apple", "Banana", "Cherry"]:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {"page_size": 2})
+        self.assertEqual(
+            [t["name"] for t in res.data["results"]], ["Cherry", "Banana"]
+        )
+
+        res = self.client.get(res.data["next"])
+        self.assertEqual([t["name"] for t in res.data["results"]], ["Apple"])
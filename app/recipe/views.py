@@ -1,16 +1,43 @@
+import io
+
+from core.authentication import CachedTokenAuthentication
 from core.models import Ingredient
 from core.models import Recipe
 from core.models import Tag
+from django.contrib.postgres.search import SearchQuery
+from django.contrib.postgres.search import SearchRank
+from django.db import IntegrityError
+from django.db.models import Count
+from django.db.models import DecimalField
+from django.db.models import Exists
+from django.db.models import F
+from django.db.models import OuterRef
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
 from drf_spectacular.utils import OpenApiParameter
 from drf_spectacular.utils import OpenApiTypes
 from drf_spectacular.utils import extend_schema
 from drf_spectacular.utils import extend_schema_view
+from recipe import export
+from recipe import images
 from recipe import serializers
+from recipe.bulk import BulkWriter
+from recipe.importer import ImportReport
+from recipe.importer import RecipeImporter
+from recipe.importer import guess_format
+from recipe.cache import CachedListMixin
+from recipe.cache import attr_list_cache
+from recipe.etags import CollectionETagMixin
+from recipe.fastpath import FastRecipeListMixin
+from recipe.fieldsets import FIELDSET_PARAMETERS
+from recipe.fieldsets import SparseFieldsMixin
+from recipe.pagination import RecipeAttrCursorPagination
+from recipe.pagination import RecipeCursorPagination
 from rest_framework import mixins
 from rest_framework import status
 from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
@@ -28,55 +55,208 @@ from rest_framework.response import Response
                 OpenApiTypes.STR,
                 description="Comma separating list of ingredients ids to filter",
             ),
+            OpenApiParameter(
+                "search",
+                OpenApiTypes.STR,
+                description="Full-text search over title and description",
+            ),
+            OpenApiParameter(
+                "match",
+                OpenApiTypes.STR,
+                enum=["any", "all"],
+                description="Match recipes having any (default) or all listed ids",
+            ),
         ]
-    )
+        + FIELDSET_PARAMETERS
+    ),
+    retrieve=extend_schema(parameters=FIELDSET_PARAMETERS),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    CollectionETagMixin,
+    FastRecipeListMixin,
+    SparseFieldsMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
 
     def _params_to_ints(self, qs):
         """Converts list of ids in str to Integers"""
         return [int(str_id) for str_id in qs.split(",")]
 
+    def _filter_by_related(self, queryset, field_name, ids):
+        """Keep recipes linked to any, or with match=all every, related id"""
+        field = Recipe._meta.get_field(field_name)
+        recipe_id = f"{field.m2m_field_name()}_id"
+        related_id = f"{field.m2m_reverse_field_name()}_id"
+        links = field.remote_field.through.objects.filter(
+            **{f"{related_id}__in": ids}
+        )
+        if self.request.query_params.get("match") == "all":
+            matched = (
+                links.values(recipe_id)
+                .annotate(matched=Count(related_id))
+                .filter(matched=len(set(ids)))
+                .values(recipe_id)
+            )
+            return queryset.filter(id__in=matched)
+        return queryset.filter(Exists(links.filter(**{recipe_id: OuterRef("pk")})))
+
     def get_queryset(self):
         """Retrieve recipes for Auth user"""
         tags = self.request.query_params.get("tags")
         ingredients = self.request.query_params.get("ingredients")
-        queryset = self.queryset
+        search = self.request.query_params.get("search")
+        fields = self.get_requested_fields()
+        queryset = self.queryset.defer("search_vector")
+        if self.action == "list":
+            # Lists are rendered from values() rows, see FastRecipeListMixin
+            pass
+        elif fields is not None:
+            queryset = self.trim_queryset(queryset, fields)
+        elif self.action != "upload_image":
+            queryset = queryset.prefetch_related("tags", "ingredients")
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = self._filter_by_related(queryset, "tags", tag_ids)
         if ingredients:
             ingredients_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
-        return queryset.filter(user=self.request.user).order_by("-id").distinct()
+            queryset = self._filter_by_related(queryset, "ingredients", ingredients_ids)
+        queryset = queryset.filter(user=self.request.user)
+        if search:
+            query = SearchQuery(search, search_type="websearch", config="english")
+            # A fixed scale rank survives the round trip through the cursor,
+            # a float4 one does not compare equal to its own string form.
+            rank = Cast(
+                SearchRank(F("search_vector"), query),
+                DecimalField(max_digits=12, decimal_places=8),
+            )
+            return (
+                queryset.filter(search_vector=query)
+                .annotate(rank=rank)
+                .order_by("-rank", "-id")
+            )
+        return queryset.order_by("-id")
 
     def get_serializer_class(self):
         if self.action == "list":
             return serializers.RecipeSerializer
         elif self.action == "upload_image":
             return serializers.RecipeImageSerializer
+        elif self.action == "bulk":
+            return serializers.RecipeBulkSerializer
+        elif self.action == "import_recipes":
+            return serializers.RecipeImportSerializer
 
         return self.serializer_class
 
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(super().retrieve, request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        instance.delete()
+        attr_list_cache.invalidate_on_commit(instance.user_id, Tag, Ingredient)
+
     @action(methods=["POST"], detail=True, url_path="upload_image")
     def upload_image(self, request, pk=None):
-        """Upload image to Recipe"""
+        """Store image for Recipe, resizing runs in the background"""
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            serializer.save(image_status=Recipe.ImageStatus.PENDING)
+            images.enqueue_recipe_image(recipe.id)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "include_images",
+                OpenApiTypes.INT,
+                enum=[0, 1],
+                description="Return a ZIP archive with the images instead of NDJSON",
+            )
+        ],
+        responses={(200, "application/x-ndjson"): OpenApiTypes.BINARY},
+    )
+    @action(methods=["GET"], detail=False, url_path="export")
+    def export(self, request):
+        """Stream every recipe of the user with its tags and ingredients"""
+        if bool(int(request.query_params.get("include_images", 0))):
+            response = StreamingHttpResponse(
+                export.iter_zip(request.user), content_type="application/zip"
+            )
+            filename = "recipes.zip"
+        else:
+            response = StreamingHttpResponse(
+                export.iter_ndjson(request.user), content_type="application/x-ndjson"
+            )
+            filename = "recipes.ndjson"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(methods=["POST"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        """Create, update and delete recipes, tags and ingredients in one batch"""
+        serializer = self.get_serializer(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = BulkWriter(request).run(serializer.validated_data)
+        except IntegrityError:
+            # A concurrent request took a name this batch relied on, nothing
+            # was written so the client can retry the whole batch.
+            return Response(
+                {"detail": "Batch conflicts with a concurrent change, retry it"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(results)
+
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="import",
+        url_name="import",
+        parser_classes=[MultiPartParser],
+    )
+    def import_recipes(self, request):
+        """Load recipes from an uploaded CSV or NDJSON file through COPY"""
+        serializer = self.get_serializer(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        upload = serializer.validated_data["file"]
+        input_format = serializer.validated_data.get("input_format")
+        input_format = input_format or guess_format(upload.name)
+        if input_format is None:
+            return Response(
+                {"input_format": ["Cannot tell the format from the file name"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+        report = ImportReport()
+        try:
+            RecipeImporter(request.user).run(stream, input_format, report)
+        except UnicodeDecodeError:
+            # Batches before the undecodable one are imported already
+            return Response(
+                {"file": ["Input must be UTF-8 encoded"], "report": report.as_dict()},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(report.as_dict())
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -88,24 +268,41 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 description="Filter by items assigned to recipe",
             )
         ]
+        + FIELDSET_PARAMETERS
     )
 )
 class BaseRecipeAttrViewSet(
+    CollectionETagMixin,
+    CachedListMixin,
+    SparseFieldsMixin,
     mixins.DestroyModelMixin,
     mixins.UpdateModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet,
 ):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeAttrCursorPagination
 
     def get_queryset(self):
         assigned_only = bool(int(self.request.query_params.get("assigned_only", 0)))
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            # Served by the partial <model>_assigned_idx index
+            queryset = queryset.filter(recipe_count__gt=0)
+        fields = self.get_requested_fields()
+        if fields is not None:
+            queryset = self.trim_queryset(queryset, fields)
+
+        return queryset.filter(user=self.request.user).order_by("-name")
+
+    def perform_update(self, serializer):
+        serializer.save()
+        attr_list_cache.invalidate_on_commit(self.request.user.pk, self.queryset.model)
 
-        return queryset.filter(user=self.request.user).order_by("-name").distinct()
+    def perform_destroy(self, instance):
+        instance.delete()
+        attr_list_cache.invalidate_on_commit(self.request.user.pk, self.queryset.model)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
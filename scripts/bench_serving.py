@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""Compare serving stacks under many concurrent, optionally slow, clients
+
+Each target is a name=url pair, e.g. a uWSGI (WSGI) and a uvicorn (ASGI)
+process of the same app:
+
+    uwsgi --http :8001 --workers 4 --master --enable-threads --module app.wsgi
+    uvicorn app.asgi:application --port 8002
+
+    bench_serving.py --token KEY --path /api/recipe/recipes/ \\
+        wsgi=http://localhost:8001 asgi=http://localhost:8002
+
+Only the standard library is used so it runs anywhere the app does.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def fetch(host, port, path, headers, read_delay):
+    """Send one GET and return (status, seconds)"""
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        lines = [f"GET {path} HTTP/1.1", f"Host: {host}:{port}", "Connection: close"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        # A slow client trickles the response in
+        while await reader.read(1024):
+            if read_delay:
+                await asyncio.sleep(read_delay)
+        return status, time.perf_counter() - started
+    finally:
+        writer.close()
+
+
+async def run_target(url, args):
+    parts = urlsplit(url)
+    headers = {"Accept": "application/json"}
+    if args.token:
+        headers["Authorization"] = f"Token {args.token}"
+    queue = asyncio.Queue()
+    for _ in range(args.requests):
+        queue.put_nowait(None)
+    timings, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            try:
+                status, seconds = await fetch(
+                    parts.hostname,
+                    parts.port or 80,
+                    args.path,
+                    headers,
+                    args.read_delay,
+                )
+            except OSError:
+                errors += 1
+                continue
+            if status >= 400:
+                errors += 1
+            timings.append(seconds)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(timings) / elapsed, 1),
+        "p50_ms": round(statistics.median(timings) * 1000, 1) if timings else None,
+        "p95_ms": (
+            round(timings[int(len(timings) * 0.95) - 1] * 1000, 1) if timings else None
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("targets", nargs="+", help="name=base url")
+    parser.add_argument("--path", default="/api/health-check/")
+    parser.add_argument("--token", help="API token for authenticated endpoints")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument(
+        "--read-delay",
+        type=float,
+        default=0.0,
+        help="Seconds a client waits between 1 KiB reads of the response",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for target in args.targets:
+        name, _, url = target.partition("=")
+        results[name] = asyncio.run(run_target(url, args))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,523 @@
+#!/usr/bin/env python
+"""Replay realistic request mixes against a running stack as load ramps up
+
+Start the production-like stack and give it synthetic users to log in as:
+
+    docker-compose -f docker-compose-deploy.yml up -d
+    docker-compose -f docker-compose-deploy.yml run --rm app \\
+        sh -c "python manage.py generate_dataset --users 200 --recipes 100000"
+
+    loadtest.py http://localhost:8000 --users 200 --concurrency 1 4 16 64
+
+Each virtual user logs in as one of the synthetic users, then loops over the
+tasks of a mix, picking them by weight, for the duration of every stage it
+takes part in. Stages run with increasing concurrency and report throughput,
+p50/p95/p99 latency and the error rate, overall and per request name.
+
+Tasks are coroutines taking a VirtualUser. More mixes can be defined in a
+Python file passed with --scenarios, as a MIXES dict of
+{name: {task: weight}}:
+
+    async def search(user):
+        await user.get("/api/recipe/recipes/", {"search": "stew"}, name="search")
+
+    MIXES = {"search": {search: 1}}
+
+Only the standard library is used so it runs anywhere the app does.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import random
+import statistics
+import struct
+import time
+import uuid
+import zlib
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+
+
+TOKEN_PATH = "/api/user/token/"
+RECIPES_PATH = "/api/recipe/recipes/"
+TAGS_PATH = "/api/recipe/tags/"
+
+# A stage whose throughput grows less than this over the previous one is
+# past the point where more concurrency buys more work
+SATURATION_GAIN = 0.1
+
+
+class HTTPError(Exception):
+    pass
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection, reopened when the server drops it"""
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers, body=b""):
+        try:
+            return await asyncio.wait_for(
+                self._request(method, path, headers, body), self.timeout
+            )
+        except BaseException:
+            self.close()
+            raise
+
+    async def _request(self, method, path, headers, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        lines.append(f"Content-Length: {len(body)}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise HTTPError("Connection closed before the response")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked()
+        elif "content-length" in headers:
+            body = await self.reader.readexactly(int(headers["content-length"]))
+        elif status in (204, 304) or method == "HEAD":
+            body = b""
+        else:
+            body = await self.reader.read()
+            headers["connection"] = "close"
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return Response(status, headers, body)
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self.reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                # Skip trailers up to the blank line
+                while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class Stats:
+    """Latencies and errors of the requests of one stage"""
+
+    def __init__(self):
+        self.timings = {}
+        self.errors = {}
+
+    def record(self, name, seconds, error):
+        self.timings.setdefault(name, []).append(seconds)
+        if error:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    @staticmethod
+    def summary(timings, errors, elapsed):
+        timings = sorted(timings)
+        count = len(timings)
+        if not count:
+            return {"requests": 0}
+
+        def ms(value):
+            return round(value * 1000, 1)
+
+        return {
+            "requests": count,
+            "requests_per_second": round(count / elapsed, 1),
+            "p50_ms": ms(statistics.median(timings)),
+            "p95_ms": ms(percentile(timings, 0.95)),
+            "p99_ms": ms(percentile(timings, 0.99)),
+            "max_ms": ms(timings[-1]),
+            "errors": errors,
+            "error_rate": round(errors / count, 4),
+        }
+
+    def report(self, elapsed):
+        everything = [t for timings in self.timings.values() for t in timings]
+        report = self.summary(everything, sum(self.errors.values()), elapsed)
+        report["by_name"] = {
+            name: self.summary(timings, self.errors.get(name, 0), elapsed)
+            for name, timings in sorted(self.timings.items())
+        }
+        return report
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def png(width, height, color):
+    """A solid colour PNG, small enough to upload often"""
+
+    def chunk(kind, data):
+        payload = kind + data
+        return struct.pack(">I", len(data)) + payload + struct.pack(
+            ">I", zlib.crc32(payload)
+        )
+
+    row = b"\x00" + bytes(color) * width
+    return b"".join(
+        (
+            b"\x89PNG\r\n\x1a\n",
+            chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+            chunk(b"IDAT", zlib.compress(row * height)),
+            chunk(b"IEND", b""),
+        )
+    )
+
+
+class VirtualUser:
+    """A logged in client with its own connection and what it has seen"""
+
+    def __init__(self, base_url, email, password, rng, stats, timeout):
+        parts = urlsplit(base_url)
+        self.prefix = parts.path.rstrip("/")
+        self.connection = Connection(parts.hostname, parts.port or 80, timeout)
+        self.email = email
+        self.password = password
+        self.rng = rng
+        self.stats = stats
+        self.token = None
+        self.tag_ids = []
+        self.recipe_ids = []
+
+    async def request(
+        self, method, path, params=None, body=b"", content_type=None, name=None
+    ):
+        """Send a request and record it under `name`, the path by default"""
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        headers = {"Accept": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Token {self.token}"
+        if content_type:
+            headers["Content-Type"] = content_type
+
+        started = time.perf_counter()
+        try:
+            response = await self.connection.request(
+                method, self.prefix + path, headers, body
+            )
+        except (OSError, HTTPError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            self.record(name or path, started, error=True)
+            return None
+        self.record(name or path, started, error=response.status >= 400)
+        return response
+
+    def record(self, name, started, error):
+        if self.stats is not None:
+            self.stats.record(name, time.perf_counter() - started, error)
+
+    async def get(self, path, params=None, name=None):
+        return await self.request("GET", path, params, name=name)
+
+    async def send_json(self, method, path, data, name=None):
+        body = json.dumps(data).encode()
+        return await self.request(
+            method, path, body=body, content_type="application/json", name=name
+        )
+
+    async def upload(self, path, field, filename, content, content_type, name=None):
+        boundary = uuid.uuid4().hex
+        body = b"".join(
+            (
+                f"--{boundary}\r\n".encode(),
+                (
+                    f'Content-Disposition: form-data; name="{field}"; '
+                    f'filename="{filename}"\r\n'
+                ).encode(),
+                f"Content-Type: {content_type}\r\n\r\n".encode(),
+                content,
+                f"\r\n--{boundary}--\r\n".encode(),
+            )
+        )
+        return await self.request(
+            "POST",
+            path,
+            body=body,
+            content_type=f"multipart/form-data; boundary={boundary}",
+            name=name,
+        )
+
+    async def login(self):
+        self.token = None
+        response = await self.send_json(
+            "POST",
+            TOKEN_PATH,
+            {"email": self.email, "password": self.password},
+            name="login",
+        )
+        if response is not None and response.status == 200:
+            self.token = response.json()["token"]
+        return self.token
+
+    async def setup(self):
+        """Log in and learn the ids later requests refer to, unrecorded"""
+        stats, self.stats = self.stats, None
+        try:
+            if not await self.login():
+                raise HTTPError(f"Could not log in as {self.email}")
+            response = await self.get(TAGS_PATH)
+            if response is not None and response.status == 200:
+                self.tag_ids = [tag["id"] for tag in response.json()["results"]]
+            response = await self.get(RECIPES_PATH, {"page_size": 20})
+            if response is not None and response.status == 200:
+                self.recipe_ids = [r["id"] for r in response.json()["results"]]
+        finally:
+            self.stats = stats
+
+    def close(self):
+        self.connection.close()
+
+
+async def login(user):
+    await user.login()
+
+
+async def list_recipes(user):
+    await user.get(RECIPES_PATH, name="list recipes")
+
+
+async def filter_recipes(user):
+    if not user.tag_ids:
+        return await list_recipes(user)
+    tags = user.rng.sample(user.tag_ids, min(2, len(user.tag_ids)))
+    await user.get(
+        RECIPES_PATH, {"tags": ",".join(map(str, tags))}, name="filter recipes"
+    )
+
+
+async def recipe_detail(user):
+    if not user.recipe_ids:
+        return await list_recipes(user)
+    recipe_id = user.rng.choice(user.recipe_ids)
+    await user.get(f"{RECIPES_PATH}{recipe_id}/", name="recipe detail")
+
+
+async def create_recipe(user):
+    tags = ["Load test"] + user.rng.sample(["Quick", "Vegan", "Dinner", "Spicy"], 2)
+    response = await user.send_json(
+        "POST",
+        RECIPES_PATH,
+        {
+            "title": f"Load test recipe {user.rng.randrange(10**6)}",
+            "time_minutes": user.rng.randint(5, 120),
+            "price": f"{user.rng.uniform(1, 50):.2f}",
+            "tags": [{"name": name} for name in tags],
+            "ingredients": [{"name": "Salt"}, {"name": "Water"}],
+        },
+        name="create recipe",
+    )
+    if response is not None and response.status == 201:
+        user.recipe_ids.append(response.json()["id"])
+
+
+async def upload_image(user):
+    if not user.recipe_ids:
+        return await create_recipe(user)
+    recipe_id = user.rng.choice(user.recipe_ids)
+    color = [user.rng.randrange(256) for _ in range(3)]
+    await user.upload(
+        f"{RECIPES_PATH}{recipe_id}/upload_image/",
+        "image",
+        "load-test.png",
+        png(320, 240, color),
+        "image/png",
+        name="upload image",
+    )
+
+
+MIXES = {
+    "default": {
+        login: 1,
+        list_recipes: 10,
+        filter_recipes: 6,
+        recipe_detail: 8,
+        create_recipe: 2,
+        upload_image: 1,
+    },
+    "browse": {list_recipes: 5, filter_recipes: 3, recipe_detail: 5},
+    "write": {create_recipe: 5, upload_image: 2, recipe_detail: 1},
+    "login": {login: 1},
+}
+
+
+def load_mixes(path):
+    spec = importlib.util.spec_from_file_location("load_scenarios", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.MIXES
+
+
+async def run_stage(users, mix, duration, think):
+    tasks, weights = zip(*mix.items())
+    stats = Stats()
+    deadline = time.perf_counter() + duration
+
+    async def loop(user):
+        user.stats = stats
+        while time.perf_counter() < deadline:
+            await user.rng.choices(tasks, weights)[0](user)
+            if think:
+                await asyncio.sleep(user.rng.expovariate(1 / think))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(loop(user) for user in users))
+    return stats.report(time.perf_counter() - started)
+
+
+async def run(args, mix):
+    users = []
+    stages = []
+    try:
+        for concurrency in args.concurrency:
+            while len(users) < concurrency:
+                index = len(users) % args.users + 1
+                user = VirtualUser(
+                    args.url,
+                    args.email.format(n=index),
+                    args.password,
+                    random.Random(args.seed * 100003 + len(users)),
+                    None,
+                    args.timeout,
+                )
+                users.append(user)
+            await asyncio.gather(*(user.setup() for user in users if not user.token))
+            report = await run_stage(
+                users[:concurrency], mix, args.duration, args.think
+            )
+            report["concurrency"] = concurrency
+            stages.append(report)
+            print_stage(report)
+    finally:
+        for user in users:
+            user.close()
+    return stages
+
+
+def saturation(stages):
+    """The first stage that added concurrency without adding throughput"""
+    for previous, stage in zip(stages, stages[1:]):
+        if not previous.get("requests_per_second"):
+            continue
+        gained = stage.get("requests_per_second", 0)
+        gained = gained / previous["requests_per_second"] - 1
+        if gained < SATURATION_GAIN:
+            return previous
+    return None
+
+
+def print_stage(report):
+    print(
+        f"concurrency {report['concurrency']:>4}: "
+        f"{report.get('requests_per_second', 0):>8.1f} req/s  "
+        f"p50 {report.get('p50_ms', 0):>8.1f}ms  "
+        f"p95 {report.get('p95_ms', 0):>8.1f}ms  "
+        f"p99 {report.get('p99_ms', 0):>8.1f}ms  "
+        f"errors {report.get('error_rate', 0):>7.2%}"
+    )
+    for name, summary in report.get("by_name", {}).items():
+        print(
+            f"    {name:<16} {summary['requests']:>7} "
+            f"p50 {summary['p50_ms']:>8.1f}ms  "
+            f"p95 {summary['p95_ms']:>8.1f}ms  "
+            f"p99 {summary['p99_ms']:>8.1f}ms  "
+            f"errors {summary['error_rate']:>7.2%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("url", help="Base url of the stack, e.g. http://localhost:8000")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 4, 16, 64],
+        help="Virtual users of each stage",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30, help="Seconds of each stage"
+    )
+    parser.add_argument(
+        "--think",
+        type=float,
+        default=0,
+        help="Mean seconds a user waits between tasks, 0 for a closed loop",
+    )
+    parser.add_argument("--mix", default="default")
+    parser.add_argument("--scenarios", help="Python file with more MIXES")
+    parser.add_argument(
+        "--users", type=int, default=10, help="Distinct accounts to log in as"
+    )
+    parser.add_argument(
+        "--email",
+        default="user{n}@synthetic.example.com",
+        help="Account email, {n} counts from 1",
+    )
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the stage reports as JSON here")
+    args = parser.parse_args()
+
+    mixes = dict(MIXES)
+    if args.scenarios:
+        mixes.update(load_mixes(args.scenarios))
+    if args.mix not in mixes:
+        parser.error(f"Unknown mix {args.mix}, choose from {', '.join(mixes)}")
+
+    try:
+        stages = asyncio.run(run(args, mixes[args.mix]))
+    except HTTPError as exc:
+        parser.exit(1, f"{exc}\n")
+    saturated = saturation(stages)
+    if saturated:
+        print(
+            f"Throughput flattens at concurrency {saturated['concurrency']} "
+            f"({saturated['requests_per_second']} req/s)"
+        )
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"mix": args.mix, "stages": stages}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
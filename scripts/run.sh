@@ -2,7 +2,17 @@
 
 set -e
 
-2python manage.py collectstatic --noinput
+python manage.py wait_for_db
+python manage.py collectstatic --noinput
 python manage.py migrate
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+# Each server process warms itself up before it accepts requests
+export WARM_UP_ON_START="${WARM_UP_ON_START:-1}"
+
+if [ "$APP_SERVER" = "asgi" ]; then
+    # One event loop holds many slow connections; the proxy must speak HTTP
+    exec uvicorn app.asgi:application --host 0.0.0.0 --port 9000 \
+        --workers "${ASGI_WORKERS:-1}" --no-access-log
+fi
+
+uwsgi --socket :9000 --workers "${UWSGI_WORKERS:-4}" --master --enable-threads --module app.wsgi
\ No newline at end of file